@@ -34,6 +34,38 @@ class tk_houdini_karma(sgtk.platform.Application):
         """
         self.handler.submit_to_farm(node)
 
+    def estimate_render_cost(self, node: hou.Node) -> None:
+        """Renders a few probe frames to estimate what the render costs on the farm.
+
+        Args:
+            node (hou.Node):  SGTK Karma Render node
+        """
+        self.handler.estimate_render_cost(node)
+
+    def compare_lod_cost(self, node: hou.Node) -> None:
+        """Renders a probe with and without LOD selection to show what it saves.
+
+        Args:
+            node (hou.Node):  SGTK Karma Render node
+        """
+        self.handler.compare_lod_cost(node)
+
+    def solve_noise_target(self, node: hou.Node) -> None:
+        """Sets the pixel samples that reach the noise target, based on a probe render.
+
+        Args:
+            node (hou.Node):  SGTK Karma Render node
+        """
+        self.handler.solve_noise_target(node)
+
+    def composite_fixup(self, node: hou.Node) -> None:
+        """Composites the fix-up renders back into the existing frames.
+
+        Args:
+            node (hou.Node):  SGTK Karma Render node
+        """
+        self.handler.composite_fixup(node)
+
     def open_folder(self, node: hou.Node) -> None:
         """Opens the render folder in the OS appropriate file program.
 
@@ -42,14 +74,17 @@ class tk_houdini_karma(sgtk.platform.Application):
         """
         self.handler.open_folder(node)
 
-    def get_output_path(self, node: hou.Node, aov_name: str) -> str:
+    def get_output_path(
+        self, node: hou.Node, aov_name: str, render_pass: str = ""
+    ) -> str:
         """Calculate render path for an aov
 
         Args:
             node (hou.Node): SGTK Karma Render node
             aov_name (str): AOV name
+            render_pass (str): Render pass, which gets added to the output name
         """
-        return self.handler.get_output_path(node, aov_name)
+        return self.handler.get_output_path(node, aov_name, render_pass)
 
     def get_output_range(self, node: hou.Node) -> list[int]:
         """Get output frame range for the Karma node
@@ -84,13 +119,22 @@ class tk_houdini_karma(sgtk.platform.Application):
         """
         return self.handler.setup_output_paths(node)
 
-    def get_output_paths(self, node: hou.Node) -> list[str]:
+    def get_output_paths(self, node: hou.Node, render_pass: str = "") -> list[str]:
         """Get output paths for the SGTK Karma Render node
 
+        Args:
+            node (hou.Node): SGTK Karma Render node
+            render_pass (str): Render pass to get the output paths of
+        """
+        return self.handler.get_output_paths(node, render_pass)
+
+    def get_render_passes(self, node: hou.Node) -> list[dict]:
+        """Get the render passes of the SGTK Karma Render node, with their farm mode
+
         Args:
             node (hou.Node): SGTK Karma Render node
         """
-        return self.handler.get_output_paths(node)
+        return self.handler.get_render_passes(node)
 
     def get_work_template(self) -> str:
         """Get work file template from ShotGrid, also used by the multi-publish collector."""
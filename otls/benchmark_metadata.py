@@ -0,0 +1,101 @@
+"""Benchmarks the Python metadata authoring of the sg_metadata node against the VEX
+wrangle it replaced. Run this with hython once the OTL is installed:
+
+    hython benchmark_metadata.py [entry count] [frame count]
+
+Both nodes get the same metadata entries from the SGTK Karma node and get force cooked
+on every frame, so we only measure the metadata authoring and not the stage above it."""
+
+import sys
+import time
+
+import hou
+
+ENTRY_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+FRAME_COUNT = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+
+# The wrangle the HDA used before, reading the metadata of the SGTK Karma node
+WRANGLE_SNIPPET = """for (int i = 1; i <= chi("../metadata_entries"); i++) {
+    string type = chs(sprintf("../metadata_%g_type", i));
+    string name = "driver:parameters:OpenEXR:" + chs(sprintf("../metadata_%g_key", i));
+    string value_name = sprintf("../metadata_%g_%s", i, type);
+
+    if (type == "float")
+        usd_setattrib(0, @primpath, name, chf(value_name));
+    else if (type == "int")
+        usd_setattrib(0, @primpath, name, chi(value_name));
+    else if (type == "string")
+        usd_setattrib(0, @primpath, name, chs(value_name));
+    else if (startswith(type, "v"))
+        usd_setattrib(0, @primpath, name, chv(value_name));
+}
+
+usd_setattrib(0, @primpath, "driver:parameters:artist", chs("sg_metadata/artist"));"""
+
+# Metadata types we fill the entries with, and the value we give them
+ENTRY_VALUES = (
+    ("string", ("benchmark",)),
+    ("float", (1.5,)),
+    ("int", (42,)),
+    ("v3f", (1.0, 2.0, 3.0)),
+)
+
+
+def add_metadata_entries(karma_node: hou.Node, entry_count: int) -> None:
+    """Fills the metadata of the SGTK Karma node with a mix of metadata types.
+
+    Args:
+        karma_node: SGTK Karma node
+        entry_count: Amount of metadata entries
+    """
+    karma_node.parm("metadata_entries").set(entry_count)
+    for entry_index in range(1, entry_count + 1):
+        metadata_type, value = ENTRY_VALUES[entry_index % len(ENTRY_VALUES)]
+        karma_node.parm(f"metadata_{entry_index}_key").set(f"benchmark{entry_index}")
+        karma_node.parm(f"metadata_{entry_index}_type").set(metadata_type)
+        karma_node.parmTuple(f"metadata_{entry_index}_{metadata_type}").set(value)
+
+
+def time_cooks(node: hou.LopNode, frame_count: int) -> float:
+    """Force cooks a node on every frame and returns the total cook time in seconds.
+
+    Args:
+        node: Node to cook
+        frame_count: Amount of frames to cook
+    """
+    # Cook the input once, so the first frame doesn't include the stage above it
+    node.input(0).cook(force=True)
+
+    cook_time = 0.0
+    for frame in range(1, frame_count + 1):
+        hou.setFrame(frame)
+        start_time = time.perf_counter()
+        node.cook(force=True)
+        cook_time += time.perf_counter() - start_time
+
+    return cook_time
+
+
+def main() -> None:
+    """Times both metadata nodes and prints the results."""
+    karma_node = hou.node("/stage").createNode("sgtk_karma")
+    karma_node.allowEditingOfContents()
+    add_metadata_entries(karma_node, ENTRY_COUNT)
+
+    python_node = karma_node.node("sg_metadata")
+    wrangle_node = karma_node.createNode("attribwrangle", "benchmark_wrangle")
+    wrangle_node.setInput(0, python_node.input(0))
+    wrangle_node.parm("primpattern").set("/Render/** & %type:RenderProduct")
+    wrangle_node.parm("snippet").set(WRANGLE_SNIPPET)
+
+    wrangle_time = time_cooks(wrangle_node, FRAME_COUNT)
+    python_time = time_cooks(python_node, FRAME_COUNT)
+
+    print(f"{ENTRY_COUNT} metadata entries, {FRAME_COUNT} frames")
+    print(f"VEX wrangle: {wrangle_time * 1000 / FRAME_COUNT:.2f} ms per frame")
+    print(f"Python:      {python_time * 1000 / FRAME_COUNT:.2f} ms per frame")
+    print(f"Speed up:    {wrangle_time / max(python_time, 1e-9):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
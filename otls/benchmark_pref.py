@@ -0,0 +1,111 @@
+"""Benchmarks the pRef_caller node on an asset with a lot of meshes. Run this with
+hython once the OTL is installed:
+
+    hython benchmark_pref.py [mesh count] [frame count]
+
+The asset is built by a Python Script LOP that doesn't depend on time, like a loaded
+asset. The pRef_caller node gets force cooked on every frame, so we measure the pRef
+computation and the cache lookups, and not the stage above it."""
+
+import sys
+import time
+
+import hou
+
+MESH_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+FRAME_COUNT = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+
+# Creates a grid mesh of 21 by 21 points for every mesh, grouped by 100 meshes
+ASSET_SNIPPET = f"""from pxr import Gf, Sdf, Vt
+
+resolution = 20
+points = Vt.Vec3fArray(
+    [Gf.Vec3f(x, y, 0) for y in range(resolution + 1) for x in range(resolution + 1)]
+)
+face_vertex_counts = Vt.IntArray([4] * resolution * resolution)
+face_vertex_indices = Vt.IntArray(
+    [
+        index
+        for y in range(resolution)
+        for x in range(resolution)
+        for index in (
+            y * (resolution + 1) + x,
+            y * (resolution + 1) + x + 1,
+            (y + 1) * (resolution + 1) + x + 1,
+            (y + 1) * (resolution + 1) + x,
+        )
+    ]
+)
+
+layer = hou.pwd().editableStage().GetEditTarget().GetLayer()
+with Sdf.ChangeBlock():
+    group_paths = [
+        f"/asset/group{{group_index}}" for group_index in range({MESH_COUNT} // 100 + 1)
+    ]
+    for group_path in ["/asset"] + group_paths:
+        prim_spec = Sdf.CreatePrimInLayer(layer, group_path)
+        prim_spec.specifier = Sdf.SpecifierDef
+        prim_spec.typeName = "Xform"
+
+    for mesh_index in range({MESH_COUNT}):
+        prim_spec = Sdf.CreatePrimInLayer(
+            layer, f"/asset/group{{mesh_index // 100}}/mesh{{mesh_index}}"
+        )
+        prim_spec.specifier = Sdf.SpecifierDef
+        prim_spec.typeName = "Mesh"
+        for name, value_type, value in (
+            ("points", Sdf.ValueTypeNames.Point3fArray, points),
+            ("faceVertexCounts", Sdf.ValueTypeNames.IntArray, face_vertex_counts),
+            ("faceVertexIndices", Sdf.ValueTypeNames.IntArray, face_vertex_indices),
+        ):
+            Sdf.AttributeSpec(prim_spec, name, value_type).default = value
+"""
+
+
+def time_cooks(node: hou.LopNode, frame_count: int) -> tuple[float, float]:
+    """Force cooks a node on every frame and returns the time of the first cook
+    and the average time of the other cooks in seconds.
+
+    Args:
+        node: Node to cook
+        frame_count: Amount of frames to cook
+    """
+    # Cook the input once, so the first frame doesn't include the stage above it
+    node.input(0).cook(force=True)
+
+    cook_times = []
+    for frame in range(1, frame_count + 1):
+        hou.setFrame(frame)
+        start_time = time.perf_counter()
+        node.cook(force=True)
+        cook_times.append(time.perf_counter() - start_time)
+
+    return cook_times[0], sum(cook_times[1:]) / max(len(cook_times) - 1, 1)
+
+
+def main() -> None:
+    """Times the pRef_caller node in local and world space and prints the results."""
+    asset_node = hou.node("/stage").createNode("pythonscript", "benchmark_asset")
+    asset_node.parm("python").set(ASSET_SNIPPET)
+
+    karma_node = hou.node("/stage").createNode("sgtk_karma")
+    karma_node.setInput(0, asset_node)
+    karma_node.parm("pref_select").set(1)
+    karma_node.parm("pref_name_1").set("benchmark")
+    karma_node.parm("select_pref_1").set("/asset")
+    karma_node.parm("pref_source_frame_1").set(1)
+
+    pref_node = karma_node.node("pRef_caller")
+
+    print(f"{MESH_COUNT} meshes, {FRAME_COUNT} frames")
+    for world_space in (0, 1):
+        karma_node.parm("pref_world_space").set(world_space)
+        first_time, frame_time = time_cooks(pref_node, FRAME_COUNT)
+
+        space = "World space" if world_space else "Local space"
+        print(f"{space} first cook:  {first_time * 1000:.2f} ms")
+        print(f"{space} other cooks: {frame_time * 1000:.2f} ms per frame")
+
+
+if __name__ == "__main__":
+    main()
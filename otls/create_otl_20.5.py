@@ -21,6 +21,50 @@ pRef_caller_file = open(
     f"{OTL_FOLDER}/pRef_caller.py"
 ).read()
 
+metadata_caller_file = open(
+    f"{OTL_FOLDER}/metadata_caller.py"
+).read()
+
+lightgroup_caller_file = open(
+    f"{OTL_FOLDER}/lightgroup_caller.py"
+).read()
+
+stage_optimizer_file = open(
+    f"{OTL_FOLDER}/stage_optimizer.py"
+).read()
+
+frustum_culling_file = open(
+    f"{OTL_FOLDER}/frustum_culling.py"
+).read()
+
+lod_selection_file = open(
+    f"{OTL_FOLDER}/lod_selection.py"
+).read()
+
+velocity_blur_file = open(
+    f"{OTL_FOLDER}/velocity_blur.py"
+).read()
+
+preview_settings_file = open(
+    f"{OTL_FOLDER}/preview_settings.py"
+).read()
+
+render_pass_file = open(
+    f"{OTL_FOLDER}/render_pass.py"
+).read()
+
+fixup_settings_file = open(
+    f"{OTL_FOLDER}/fixup_settings.py"
+).read()
+
+tile_settings_file = open(
+    f"{OTL_FOLDER}/tile_settings.py"
+).read()
+
+split_settings_file = open(
+    f"{OTL_FOLDER}/split_settings.py"
+).read()
+
 
 # The following functions help us with building the OTL.
 def convert_naming_scheme(naming_scheme) -> tuple:
@@ -258,50 +302,105 @@ hda = hou.node("/stage/").createNode("subnet", "SGTK_Karma_Render")
 # Create standard nodes which we will link to later
 # Input null needed by loputils to fetch camera list for some reason
 null_node = hda.createNode("null", "input")
+upstream_cache = hda.createNode("cache", "upstream_cache")
+upstream_cache_switch = hda.createNode("switch", "upstream_cache_switch")
+frustum_culling = hda.createNode("pythonscript", "frustum_culling")
+frustum_culling_switch = hda.createNode("switch", "frustum_culling_switch")
+lod_selection = hda.createNode("pythonscript", "lod_selection")
+lod_selection_switch = hda.createNode("switch", "lod_selection_switch")
 karma_render_settings = hda.createNode("karmarenderproperties", "karmarendersettings")
 karma_cryptomatte = hda.createNode("karmacryptomatte", "karmacryptomatte")
 crypto_switch = hda.createNode("switch", "crypto_switch")
 motionblur = hda.createNode("motionblur", "motionblur")
+velocity_blur = hda.createNode("pythonscript", "velocity_blur")
 motionblur_switch = hda.createNode("switch", "motionblur_switch")
 render_product_edit = hda.createNode("renderproduct", "renderproduct_edit")
 uv_rendervar_edit = hda.createNode("rendervar", "uv_rendervar_edit")
-node_user_metadata = hda.createNode("attribwrangle", "user_metadata")
-node_sg_metadata = hda.createNode("attribwrangle", "sg_metadata")
+node_sg_metadata = hda.createNode("pythonscript", "sg_metadata")
+lightgroup_node = hda.createNode("pythonscript", "lightgroup_caller")
 python_node = hda.createNode("pythonscript", "pRef_caller")
+stage_optimizer = hda.createNode("pythonscript", "stage_optimizer")
+stage_optimizer_switch = hda.createNode("switch", "stage_optimizer_switch")
+render_pass = hda.createNode("pythonscript", "render_pass")
+fixup_settings = hda.createNode("pythonscript", "fixup_settings")
+tile_settings = hda.createNode("pythonscript", "tile_settings")
+split_beauty = hda.createNode("pythonscript", "split_beauty")
 usdrender_rop = hda.createNode("usdrender_rop", "usdrender_rop")
+preview_settings = hda.createNode("pythonscript", "preview_settings")
+usdrender_rop_preview = hda.createNode("usdrender_rop", "usdrender_rop_preview")
+split_outputs = hda.createNode("pythonscript", "split_outputs")
+usdrender_rop_split = hda.createNode("usdrender_rop", "usdrender_rop_split")
 output_node = hda.createNode("output", "output0")
 
 # Link nodes
-karma_render_settings.setInput(0, null_node)
+upstream_cache.setInput(0, null_node)
+upstream_cache_switch.setInput(0, null_node)
+upstream_cache_switch.setInput(1, upstream_cache)
+frustum_culling.setInput(0, upstream_cache_switch)
+frustum_culling_switch.setInput(0, upstream_cache_switch)
+frustum_culling_switch.setInput(1, frustum_culling)
+lod_selection.setInput(0, frustum_culling_switch)
+lod_selection_switch.setInput(0, frustum_culling_switch)
+lod_selection_switch.setInput(1, lod_selection)
+karma_render_settings.setInput(0, lod_selection_switch)
 karma_cryptomatte.setInput(0, karma_render_settings)
 crypto_switch.setInput(0, karma_render_settings)
 crypto_switch.setInput(1, karma_cryptomatte)
 motionblur.setInput(0, crypto_switch)
 motionblur_switch.setInput(0, crypto_switch)
-motionblur_switch.setInput(1, motionblur)
+velocity_blur.setInput(0, motionblur)
+motionblur_switch.setInput(1, velocity_blur)
 render_product_edit.setInput(0, motionblur_switch)
 uv_rendervar_edit.setInput(0, render_product_edit)
-node_user_metadata.setInput(0, uv_rendervar_edit)
-node_sg_metadata.setInput(0, node_user_metadata)
-python_node.setInput(0, node_sg_metadata)
-usdrender_rop.setInput(0, python_node)
-output_node.setInput(0, python_node)
+node_sg_metadata.setInput(0, uv_rendervar_edit)
+lightgroup_node.setInput(0, node_sg_metadata)
+python_node.setInput(0, lightgroup_node)
+stage_optimizer.setInput(0, python_node)
+stage_optimizer_switch.setInput(0, python_node)
+stage_optimizer_switch.setInput(1, stage_optimizer)
+render_pass.setInput(0, stage_optimizer_switch)
+fixup_settings.setInput(0, render_pass)
+tile_settings.setInput(0, fixup_settings)
+split_beauty.setInput(0, tile_settings)
+usdrender_rop.setInput(0, split_beauty)
+preview_settings.setInput(0, stage_optimizer_switch)
+usdrender_rop_preview.setInput(0, preview_settings)
+split_outputs.setInput(0, stage_optimizer_switch)
+usdrender_rop_split.setInput(0, split_outputs)
+output_node.setInput(0, tile_settings)
 output_node.setDisplayFlag(True)
 
 hda.layoutChildren(
     (
         null_node,
+        upstream_cache,
+        upstream_cache_switch,
+        frustum_culling,
+        frustum_culling_switch,
+        lod_selection,
+        lod_selection_switch,
         karma_cryptomatte,
         karma_render_settings,
         crypto_switch,
         motionblur,
+        velocity_blur,
         motionblur_switch,
         render_product_edit,
         uv_rendervar_edit,
-        node_user_metadata,
         node_sg_metadata,
+        lightgroup_node,
         python_node,
+        stage_optimizer,
+        stage_optimizer_switch,
+        render_pass,
+        fixup_settings,
+        tile_settings,
+        split_beauty,
         usdrender_rop,
+        preview_settings,
+        usdrender_rop_preview,
+        split_outputs,
+        usdrender_rop_split,
         output_node,
     )
 )
@@ -320,6 +419,15 @@ crypto_switch.parm("input").setExpression(
     language=hou.exprLanguage.Python,
 )
 
+# Setting the automatic motion blur settings. In auto mode the motion blur LOP
+# only samples the prims that need it, the rest gets velocity blur.
+motionblur_pattern = motionblur.parm("primpattern").unexpandedString()
+motionblur.parm("primpattern").setExpression(
+    f"hou.pwd().parent().hm().get_motion_blur_pattern(hou.pwd().parent(), {motionblur_pattern!r})",
+    language=hou.exprLanguage.Python,
+)
+velocity_blur.parm("python").set(velocity_blur_file)
+
 # Setting standard motionblur_switch settings
 motionblur_switch.parm("input").setExpression(
     '1 if hou.pwd().parent().evalParm("enablemblur") else 0',
@@ -343,46 +451,57 @@ uv_rendervar_edit.parm("sourceType").set("primvar")
 uv_rendervar_edit.parm("xn__driverparametersaovname_jebkd").set("UV")
 uv_rendervar_edit.parm("xn__driverparametersaovformat_shbkd").set("color3f")
 
-# Setting the metadata wrangle settings
-for i, node in enumerate([node_user_metadata, node_sg_metadata]):
-    node.parm("primpattern").set("/Render/** & %type:RenderProduct")
+# Setting the metadata settings. The user metadata lives on the HDA itself,
+# the ShotGrid metadata gets set on the sg_metadata node by the app.
+metadata_params = node_sg_metadata.parmTemplateGroup()
+metadata_params.addParmTemplate(_get_metadata_block())
+metadata_params.addParmTemplate(hou.StringParmTemplate("artist", "Artist", 1))
+node_sg_metadata.setParmTemplateGroup(metadata_params)
+node_sg_metadata.parm("python").set(metadata_caller_file)
 
-    if i == 0:
-        level = "../"
-    else:
-        level = ""
-        metadata_params = node_sg_metadata.parmTemplateGroup()
-        metadata_params.addParmTemplate(_get_metadata_block())
-        metadata_params.addParmTemplate(hou.StringParmTemplate("artist", "Artist", 1))
-        node_sg_metadata.setParmTemplateGroup(metadata_params)
-
-    node.parm("snippet").set(
-        f'for (int i = 1; i <= chi("{level}metadata_entries"); i++) {{ \n\
-    string type = chs(sprintf("{level}metadata_%g_type", i)); \n\
-    string name = "driver:parameters:OpenEXR:" + chs(sprintf("{level}metadata_%g_key", i)); \n\
-    string value_name = sprintf("{level}metadata_%g_%s", i, type); \n\
-            \n\
-    if (type == "float") \n\
-        usd_setattrib(0, @primpath, name, chf(value_name)); \n\
-    else if (type == "int") \n\
-        usd_setattrib(0, @primpath, name, chi(value_name)); \n\
-    else if (type == "string") \n\
-        usd_setattrib(0, @primpath, name, chs(value_name)); \n\
-    else if (startswith(type, "v")) \n\
-        usd_setattrib(0, @primpath, name, chv(value_name)); \n\
-    else if (startswith(type, "bix")) \n\
-        usd_setattrib(0, @primpath, name, chp(value_name)); \n\
-    else if (type == "m33f") \n\
-        usd_setattrib(0, @primpath, name, ch3(value_name)); \n\
-    else if (type == "m44f") \n\
-        usd_setattrib(0, @primpath, name, ch4(value_name)); \n\
-}} \n\n\
-usd_setattrib(0, @primpath, "driver:parameters:artist", chs("artist"));'
-    )
+# Setting the python light group system setting
+lightgroup_node.parm("python").set(lightgroup_caller_file)
 
 # Setting the python pRef system setting
 python_node.parm("python").set(pRef_caller_file)
 
+# Setting the upstream cache settings. Farm renders cook every frame once,
+# so there the cache would only cost time and memory.
+upstream_cache_switch.parm("input").setExpression(
+    'hou.pwd().parent().parm("upstream_cache_mode").evalAsInt() if hou.isUIAvailable() else 0',
+    language=hou.exprLanguage.Python,
+)
+
+# Setting the frustum culling settings
+frustum_culling.parm("python").set(frustum_culling_file)
+frustum_culling_switch.parm("input").setExpression(
+    '1 if hou.pwd().parent().evalParm("enable_frustum_culling") else 0',
+    language=hou.exprLanguage.Python,
+)
+
+# Setting the LOD selection settings
+lod_selection.parm("python").set(lod_selection_file)
+lod_selection_switch.parm("input").setExpression(
+    '1 if hou.pwd().parent().evalParm("enable_lod_selection") else 0',
+    language=hou.exprLanguage.Python,
+)
+
+# Setting the stage optimizer settings
+stage_optimizer.parm("python").set(stage_optimizer_file)
+stage_optimizer_switch.parm("input").setExpression(
+    '1 if hou.pwd().parent().evalParm("enable_stage_optimizer") else 0',
+    language=hou.exprLanguage.Python,
+)
+
+# Setting the render pass settings, these only do something on render pass farm jobs
+render_pass.parm("python").set(render_pass_file)
+
+# Setting the fix-up settings, these only do something when fix-up rendering is on
+fixup_settings.parm("python").set(fixup_settings_file)
+
+# Setting the tile settings, these only do something on tiled farm renders
+tile_settings.parm("python").set(tile_settings_file)
+
 # Setting the render rop settings
 usdrender_rop.parm("f1").setExpression('ch("../f1")')
 usdrender_rop.parm("f2").setExpression('ch("../f2")')
@@ -394,6 +513,28 @@ usdrender_rop.parm("renderer").setExpression(
     '"BRAY_HdKarma" + ifs(strmatch(chs("../karmarendersettings/engine"), "xpu"), "XPU", "")'
 )
 
+# Setting the preview render settings, the preview ROP renders the same as the main ROP
+preview_settings.parm("python").set(preview_settings_file)
+usdrender_rop_preview.parm("f1").setExpression('ch("../usdrender_rop/f1")')
+usdrender_rop_preview.parm("f2").setExpression('ch("../usdrender_rop/f2")')
+usdrender_rop_preview.parm("f3").setExpression('ch("../usdrender_rop/f3")')
+usdrender_rop_preview.parm("rendersettings").setExpression(
+    'chs("../usdrender_rop/rendersettings")'
+)
+usdrender_rop_preview.parm("renderer").setExpression('chs("../usdrender_rop/renderer")')
+
+# Setting the split render settings. The beauty leaves out the split outputs,
+# which the split ROP renders in their own job.
+split_beauty.parm("python").set(split_settings_file)
+split_outputs.parm("python").set(split_settings_file)
+usdrender_rop_split.parm("f1").setExpression('ch("../usdrender_rop/f1")')
+usdrender_rop_split.parm("f2").setExpression('ch("../usdrender_rop/f2")')
+usdrender_rop_split.parm("f3").setExpression('ch("../usdrender_rop/f3")')
+usdrender_rop_split.parm("rendersettings").setExpression(
+    'chs("../usdrender_rop/rendersettings")'
+)
+usdrender_rop_split.parm("renderer").setExpression('chs("../usdrender_rop/renderer")')
+
 
 # Creating the HDA
 hda = hou.OpNode.createDigitalAsset(
@@ -401,7 +542,7 @@ hda = hou.OpNode.createDigitalAsset(
     "sgtk_karma",
     os.path.join(OTL_FOLDER, "sgtk_karma.otl"),
     min_num_inputs=2,
-    version="1.0.4",
+    version="1.0.5",
     ignore_external_references=True,
 )
 hda.type().setDefaultColor(hou.Color(0.9, 0.5, 0.2))
@@ -413,6 +554,27 @@ python_module = open(os.path.join(OTL_FOLDER, "python_functions_20.5.py"), "r")
 
 hda_def.addSection("PythonModule", python_module.read())
 hda_def.setExtraFileOption("python_functions/IsPython", True)
+
+# The parameter helpers of our app, the PythonModule loads these from this section
+parameters_module = open(
+    os.path.join(OTL_FOLDER, "..", "python", "tk_houdini_karma", "parameters.py"), "r"
+)
+
+hda_def.addSection("ParametersModule", parameters_module.read())
+hda_def.setExtraFileOption("ParametersModule/IsPython", True)
+
+# Likewise for the pixel samples and the tile and fix-up paths
+for section_name, file_name in (
+    ("PixelSamplesModule", "pixel_samples.py"),
+    ("AssembleTilesModule", "assemble_tiles.py"),
+    ("CompositeFixupModule", "composite_fixup.py"),
+):
+    with open(
+        os.path.join(OTL_FOLDER, "..", "python", "tk_houdini_karma", file_name), "r"
+    ) as app_module:
+        hda_def.addSection(section_name, app_module.read())
+    hda_def.setExtraFileOption(f"{section_name}/IsPython", True)
+
 hda_def.addSection("OnCreated", 'kwargs["node"].setColor(hou.Color(0.9, 0.5, 0.2))')
 hda_def.setExtraFileOption("OnCreated/IsPython", True)
 hda_def.addSection("EditableNodes", "karmarendersettings usdrender_rop")
@@ -453,6 +615,15 @@ hda_parameters.append(
         script_callback_language=hou.scriptLanguage.Python,
     )
 )
+hda_parameters.append(
+    hou.ButtonParmTemplate(
+        "estimateRenderCost",
+        "Estimate render cost",
+        join_with_next=True,
+        script_callback="hou.phm().estimate_render_cost(kwargs['node'])",
+        script_callback_language=hou.scriptLanguage.Python,
+    )
+)
 hda_parameters.append(
     hou.ButtonParmTemplate(
         "openFolder",
@@ -512,6 +683,29 @@ reference_parameter(
     "pathtracedsamples",
 )
 
+hda_parameters.append(
+    hou.FloatParmTemplate(
+        "noise_target",
+        "Noise target",
+        1,
+        default_value=(0.02,),
+        min=0.001,
+        max=0.2,
+        join_with_next=True,
+        help="Relative noise we want in the render. The denoiser allows for twice as much noise.",
+    )
+)
+
+hda_parameters.append(
+    hou.ButtonParmTemplate(
+        "solve_noise_target",
+        "Solve samples",
+        script_callback="hou.phm().solve_noise_target(kwargs['node'])",
+        script_callback_language=hou.scriptLanguage.Python,
+        help="Renders a low sample probe and sets the pixel samples that reach the noise target. Only the pixel samples get solved, secondary samples and light quality stay as they are set.",
+    )
+)
+
 reference_parameter(
     karma_render_settings,
     hda_parameters,
@@ -603,6 +797,15 @@ motion_blur_settings = hou.FolderParmTemplate(
     conditionals={hou.parmCondType.DisableWhen: "{ enablemblur != 1 }"},
 )
 reference_parameter(karma_render_settings, motion_blur_settings, "mblur")
+motion_blur_settings.addParmTemplate(
+    hou.ToggleParmTemplate(
+        "mblur_auto",
+        "Use velocity blur where possible",
+        help="Prims with constant topology and velocities get velocity blur with a single geometry sample, "
+        "only the other prims get deformation samples.",
+        disable_when="{ mblur != 1 }",
+    )
+)
 reference_parameter(
     karma_render_settings,
     motion_blur_settings,
@@ -662,6 +865,168 @@ rendering.addParmTemplate(rendering_aspect_ratio)
 
 hda_parameters.append(rendering)
 
+# Optimization
+optimization = hou.FolderParmTemplate("optimization", "Optimization")
+
+optimization.addParmTemplate(
+    hou.MenuParmTemplate(
+        "upstream_cache_mode",
+        "Cache input stage",
+        ("off", "memory"),
+        ("Off", "In memory"),
+        help="Caches the incoming stage, so the upstream network doesn't cook again on every frame change. "
+        "Farm renders cook every frame once, so they don't use the cache.",
+    )
+)
+
+optimization.addParmTemplate(
+    hou.ButtonParmTemplate(
+        "analyze_upstream_stage",
+        "Analyze input stage",
+        script_callback="hou.phm().analyze_upstream_stage(kwargs['node'])",
+        script_callback_language=hou.scriptLanguage.Python,
+        help="Finds the time dependent nodes upstream and measures how long the stage takes to cook without the cache, "
+        "while filling the cache and from the filled cache.",
+    )
+)
+
+optimization.addParmTemplate(hou.SeparatorParmTemplate("optimization_sep_0"))
+
+optimization.addParmTemplate(
+    hou.ToggleParmTemplate(
+        "enable_stage_optimizer",
+        "Optimize stage",
+        help="Deactivates proxy, guide and invisible prims and instances repeated references before rendering.",
+    )
+)
+
+optimization.addParmTemplate(
+    hou.ButtonParmTemplate(
+        "show_stage_optimizer_report",
+        "Show optimizer report",
+        script_callback="hou.phm().show_stage_optimizer_report(kwargs['node'])",
+        script_callback_language=hou.scriptLanguage.Python,
+        disable_when="{ enable_stage_optimizer == 0 enable_lod_selection == 0 mblur_auto == 0 }",
+    )
+)
+
+optimization.addParmTemplate(hou.SeparatorParmTemplate("optimization_sep_1"))
+
+optimization.addParmTemplate(
+    hou.ToggleParmTemplate(
+        "enable_frustum_culling",
+        "Frustum culling",
+        help="Removes prims that stay outside of the render camera on the rendered frame.",
+    )
+)
+
+optimization.addParmTemplate(
+    hou.MenuParmTemplate(
+        "frustum_cull_mode",
+        "Cull mode",
+        ("deactivate", "proxy"),
+        ("Deactivate", "Set to proxy purpose"),
+        disable_when="{ enable_frustum_culling == 0 }",
+    )
+)
+
+optimization.addParmTemplate(
+    hou.FloatParmTemplate(
+        "frustum_padding",
+        "Frustum padding",
+        1,
+        default_value=(0.25,),
+        min=0,
+        max=2,
+        help="Widens the camera frustum by this fraction, so objects just outside the frame still show up in reflections.",
+        disable_when="{ enable_frustum_culling == 0 }",
+    )
+)
+
+optimization.addParmTemplate(
+    hou.FloatParmTemplate(
+        "frustum_margin",
+        "Shadow margin",
+        1,
+        default_value=(10.0,),
+        min=0,
+        max=100,
+        help="Grows the bounds of every prim by this distance in scene units before testing them against the frustum, so prims next to the frame that cast shadows or show up in reflections stay. Raise it for long shadows of a low sun.",
+        disable_when="{ enable_frustum_culling == 0 }",
+    )
+)
+
+optimization.addParmTemplate(hou.SeparatorParmTemplate("optimization_sep_2"))
+
+optimization.addParmTemplate(
+    hou.ToggleParmTemplate(
+        "enable_lod_selection",
+        "LOD selection",
+        help="Switches assets to the lowest level of detail that holds up at their size in the render camera.",
+    )
+)
+
+optimization.addParmTemplate(
+    hou.StringParmTemplate(
+        "lod_variant_set",
+        "LOD variant set",
+        1,
+        default_value=("lod",),
+        help="Variant set with the levels of detail. Variants get sorted by the number in their name, lowest number first means highest detail.",
+        disable_when="{ enable_lod_selection == 0 }",
+    )
+)
+
+optimization.addParmTemplate(
+    hou.FloatParmTemplate(
+        "lod_full_detail_size",
+        "Full detail size",
+        1,
+        default_value=(256,),
+        min=1,
+        max=4096,
+        help="Assets of at least this many pixels use the highest detail. Every time the size halves we go one level of detail down.",
+        disable_when="{ enable_lod_selection == 0 }",
+    )
+)
+
+optimization.addParmTemplate(
+    hou.IntParmTemplate(
+        "lod_frame_chunk",
+        "Frames per chunk",
+        1,
+        default_value=(10,),
+        min=1,
+        max=100,
+        help="The LODs are picked once for every chunk of frames, using the frame in the chunk where an asset is closest to the camera.",
+        disable_when="{ enable_lod_selection == 0 }",
+    )
+)
+
+optimization.addParmTemplate(
+    hou.ButtonParmTemplate(
+        "compare_lod_cost",
+        "Compare LOD cost",
+        script_callback="hou.phm().compare_lod_cost(kwargs['node'])",
+        script_callback_language=hou.scriptLanguage.Python,
+        help="Renders a probe of the current frame with and without LOD selection, and reports the render time and memory of both.",
+    )
+)
+
+optimization.addParmTemplate(hou.SeparatorParmTemplate("optimization_sep_3"))
+
+optimization.addParmTemplate(
+    hou.ButtonParmTemplate(
+        "update_optimizations",
+        "Update optimizations",
+        script_callback="hou.phm().update_optimizations(kwargs['node'])",
+        script_callback_language=hou.scriptLanguage.Python,
+        help="Clears the cached frustum culling and LOD selection, so they get computed again.",
+    )
+)
+
+hda_parameters.append(optimization)
+
 
 # AOVs
 aovs = hou.FolderParmTemplate("aovs", "AOVs")
@@ -891,8 +1256,23 @@ light_operator_list = hou.StringParmTemplate(
     },
 )
 
+light_prim_pattern = hou.StringParmTemplate(
+    "light_group_pattern_#",
+    "Light Prims",
+    1,
+    string_type=hou.stringParmType.Regular,
+    naming_scheme=hou.parmNamingScheme.Base1,
+    help="Prim pattern or collection of lights in this light group, for example /lights/key_* or /lights.collection:rim",
+    tags={
+        "script_action": "import loputils\nloputils.selectPrimsInParm(kwargs, True)",
+        "script_action_icon": "BUTTONS_reselect",
+        "sidefx::usdpathtype": "primlist",
+    },
+)
+
 light_group_item.addParmTemplate(light_group_name)
 light_group_item.addParmTemplate(light_operator_list)
+light_group_item.addParmTemplate(light_prim_pattern)
 light_group_item.addParmTemplate(hou.SeparatorParmTemplate("lgSep#"))
 
 light_groups.addParmTemplate(light_group_item)
@@ -917,6 +1297,35 @@ prefs.addParmTemplate(
     )
 )
 
+prefs.addParmTemplate(
+    hou.ToggleParmTemplate(
+        "pref_world_space",
+        "World space pRefs",
+        help="Computes the pRefs in world space instead of the local space of every prim.",
+    )
+)
+
+prefs.addParmTemplate(
+    hou.ToggleParmTemplate(
+        "pref_disk_cache",
+        "Cache pRefs to disk",
+        help="Bakes the pRefs to a USD file once, so farm tasks load that file instead of computing the pRefs again. "
+        "The file belongs to the saved hip file, changes to the geometry get a new file once you save.",
+    )
+)
+
+prefs.addParmTemplate(
+    hou.StringParmTemplate(
+        "pref_cache_dir",
+        "Cache directory",
+        1,
+        default_value=("$HIP/cache/pref",),
+        string_type=hou.stringParmType.FileReference,
+        file_type=hou.fileType.Directory,
+        disable_when="{ pref_disk_cache == 0 }",
+    )
+)
+
 pref_item = hou.FolderParmTemplate(
     "pref_select",
     "pRefs",
@@ -958,6 +1367,209 @@ aovs.addParmTemplate(prefs)
 
 hda_parameters.append(aovs)
 
+# Farm
+farm = hou.FolderParmTemplate("farm", "Farm")
+
+farm.addParmTemplate(
+    hou.FloatParmTemplate(
+        "preview_resolution_scale",
+        "Preview resolution",
+        1,
+        default_value=(0.25,),
+        min=0.05,
+        max=1,
+        help="Fraction of the resolution the preview job renders at.",
+    )
+)
+
+farm.addParmTemplate(
+    hou.FloatParmTemplate(
+        "preview_sample_scale",
+        "Preview samples",
+        1,
+        default_value=(0.25,),
+        min=0.05,
+        max=1,
+        help="Fraction of the pixel samples the preview job renders with.",
+    )
+)
+
+farm.addParmTemplate(
+    hou.StringParmTemplate(
+        "preview_picture",
+        "Preview output",
+        1,
+        string_type=hou.stringParmType.FileReference,
+        is_hidden=True,
+    )
+)
+
+farm.addParmTemplate(hou.SeparatorParmTemplate("farm_sep_1"))
+
+farm.addParmTemplate(
+    hou.IntParmTemplate(
+        "tiles_x",
+        "Tiles X",
+        1,
+        default_value=(2,),
+        min=1,
+        max=16,
+        join_with_next=True,
+        help="Amount of tiles horizontally when rendering frames in tiles on the farm.",
+    )
+)
+
+farm.addParmTemplate(
+    hou.IntParmTemplate(
+        "tiles_y",
+        "Tiles Y",
+        1,
+        default_value=(2,),
+        min=1,
+        max=16,
+        help="Amount of tiles vertically when rendering frames in tiles on the farm.",
+    )
+)
+
+farm.addParmTemplate(hou.SeparatorParmTemplate("farm_sep_2"))
+
+farm.addParmTemplate(
+    hou.ToggleParmTemplate(
+        "split_deep",
+        "Separate deep job",
+        disable_when="{ dcm == 0 }",
+        help="Renders the deep camera map in its own job, after the beauty of each frame is done.",
+    )
+)
+
+farm.addParmTemplate(
+    hou.ToggleParmTemplate(
+        "split_crypto",
+        "Separate cryptomatte job",
+        disable_when="{ doprimcrypto == 0 domtlcrypto == 0 }",
+        help="Renders the cryptomattes in their own job, together with a separate deep job.",
+    )
+)
+
+farm.addParmTemplate(
+    hou.FloatParmTemplate(
+        "split_sample_scale",
+        "Separate job samples",
+        1,
+        default_value=(0.5,),
+        min=0.05,
+        max=1,
+        disable_when="{ split_deep == 0 split_crypto == 0 }",
+        help="Fraction of the pixel samples the separate deep and cryptomatte job renders with.",
+    )
+)
+
+farm.addParmTemplate(hou.SeparatorParmTemplate("farm_sep_3"))
+
+render_pass_item = hou.FolderParmTemplate(
+    "render_passes",
+    "Render Passes",
+    folder_type=hou.folderType.MultiparmBlock,
+)
+
+render_pass_name = hou.StringParmTemplate(
+    "render_pass_name_#",
+    "Name",
+    1,
+    string_type=hou.stringParmType.Regular,
+    naming_scheme=hou.parmNamingScheme.Base1,
+    help="Name of the render pass, which gets added to the output name. Letters and numbers only.",
+)
+
+render_pass_prims = hou.StringParmTemplate(
+    "render_pass_prims_#",
+    "Render Prims",
+    1,
+    string_type=hou.stringParmType.Regular,
+    naming_scheme=hou.parmNamingScheme.Base1,
+    help="Prim pattern or collection of the prims this pass renders. "
+    "Prims outside of the render and matte prims get deactivated, except for cameras and lights.",
+    tags={
+        "script_action": "import loputils\nloputils.selectPrimsInParm(kwargs, True)",
+        "script_action_icon": "BUTTONS_reselect",
+        "sidefx::usdpathtype": "primlist",
+    },
+)
+
+render_pass_matte = hou.StringParmTemplate(
+    "render_pass_matte_#",
+    "Matte Prims",
+    1,
+    string_type=hou.stringParmType.Regular,
+    naming_scheme=hou.parmNamingScheme.Base1,
+    help="Prim pattern or collection of the prims this pass renders as a matte holdout.",
+    tags={
+        "script_action": "import loputils\nloputils.selectPrimsInParm(kwargs, True)",
+        "script_action_icon": "BUTTONS_reselect",
+        "sidefx::usdpathtype": "primlist",
+    },
+)
+
+render_pass_mode = hou.MenuParmTemplate(
+    "render_pass_mode_#",
+    "Farm Mode",
+    ("light", "medium", "heavy"),
+    ("Light", "Medium", "Heavy"),
+    default_value=2,
+    naming_scheme=hou.parmNamingScheme.Base1,
+    help="Farm mode of the job of this pass, heavier passes run fewer tasks per worker.",
+)
+
+render_pass_item.addParmTemplate(render_pass_name)
+render_pass_item.addParmTemplate(render_pass_prims)
+render_pass_item.addParmTemplate(render_pass_matte)
+render_pass_item.addParmTemplate(render_pass_mode)
+render_pass_item.addParmTemplate(hou.SeparatorParmTemplate("renderPassSep#"))
+
+farm.addParmTemplate(render_pass_item)
+
+hda_parameters.append(farm)
+
+# Fix-up
+fixup = hou.FolderParmTemplate("fixup", "Fix-up")
+
+fixup.addParmTemplate(
+    hou.ToggleParmTemplate(
+        "fixup_enable",
+        "Fix-up render",
+        help="Only renders the fix-up region, to a fixup folder next to the frames. "
+        "Composite the fix-up to put the region back into the existing frames.",
+    )
+)
+
+fixup.addParmTemplate(
+    hou.FloatParmTemplate(
+        "fixup_region",
+        "Fix-up region",
+        4,
+        default_value=(0, 0, 1, 1),
+        min=0,
+        max=1,
+        disable_when="{ fixup_enable == 0 }",
+        help="Screen space region to render, as xmin, ymin, xmax and ymax from 0 to 1 "
+        "starting at the bottom left. Can be animated to follow what needs fixing.",
+    )
+)
+
+fixup.addParmTemplate(
+    hou.ButtonParmTemplate(
+        "composite_fixup",
+        "Composite fix-up",
+        disable_when="{ fixup_enable == 0 }",
+        script_callback="hou.phm().composite_fixup(kwargs['node'])",
+        script_callback_language=hou.scriptLanguage.Python,
+        help="Composites the rendered fix-up of the frame range into the existing frames of every AOV, "
+        "keeping their metadata. Farm fix-up renders do this for you.",
+    )
+)
+
+hda_parameters.append(fixup)
+
 # Metadata
 metadata_folder = hou.FolderParmTemplate("metadata_folder", "Metadata")
 metadata_parmblock = _get_metadata_block()
@@ -0,0 +1,42 @@
+"""This python file gets inserted into the fixup_settings node in the OTL.
+When fix-up rendering is on, we only render the fix-up region of the frame and write it
+to a fixup folder next to the final images. Compositing the fix-up puts that region
+back into the existing frames afterwards."""
+
+import hou
+
+from pxr import Gf, UsdRender
+
+
+def set_fixup_settings(karma_node: hou.Node, stage) -> None:
+    """Crops the render to the fix-up region of this frame and renders every product
+    to its fix-up path.
+
+    Args:
+        karma_node: SGTK Karma node
+        stage: Stage we're working in
+    """
+    if not karma_node.evalParm("fixup_enable"):
+        return
+
+    settings_path = karma_node.node("karmarendersettings").evalParm("primpath")
+    render_settings = UsdRender.Settings.Get(stage, settings_path)
+    if not render_settings:
+        return
+
+    # The region can be animated, so it follows whatever needs fixing
+    fixup_window = Gf.Vec4f(*karma_node.parmTuple("fixup_region").eval())
+    render_settings.GetDataWindowNDCAttr().Set(fixup_window)
+
+    for product_path in render_settings.GetProductsRel().GetForwardedTargets():
+        render_product = UsdRender.Product.Get(stage, product_path)
+        render_product.GetDataWindowNDCAttr().Set(fixup_window)
+
+        product_name_attribute = render_product.GetProductNameAttr()
+        product_name = product_name_attribute.Get(hou.frame())
+        product_name_attribute.Set(
+            karma_node.hm().get_fixup_path(product_name), hou.frame()
+        )
+
+
+set_fixup_settings(hou.pwd().parent(), hou.pwd().editableStage())
@@ -0,0 +1,212 @@
+"""This python file gets inserted into the frustum_culling node in the OTL.
+It removes the prims that don't enter the render camera on the frame we cook,
+so Karma doesn't have to load them. We only look at the frame we cook, as the
+stage only holds the animation of upstream nodes at that frame. Prims close to the
+frustum stay, as they can still cast shadows or show up in reflections."""
+
+import hou
+
+from pxr import Gf, Sdf, Usd, UsdGeom, UsdLux
+
+# Purposes we compute bounds for, these are the ones that show up in the render
+RENDER_PURPOSES = [UsdGeom.Tokens.default_, UsdGeom.Tokens.render]
+
+
+def get_padded_frustum(camera, frame: float, padding: float) -> Gf.Frustum:
+    """Returns the frustum of the camera, widened by the padding so objects just outside
+    the frame still show up in reflections and motion blur.
+
+    Args:
+        camera: Render camera
+        frame: Frame to get the frustum at
+        padding: Fraction of the frustum size to add on every side
+    """
+    frustum = camera.GetCamera(frame).frustum
+    window = frustum.GetWindow()
+    frustum.SetWindow(
+        Gf.Range2d(window.GetMin() * (1 + padding), window.GetMax() * (1 + padding))
+    )
+
+    return frustum
+
+
+def has_protected_children(prim, camera_path: str, prototype_paths: set) -> bool:
+    """Checks if a prim holds the camera, lights or prototypes, which we can't cull.
+
+    Args:
+        prim: Prim we want to cull
+        camera_path: Path of the render camera
+        prototype_paths: Paths of the point instancer prototypes
+    """
+    if Sdf.Path(camera_path).HasPrefix(prim.GetPath()):
+        return True
+
+    for child_prim in Usd.PrimRange(prim):
+        if (
+            child_prim.HasAPI(UsdLux.LightAPI)
+            or child_prim.GetPath() in prototype_paths
+        ):
+            return True
+
+    return False
+
+
+def get_padded_bounds(bbox_cache, prim, margin: float) -> Gf.BBox3d:
+    """Returns the world space bounds of a prim, grown by the margin on every side.
+    Empty bounds stay empty.
+
+    Args:
+        bbox_cache: Bounding box cache of the frame
+        prim: Prim to get the bounds of
+        margin: Distance in world units to add on every side
+    """
+    bounds_range = bbox_cache.ComputeWorldBound(prim).ComputeAlignedRange()
+    if bounds_range.IsEmpty():
+        return Gf.BBox3d(bounds_range)
+
+    margin_vector = Gf.Vec3d(margin, margin, margin)
+    return Gf.BBox3d(
+        Gf.Range3d(
+            bounds_range.GetMin() - margin_vector, bounds_range.GetMax() + margin_vector
+        )
+    )
+
+
+def get_culled_prims(
+    stage,
+    camera_path: str,
+    frame_samples: list,
+    padding: float,
+    margin: float,
+    prototype_paths: set,
+) -> list:
+    """Finds the prims whose bounds don't intersect the camera frustum on any frame sample.
+    The bounds get grown by the margin first, so prims next to the frame that cast
+    shadows or show up in reflections stay.
+    Parents that are fully outside the frustum get culled as a whole,
+    so we don't have to look at their children. Parents that hold something we can't
+    cull get looked at child by child.
+
+    Args:
+        stage: Stage we're working in
+        camera_path: Path of the render camera
+        frame_samples: Frames to test
+        padding: Fraction of the frustum size to add on every side
+        margin: Distance in world units to grow the prim bounds by
+        prototype_paths: Paths of the point instancer prototypes
+
+    Returns:
+        culled_prims: List of prim paths to cull
+    """
+    camera = UsdGeom.Camera(stage.GetPrimAtPath(camera_path))
+    if not camera:
+        return []
+
+    frustums = [
+        get_padded_frustum(camera, frame, padding) for frame in frame_samples
+    ]
+    bbox_caches = [
+        UsdGeom.BBoxCache(frame, RENDER_PURPOSES, useExtentsHint=True)
+        for frame in frame_samples
+    ]
+
+    culled_prims = []
+    prim_range = iter(Usd.PrimRange(stage.GetPseudoRoot(), Usd.PrimDefaultPredicate))
+    for prim in prim_range:
+        if prim.IsPseudoRoot():
+            continue
+
+        # Never touch the camera, lights, prototypes and render settings
+        if (
+            not prim.IsA(UsdGeom.Imageable)
+            or prim.IsA(UsdGeom.Camera)
+            or prim.HasAPI(UsdLux.LightAPI)
+            or prim.GetPath() in prototype_paths
+        ):
+            prim_range.PruneChildren()
+            continue
+
+        is_outside = True
+        for frustum, bbox_cache in zip(frustums, bbox_caches):
+            bounds = get_padded_bounds(bbox_cache, prim, margin)
+            if bounds.GetRange().IsEmpty() or frustum.Intersects(bounds):
+                is_outside = False
+                break
+
+        if not is_outside:
+            continue
+
+        # Look at the children one by one, so what we can't cull in here stays
+        if has_protected_children(prim, camera_path, prototype_paths):
+            continue
+
+        prim_range.PruneChildren()
+        culled_prims.append(prim.GetPath())
+
+    return culled_prims
+
+
+def cull_stage(karma_node: hou.Node, culling_node: hou.Node, stage) -> None:
+    """Culls all prims that stay outside of the camera frustum on the frame we cook.
+    The result is cached on the node per input cook and frame, so changing the cull mode
+    or cooking the same frame again doesn't go over the stage again.
+    Updating the optimizations on the HDA clears it.
+
+    Args:
+        karma_node: SGTK Karma node
+        culling_node: The frustum_culling node, which keeps our cache
+        stage: Stage we're working in
+    """
+    camera_path = karma_node.evalParm("camera")
+    if not camera_path:
+        return
+
+    hm = karma_node.hm()
+    frame_samples = hm.get_frame_samples(karma_node)
+    padding = karma_node.evalParm("frustum_padding")
+    margin = karma_node.evalParm("frustum_margin")
+    # The input cooks again whenever the stage above us changes
+    cache_key = (
+        culling_node.input(0).cookCount(),
+        camera_path,
+        tuple(frame_samples),
+        padding,
+        margin,
+    )
+
+    cache = culling_node.cachedUserData("culled_prims")
+    if cache and cache[0] == cache_key:
+        culled_prims = cache[1]
+    else:
+        culled_prims = get_culled_prims(
+            stage,
+            camera_path,
+            frame_samples,
+            padding,
+            margin,
+            hm.get_prototype_paths(stage),
+        )
+        culling_node.setCachedUserData("culled_prims", (cache_key, culled_prims))
+
+    use_proxy = karma_node.parm("frustum_cull_mode").evalAsString() == "proxy"
+    layer = stage.GetEditTarget().GetLayer()
+    get_attribute_spec = hm.get_attribute_spec
+
+    with Sdf.ChangeBlock():
+        for prim_path in culled_prims:
+            prim_spec = Sdf.CreatePrimInLayer(layer, prim_path)
+
+            if not use_proxy:
+                prim_spec.active = False
+                continue
+
+            # Proxies stay visible in the viewport, but Karma skips them
+            get_attribute_spec(
+                prim_spec,
+                UsdGeom.Tokens.purpose,
+                Sdf.ValueTypeNames.Token,
+                Sdf.VariabilityUniform,
+            ).default = UsdGeom.Tokens.proxy
+
+
+cull_stage(hou.pwd().parent(), hou.pwd(), hou.pwd().editableStage())
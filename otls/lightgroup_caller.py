@@ -0,0 +1,39 @@
+"""This python file gets inserted into the lightgroup_caller node in the OTL.
+It writes the light group LPE tags onto the light prims, so we never have
+to edit the light nodes upstream."""
+
+import hou
+
+from pxr import Sdf
+
+LPE_TAG_ATTRIBUTE = "inputs:karma:light:lpetag"
+
+
+def set_light_group_lpe_tags(karma_node: hou.Node, stage) -> None:
+    """Writes the LPE tags for all our light groups in a single change block.
+    The light group membership gets resolved and cached by the HDA module.
+
+    Args:
+        karma_node: SGTK Karma node
+        stage: Stage we're working in
+    """
+    light_group_membership = karma_node.hm().get_light_group_membership(karma_node)
+
+    # Validation happens when updating the light groups, here the first group wins
+    light_owners = {}
+    for light_group_name, light_prims in light_group_membership.items():
+        for light_prim in light_prims:
+            light_owners.setdefault(light_prim, light_group_name)
+
+    layer = stage.GetEditTarget().GetLayer()
+    get_attribute_spec = karma_node.hm().get_attribute_spec
+
+    with Sdf.ChangeBlock():
+        for prim_path, light_group_name in light_owners.items():
+            prim_spec = Sdf.CreatePrimInLayer(layer, prim_path)
+            get_attribute_spec(
+                prim_spec, LPE_TAG_ATTRIBUTE, Sdf.ValueTypeNames.String
+            ).default = f"LG_{light_group_name}"
+
+
+set_light_group_lpe_tags(hou.pwd().parent(), hou.pwd().editableStage())
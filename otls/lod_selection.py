@@ -0,0 +1,209 @@
+"""This python file gets inserted into the lod_selection node in the OTL.
+It switches assets to the lowest level of detail that still holds up at the size
+they show up in the render camera. The LODs get picked once for every chunk of frames,
+so they don't pop from frame to frame."""
+
+import math
+import re
+
+import hou
+
+from pxr import Sdf, Usd, UsdGeom
+
+# Purposes we compute bounds for, these are the ones that show up in the render
+RENDER_PURPOSES = [UsdGeom.Tokens.default_, UsdGeom.Tokens.render]
+
+
+def get_chunk_frames(karma_node: hou.Node) -> list[float]:
+    """Returns the frames of the chunk the cooked frame is in, with the shutter around
+    the chunk when motion blur is on. Chunks start at the first frame we render.
+    Subframes, like the motion blur samples, belong to the chunk of their frame.
+
+    Args:
+        karma_node: SGTK Karma node
+    """
+    chunk_size = karma_node.evalParm("lod_frame_chunk")
+    first_frame = 1
+    if karma_node.evalParm("trange") > 0:
+        first_frame = int(karma_node.evalParm("f1"))
+
+    chunk_index = (math.floor(hou.frame()) - first_frame) // chunk_size
+    chunk_start = first_frame + chunk_index * chunk_size
+    chunk_frames = [float(chunk_start + offset) for offset in range(chunk_size)]
+    if karma_node.evalParm("enablemblur"):
+        chunk_frames = [chunk_frames[0] - 0.5] + chunk_frames + [chunk_frames[-1] + 0.5]
+
+    return chunk_frames
+
+
+def sort_lod_variants(variant_names: list[str]) -> list[str]:
+    """Sorts variants from the highest to the lowest level of detail, using the number
+    in their name. This makes sure lod10 comes after lod2.
+
+    Args:
+        variant_names: Names of the variants in the LOD variant set
+    """
+    return sorted(
+        variant_names,
+        key=lambda variant_name: [
+            int(token) if token.isdigit() else token
+            for token in re.split(r"(\d+)", variant_name)
+        ],
+    )
+
+
+def get_screen_size(bounds, camera, resolution: tuple) -> float:
+    """Computes how many pixels the bounding sphere of a prim covers in the render.
+
+    Args:
+        bounds: World space bounds of the prim
+        camera: Gf camera at the frame we're looking at
+        resolution: Render resolution in pixels
+    """
+    bounds_range = bounds.ComputeAlignedRange()
+    if bounds_range.IsEmpty():
+        return 0.0
+
+    radius = bounds_range.GetSize().GetLength() / 2
+    camera_position = camera.transform.ExtractTranslation()
+    distance = (bounds_range.GetMidpoint() - camera_position).GetLength() - radius
+
+    # The camera is inside the bounds, so it's as big as it gets
+    if distance <= 0:
+        return math.inf
+
+    projected_size = 2 * radius * camera.focalLength / distance
+    return max(
+        projected_size / camera.horizontalAperture * resolution[0],
+        projected_size / camera.verticalAperture * resolution[1],
+    )
+
+
+def get_lod_selections(
+    stage,
+    camera_path: str,
+    variant_set_name: str,
+    frames: list,
+    resolution: tuple,
+    full_detail_size: float,
+) -> dict:
+    """Picks a LOD variant for every asset with the LOD variant set. Assets of at least the
+    full detail size use the first LOD, and every time the size halves we go one LOD down.
+    We use the biggest size over all frames, which is the frame where the asset is closest
+    to the camera, so an asset never gets too coarse. The other frames come from the time
+    samples on the stage, animation that only lives in the network shows the cooked frame.
+
+    Args:
+        stage: Stage we're working in
+        camera_path: Path of the render camera
+        variant_set_name: Name of the LOD variant set on our assets
+        frames: Frames of the chunk to look at
+        resolution: Render resolution in pixels
+        full_detail_size: Size in pixels from which we use the highest LOD
+
+    Returns:
+        lod_selections: Dict of prim paths and the variant to select
+    """
+    camera = UsdGeom.Camera(stage.GetPrimAtPath(camera_path))
+    if not camera:
+        return {}
+
+    cameras = [camera.GetCamera(frame) for frame in frames]
+    bbox_caches = [
+        UsdGeom.BBoxCache(frame, RENDER_PURPOSES, useExtentsHint=True)
+        for frame in frames
+    ]
+
+    lod_selections = {}
+    prim_range = iter(Usd.PrimRange(stage.GetPseudoRoot(), Usd.PrimDefaultPredicate))
+    for prim in prim_range:
+        if not prim.GetVariantSets().HasVariantSet(variant_set_name):
+            continue
+
+        # Nested assets follow the LOD of the asset they're in
+        prim_range.PruneChildren()
+
+        variant_names = sort_lod_variants(
+            prim.GetVariantSet(variant_set_name).GetVariantNames()
+        )
+        if not variant_names:
+            continue
+
+        screen_size = max(
+            get_screen_size(bbox_cache.ComputeWorldBound(prim), frame_camera, resolution)
+            for frame_camera, bbox_cache in zip(cameras, bbox_caches)
+        )
+
+        if screen_size >= full_detail_size:
+            lod_index = 0
+        elif screen_size <= 0:
+            lod_index = len(variant_names) - 1
+        else:
+            lod_index = int(math.log2(full_detail_size / screen_size))
+
+        lod_selections[prim.GetPath()] = variant_names[
+            min(lod_index, len(variant_names) - 1)
+        ]
+
+    return lod_selections
+
+
+def select_lods(karma_node: hou.Node, lod_node: hou.Node, stage) -> None:
+    """Sets the LOD variant of all assets based on their size in the render camera.
+    The selection is cached on the node per chunk of frames, so all frames in the chunk,
+    and their motion blur samples, get the same LODs. Updating the optimizations on the
+    HDA clears it.
+
+    Args:
+        karma_node: SGTK Karma node
+        lod_node: The lod_selection node, which keeps our cache
+        stage: Stage we're working in
+    """
+    camera_path = karma_node.evalParm("camera")
+    variant_set_name = karma_node.evalParm("lod_variant_set")
+    if not camera_path or not variant_set_name:
+        return
+
+    frames = get_chunk_frames(karma_node)
+    resolution = (
+        karma_node.evalParm("resolutionx"),
+        karma_node.evalParm("resolutiony"),
+    )
+    full_detail_size = karma_node.evalParm("lod_full_detail_size")
+
+    # The input cooks again whenever the stage above us changes. A time dependent
+    # input cooks on every frame though, there the chunk is the key.
+    input_node = lod_node.input(0)
+    input_revision = None if input_node.isTimeDependent() else input_node.cookCount()
+    cache_key = (
+        input_revision,
+        camera_path,
+        variant_set_name,
+        tuple(frames),
+        resolution,
+        full_detail_size,
+    )
+
+    cache = lod_node.cachedUserData("lod_selections")
+    if cache and cache[0] == cache_key:
+        lod_selections = cache[1]
+    else:
+        lod_selections = get_lod_selections(
+            stage, camera_path, variant_set_name, frames, resolution, full_detail_size
+        )
+        lod_node.setCachedUserData("lod_selections", (cache_key, lod_selections))
+
+    layer = stage.GetEditTarget().GetLayer()
+
+    with Sdf.ChangeBlock():
+        for prim_path, variant_name in lod_selections.items():
+            prim_spec = Sdf.CreatePrimInLayer(layer, prim_path)
+            prim_spec.variantSelections[variant_set_name] = variant_name
+
+    lod_report = {}
+    for variant_name in lod_selections.values():
+        lod_report[variant_name] = lod_report.get(variant_name, 0) + 1
+    lod_node.setCachedUserData("lod_report", lod_report)
+
+
+select_lods(hou.pwd().parent(), hou.pwd(), hou.pwd().editableStage())
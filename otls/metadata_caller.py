@@ -0,0 +1,121 @@
+"""This python file gets inserted into the sg_metadata node in the OTL.
+It authors both the user and ShotGrid metadata on the render products in a single pass."""
+
+import hou
+
+from pxr import Gf, Sdf
+
+METADATA_PREFIX = "driver:parameters:OpenEXR:"
+
+# Metadata type, USD value type and the Gf type to construct values with
+METADATA_TYPES = {
+    "float": (Sdf.ValueTypeNames.Float, None),
+    "int": (Sdf.ValueTypeNames.Int, None),
+    "string": (Sdf.ValueTypeNames.String, None),
+    "v2f": (Sdf.ValueTypeNames.Float2, Gf.Vec2f),
+    "v2i": (Sdf.ValueTypeNames.Int2, Gf.Vec2i),
+    "v3f": (Sdf.ValueTypeNames.Float3, Gf.Vec3f),
+    "v3i": (Sdf.ValueTypeNames.Int3, Gf.Vec3i),
+    "box2f": (Sdf.ValueTypeNames.Float4, Gf.Vec4f),
+    "box2i": (Sdf.ValueTypeNames.Int4, Gf.Vec4i),
+    "m33f": (Sdf.ValueTypeNames.Matrix3d, Gf.Matrix3d),
+    "m44f": (Sdf.ValueTypeNames.Matrix4d, Gf.Matrix4d),
+}
+
+
+def convert_metadata_value(metadata_type: str, value: tuple):
+    """Converts an evaluated parameter tuple to something USD accepts for the metadata type.
+
+    Args:
+        metadata_type: Metadata type key, such as 'v3f'
+        value: Evaluated parameter tuple
+    """
+    gf_type = METADATA_TYPES[metadata_type][1]
+    if gf_type is None:
+        return value[0]
+
+    return gf_type(*value)
+
+
+def get_metadata_entries(metadata_node: hou.Node) -> list[tuple]:
+    """Reads all metadata entries from a node with a metadata multiparm block.
+
+    Args:
+        metadata_node: Node with the metadata_entries multiparm
+
+    Returns:
+        metadata_entries: List of (attribute name, value type, value, time dependent)
+    """
+    metadata_entries = []
+    for entry_index in range(1, metadata_node.evalParm("metadata_entries") + 1):
+        metadata_key = metadata_node.evalParm(f"metadata_{entry_index}_key")
+        if not metadata_key:
+            continue
+
+        # Menus evaluate to their index, we need the token of the type
+        metadata_type = metadata_node.parm(
+            f"metadata_{entry_index}_type"
+        ).evalAsString()
+        value_parm = metadata_node.parmTuple(f"metadata_{entry_index}_{metadata_type}")
+
+        metadata_entries.append(
+            (
+                METADATA_PREFIX + metadata_key,
+                METADATA_TYPES[metadata_type][0],
+                convert_metadata_value(metadata_type, value_parm.eval()),
+                value_parm.isTimeDependent(),
+            )
+        )
+
+    return metadata_entries
+
+
+def author_render_product_metadata(
+    karma_node: hou.Node, metadata_node: hou.Node, stage
+) -> None:
+    """Writes the user and ShotGrid metadata to all render products in one pass.
+    Values that don't change over time are written as defaults, so only the
+    animated metadata ends up as time samples.
+
+    Args:
+        karma_node: SGTK Karma node
+        metadata_node: Node with the ShotGrid metadata, this node
+        stage: Stage we're working in
+    """
+    metadata_entries = get_metadata_entries(karma_node)
+    metadata_entries += get_metadata_entries(metadata_node)
+    metadata_entries.append(
+        (
+            "driver:parameters:artist",
+            Sdf.ValueTypeNames.String,
+            metadata_node.evalParm("artist"),
+            False,
+        )
+    )
+
+    ls = hou.LopSelectionRule()
+    ls.setPathPattern("/Render/** & %type:RenderProduct")
+    paths = ls.expandedPaths(stage=stage)
+
+    layer = stage.GetEditTarget().GetLayer()
+    get_attribute_spec = karma_node.hm().get_attribute_spec
+
+    # Only animated metadata reads the frame, otherwise this node would
+    # become time dependent and cook on every frame
+    if any(entry[3] for entry in metadata_entries):
+        frame = hou.frame()
+
+    with Sdf.ChangeBlock():
+        for path in paths:
+            prim_spec = Sdf.CreatePrimInLayer(layer, path)
+
+            for name, value_type, value, is_time_dependent in metadata_entries:
+                attribute_spec = get_attribute_spec(prim_spec, name, value_type)
+
+                if is_time_dependent:
+                    layer.SetTimeSample(attribute_spec.path, frame, value)
+                else:
+                    attribute_spec.default = value
+
+
+author_render_product_metadata(hou.pwd().parent(), hou.pwd(), hou.pwd().editableStage())
@@ -1,8 +1,14 @@
 """This python file gets inserted into the pRef_caller node in the OTL."""
 
+import os
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
 import hou
+import numpy
 
-from pxr import Sdf, UsdGeom
+from pxr import Sdf, UsdGeom, Vt
 
 
 def get_prefs_list(karma_node: hou.node) -> list[dict]:
@@ -26,38 +32,369 @@ def get_prefs_list(karma_node: hou.node) -> list[dict]:
         pref_info["pref_name"] = f"pRef_{karma_node.parm(pref_name_parm).eval()}"
         pref_info["pref_path"] = f"{karma_node.parm(pref_path_parm).eval()}/**"
         pref_info["pref_source_frame"] = karma_node.parm(pref_source_frame_parm).eval()
+        pref_info["pref_world_space"] = karma_node.evalParm("pref_world_space")
 
         prefs_list.append(pref_info)
 
     return prefs_list
 
 
-def compute_pref_point_references(karma_node: hou.Node, stage) -> None:
+def get_points_attribute(prim):
+    """Returns the attribute with the positions we compute the pRef from.
+    Point instancers store their instance positions in their own attribute.
+
+    Args:
+        prim: Point based or point instancer prim
+    """
+    if prim.IsA(UsdGeom.PointInstancer):
+        return UsdGeom.PointInstancer(prim).GetPositionsAttr()
+
+    return UsdGeom.PointBased(prim).GetPointsAttr()
+
+
+def get_pref_prim_paths(stage, pref_path: str) -> list:
+    """Expands the pRef path to all prims we can compute a pRef for,
+    which are meshes, curves, points and point instancers.
+
+    Args:
+        stage: Stage we're working in
+        pref_path: Prim pattern of the pRef
+    """
+    ls = hou.LopSelectionRule()
+    ls.setPathPattern(pref_path)
+
+    prim_paths = []
+    for prim_path in ls.expandedPaths(stage=stage):
+        prim = stage.GetPrimAtPath(prim_path)
+        if prim.IsA(UsdGeom.PointBased) or prim.IsA(UsdGeom.PointInstancer):
+            prim_paths.append(prim_path)
+
+    return prim_paths
+
+
+def get_topology_counts(prim, frame: float) -> tuple:
+    """Returns the point count and the sizes of the topology arrays of a prim.
+    These change whenever the topology does.
+
+    Args:
+        prim: Prim to get the counts of
+        frame: Frame to get the topology at
+    """
+    if prim.IsA(UsdGeom.Mesh):
+        mesh = UsdGeom.Mesh(prim)
+        topology_attributes = [
+            mesh.GetFaceVertexCountsAttr(),
+            mesh.GetFaceVertexIndicesAttr(),
+        ]
+    elif prim.IsA(UsdGeom.Curves):
+        topology_attributes = [UsdGeom.Curves(prim).GetCurveVertexCountsAttr()]
+    elif prim.IsA(UsdGeom.PointInstancer):
+        topology_attributes = [UsdGeom.PointInstancer(prim).GetProtoIndicesAttr()]
+    else:
+        # Points have no topology besides how many there are
+        topology_attributes = []
+
+    return tuple(
+        len(attribute.Get(frame) or ())
+        for attribute in [get_points_attribute(prim)] + topology_attributes
+    )
+
+
+def get_source_points(pref_cache: dict, new_pref_cache: dict, cache_key: tuple, prim):
+    """Returns the points of a prim at the pRef source frame. Points are cached per prim,
+    so when only some of the pRefs change we don't read the other prims again.
+
+    Args:
+        pref_cache: Cache with the points of the previous cook
+        new_pref_cache: Cache for this cook, only holding the prims we still use
+        cache_key: Input revision, source frame and the geometry key of the prim
+        prim: Prim to get the points of
+    """
+    if cache_key in pref_cache:
+        new_pref_cache[cache_key] = pref_cache[cache_key]
+        return pref_cache[cache_key]
+
+    points = get_points_attribute(prim).Get(cache_key[1])
+    new_pref_cache[cache_key] = points
+    return points
+
+
+def transform_points(points, matrix) -> Vt.Vec3fArray:
+    """Transforms points to world space. This runs on a thread pool,
+    NumPy releases the GIL while it does the actual math.
+
+    Args:
+        points: Points in local space
+        matrix: Local to world transform of the prim
+    """
+    points_array = numpy.asarray(points, dtype=numpy.float64)
+    matrix_array = numpy.array(matrix, dtype=numpy.float64)
+    world_points = points_array @ matrix_array[:3, :3] + matrix_array[3, :3]
+
+    return Vt.Vec3fArray.FromNumpy(world_points.astype(numpy.float32))
+
+
+def get_geometry_key(
+    stage, prim_paths: list, frame: float, world_space: bool, input_revision
+) -> tuple:
+    """Returns what we key the cached pRef of these prims on. When we know the revision
+    of the input stage the prim paths are enough. A time dependent input cooks on every
+    frame, there we add the topology counts, and the transforms for world space pRefs.
+    We don't hash the points themselves, that meant reading every point on every cook.
+
+    Args:
+        stage: Stage we're working in
+        prim_paths: Paths of all prims in the pRef
+        frame: pRef source frame
+        world_space: Whether the pRef is computed in world space
+        input_revision: Cook count of the input, or None if it's time dependent
+
+    Returns:
+        geometry_key: One tuple per prim, starting with its path
+    """
+    if input_revision is not None:
+        return tuple((str(prim_path),) for prim_path in prim_paths)
+
+    xform_cache = UsdGeom.XformCache(frame)
+
+    geometry_key = []
+    for prim_path in prim_paths:
+        prim = stage.GetPrimAtPath(prim_path)
+        prim_key = (str(prim_path), get_topology_counts(prim, frame))
+        if world_space:
+            prim_key += (xform_cache.GetLocalToWorldTransform(prim),)
+        geometry_key.append(prim_key)
+
+    return tuple(geometry_key)
+
+
+def get_pref_cache_file(cache_directory: str, pref_data: dict, prim_paths: list) -> str:
+    """Returns the path of the USD file a pRef gets cached to. Everything the pRef
+    depends on is part of the file name, so a changed pRef gets a new file.
+    Farm tasks cook the stage in their own session, so instead of the input cook count
+    we use the time the hip file was saved. Changes to the geometry get a new file
+    once the hip file is saved.
+
+    Args:
+        cache_directory: Directory to cache pRefs to
+        pref_data: pRef information
+        prim_paths: Paths of all prims in the pRef
+    """
+    hip_file = hou.hipFile.path()
+    hip_file_time = os.path.getmtime(hip_file) if os.path.isfile(hip_file) else 0
+    cache_key = (
+        pref_data["pref_path"],
+        pref_data["pref_source_frame"],
+        pref_data["pref_world_space"],
+        hip_file,
+        hip_file_time,
+        tuple(str(prim_path) for prim_path in prim_paths),
+    )
+    cache_hash = zlib.crc32(repr(cache_key).encode())
+
+    return os.path.join(
+        cache_directory, f"{pref_data['pref_name']}_{cache_hash:08x}.usdc"
+    ).replace(os.sep, "/")
+
+
+def write_pref_primvars(layer: Sdf.Layer, pref_primvars: list[tuple]) -> None:
+    """Writes pRef primvars to a layer in a single change block.
+
+    Args:
+        layer: Layer to write to
+        pref_primvars: List of prim paths, pRef names and points
+    """
+    with Sdf.ChangeBlock():
+        for prim_path, pref_name, points in pref_primvars:
+            prim_spec = Sdf.CreatePrimInLayer(layer, prim_path)
+            primvar_name = f"primvars:{pref_name}"
+
+            if primvar_name in prim_spec.attributes:
+                primvar_spec = prim_spec.attributes[primvar_name]
+            else:
+                primvar_spec = Sdf.AttributeSpec(
+                    prim_spec, primvar_name, Sdf.ValueTypeNames.Color3fArray
+                )
+                primvar_spec.SetInfo(
+                    UsdGeom.Tokens.interpolation, UsdGeom.Tokens.vertex
+                )
+
+            primvar_spec.default = points
+
+
+def export_pref_cache(cache_file: str, pref_primvars: list[tuple]) -> None:
+    """Writes pRef primvars to a USD file on disk. Several farm tasks can
+    do this at the same time, so we write to a temporary file first.
+
+    Args:
+        cache_file: USD file to write to
+        pref_primvars: List of prim paths, pRef names and points
+    """
+    cache_layer = Sdf.Layer.CreateAnonymous()
+    write_pref_primvars(cache_layer, pref_primvars)
+
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    temporary_file = f"{cache_file[:-5]}_{uuid.uuid4().hex}.usdc"
+    cache_layer.Export(temporary_file)
+    os.replace(temporary_file, cache_file)
+
+
+def get_pref_primvars(
+    pref_cache: dict,
+    new_pref_cache: dict,
+    input_revision,
+    pref_data: dict,
+    stage,
+    geometry_key: tuple,
+) -> list[tuple]:
+    """Reads the source points for all prims in a pRef. World space pRefs share a
+    single transform cache and get transformed in parallel.
+
+    Args:
+        pref_cache: Cache with the points of the previous cook
+        new_pref_cache: Cache for this cook
+        input_revision: Cook count of the input, or None if it's time dependent
+        pref_data: pRef information
+        stage: Stage we're working in
+        geometry_key: Geometry key of all prims in the pRef
+
+    Returns:
+        pref_primvars: List of prim paths, pRef names and points
+    """
+    source_frame = pref_data["pref_source_frame"]
+    xform_cache = UsdGeom.XformCache(source_frame)
+
+    # Reading from the stage isn't thread safe, so we do that first
+    pref_prim_paths = []
+    pref_points = []
+    matrices = []
+    for prim_key in geometry_key:
+        prim_path = prim_key[0]
+        prim = stage.GetPrimAtPath(prim_path)
+        cache_key = (input_revision, source_frame) + prim_key
+        points = get_source_points(pref_cache, new_pref_cache, cache_key, prim)
+        if points is None:
+            continue
+
+        pref_prim_paths.append(prim_path)
+        pref_points.append(points)
+        if pref_data["pref_world_space"]:
+            matrices.append(xform_cache.GetLocalToWorldTransform(prim))
+
+    if pref_data["pref_world_space"]:
+        with ThreadPoolExecutor() as executor:
+            pref_points = list(executor.map(transform_points, pref_points, matrices))
+
+    return [
+        (prim_path, pref_data["pref_name"], points)
+        for prim_path, points in zip(pref_prim_paths, pref_points)
+    ]
+
+
+def get_pref_layer(
+    pref_node: hou.Node,
+    input_revision,
+    pref_primvars_to_read: list[tuple],
+    stage,
+) -> Sdf.Layer:
+    """Returns an in-memory layer with the pRef primvars. The layer is kept on the node
+    and only rebuilt when the input or one of the pRefs changes, so every frame we cook
+    gets the exact same layer with time-independent default values.
+
+    Args:
+        pref_node: The pRef_caller node, which keeps our caches
+        input_revision: Cook count of the input, or None if it's time dependent
+        pref_primvars_to_read: List of pRef information and their geometry keys
+        stage: Stage we're working in
+    """
+    pref_layer_key = (
+        input_revision,
+        tuple(
+            (tuple(pref_data.items()), geometry_key)
+            for pref_data, geometry_key in pref_primvars_to_read
+        ),
+    )
+    cached_pref_layer = pref_node.cachedUserData("pref_layer")
+    if cached_pref_layer and cached_pref_layer[0] == pref_layer_key:
+        return cached_pref_layer[1]
+
+    pref_cache = pref_node.cachedUserData("pref_cache") or {}
+    new_pref_cache = {}
+
+    pref_primvars = []
+    for pref_data, geometry_key in pref_primvars_to_read:
+        pref_primvars += get_pref_primvars(
+            pref_cache, new_pref_cache, input_revision, pref_data, stage, geometry_key
+        )
+
+    pref_node.setCachedUserData("pref_cache", new_pref_cache)
+
+    pref_layer = Sdf.Layer.CreateAnonymous("pref")
+    write_pref_primvars(pref_layer, pref_primvars)
+
+    pref_node.setCachedUserData("pref_layer", (pref_layer_key, pref_layer))
+    return pref_layer
+
+
+def compute_pref_point_references(
+    karma_node: hou.Node, pref_node: hou.Node, stage
+) -> None:
     """Computes pref point references and adds them as primvars to our stage.
     Based on this blog post by Andreas Kjær-Jensen: https://www.andreaskj.com/live-pref-in-solaris/
 
+    The primvars are written as defaults to a layer that we sublayer, and that layer is
+    reused on every frame as long as the pRefs don't change. With disk caching enabled,
+    every pRef gets baked to a USD file once instead, so farm tasks don't have to
+    evaluate the stage at the source frame again.
+
     Args:
         karma_node: SGTK Karma node
+        pref_node: The pRef_caller node, which keeps our caches
         stage: Stage we're working in
     """
     prefs_list = get_prefs_list(karma_node)
+    use_disk_cache = karma_node.evalParm("pref_disk_cache")
+    cache_directory = karma_node.evalParm("pref_cache_dir")
+
+    # The input cooks again whenever the stage above us changes, so its cook count
+    # tells us when the points might have moved
+    input_node = pref_node.input(0)
+    input_revision = None if input_node.isTimeDependent() else input_node.cookCount()
 
+    pref_primvars_to_read = []
+    pref_layers = []
     for pref_data in prefs_list:
-        ls = hou.LopSelectionRule()
-        ls.setPathPattern(pref_data["pref_path"] + " & %type:Mesh")
-        paths = ls.expandedPaths(stage=stage)
-
-        for prim in paths:
-            prim = stage.GetPrimAtPath(prim)
-            primvarsapi = UsdGeom.PrimvarsAPI(prim)
-            points = prim.GetAttribute("points")
-            points_values = points.Get(pref_data["pref_source_frame"])
-            primvar = primvarsapi.CreatePrimvar(
-                pref_data["pref_name"],
-                Sdf.ValueTypeNames.Color3fArray,
-                UsdGeom.Tokens.vertex,
-            )
-            primvar.Set(points_values)
-
-
-compute_pref_point_references(hou.pwd().parent(), hou.pwd().editableStage())
+        paths = get_pref_prim_paths(stage, pref_data["pref_path"])
+
+        if use_disk_cache:
+            cache_file = get_pref_cache_file(cache_directory, pref_data, paths)
+            if not os.path.isfile(cache_file):
+                geometry_key = tuple((str(prim_path),) for prim_path in paths)
+                export_pref_cache(
+                    cache_file,
+                    get_pref_primvars({}, {}, None, pref_data, stage, geometry_key),
+                )
+            pref_layers.append(cache_file)
+            continue
+
+        geometry_key = get_geometry_key(
+            stage,
+            paths,
+            pref_data["pref_source_frame"],
+            pref_data["pref_world_space"],
+            input_revision,
+        )
+        pref_primvars_to_read.append((pref_data, geometry_key))
+
+    if pref_primvars_to_read:
+        pref_layer = get_pref_layer(
+            pref_node, input_revision, pref_primvars_to_read, stage
+        )
+        pref_layers.append(pref_layer.identifier)
+
+    layer = stage.GetEditTarget().GetLayer()
+    for pref_layer_path in pref_layers:
+        layer.subLayerPaths.append(pref_layer_path)
+
+
+compute_pref_point_references(hou.pwd().parent(), hou.pwd(), hou.pwd().editableStage())
@@ -0,0 +1,66 @@
+"""This python file gets inserted into the preview_settings node in the OTL.
+It turns the render into a cheap preview of just the beauty, at a lower resolution
+and sample count, which gets rendered by the preview ROP."""
+
+import hou
+
+from pxr import UsdRender
+
+def scale_attribute(prim, attribute_name: str, scale: float) -> None:
+    """Scales an integer attribute, or every component of an integer vector attribute.
+
+    Args:
+        prim: Prim with the attribute
+        attribute_name: Name of the attribute
+        scale: Amount to scale by
+    """
+    attribute = prim.GetAttribute(attribute_name)
+    value = attribute.Get() if attribute else None
+    if not value:
+        return
+
+    if isinstance(value, int):
+        attribute.Set(max(int(value * scale), 1))
+    else:
+        attribute.Set(type(value)(*(max(int(size * scale), 1) for size in value)))
+
+
+def set_preview_settings(karma_node: hou.Node, stage) -> None:
+    """Reduces the render to the beauty product, renders it to the preview path
+    and scales the resolution and samples down.
+
+    Args:
+        karma_node: SGTK Karma node
+        stage: Stage we're working in
+    """
+    settings_path = karma_node.node("karmarendersettings").evalParm("primpath")
+    render_settings = UsdRender.Settings.Get(stage, settings_path)
+    if not render_settings:
+        return
+
+    # Previews only render the beauty, the first product
+    products_relationship = render_settings.GetProductsRel()
+    product_paths = products_relationship.GetForwardedTargets()[:1]
+    products_relationship.SetTargets(product_paths)
+
+    resolution_scale = karma_node.evalParm("preview_resolution_scale")
+    sample_scale = karma_node.evalParm("preview_sample_scale")
+
+    scale_attribute(render_settings.GetPrim(), "resolution", resolution_scale)
+    scale_attribute(
+        render_settings.GetPrim(),
+        karma_node.hm().get_pixel_samples_attribute(karma_node),
+        sample_scale,
+    )
+
+    for product_path in product_paths:
+        render_product = UsdRender.Product.Get(stage, product_path)
+        scale_attribute(render_product.GetPrim(), "resolution", resolution_scale)
+
+        # The product name is time sampled, so we set the name for this frame
+        render_product.GetProductNameAttr().Set(
+            karma_node.evalParm("preview_picture"), hou.frame()
+        )
+
+
+set_preview_settings(hou.pwd().parent(), hou.pwd().editableStage())
@@ -1,8 +1,65 @@
 """These python functions are accessed by the create_otl.py program
 so we can import and link them to our Houdini OTL."""
 
-import hou
 import re
+import time
+import zlib
+from functools import lru_cache
+
+import hou
+import toolutils
+from pxr import Sdf, Usd, UsdGeom, UsdLux
+
+# LOP node types that create lights, without namespace or version
+LIGHT_NODE_TYPE_NAMES = (
+    "light",
+    "domelight",
+    "distantlight",
+    "karmaphysicalsky",
+    "karmaskydomelight",
+)
+
+# Prefixes of the render vars we manage ourselves, in the order we add them
+AUTOMATED_RENDER_VAR_PREFIXES = ("LG_", "pRef_")
+
+# Rough size of a single point sample, used to estimate the memory of the motion blur samples
+BYTES_PER_POINT_SAMPLE = 12
+
+# Amount of frames we cook when measuring how long the input stage takes to cook
+STAGE_COOK_SAMPLE_FRAMES = 5
+
+# The parameter helpers of our ShotGrid app are stored in a section of this HDA when
+# we build it, so we write parameters the same way without needing a running engine.
+parameters = toolutils.createModuleFromSection(
+    "sgtk_karma_parameters",
+    hou.lopNodeTypeCategory().nodeType("sgtk_karma"),
+    "ParametersModule",
+)
+set_parm_value = parameters.set_parm_value
+bulk_parm_edit = parameters.bulk_parm_edit
+get_multiparm_values = parameters.get_multiparm_values
+set_multiparm_values = parameters.set_multiparm_values
+
+# The same goes for where the pixel samples live and where tiles and fix-ups get rendered to,
+# so the Python Script LOPs inside our node match the app and the farm jobs.
+pixel_samples = toolutils.createModuleFromSection(
+    "sgtk_karma_pixel_samples",
+    hou.lopNodeTypeCategory().nodeType("sgtk_karma"),
+    "PixelSamplesModule",
+)
+get_pixel_samples_attribute = pixel_samples.get_pixel_samples_attribute
+assemble_tiles = toolutils.createModuleFromSection(
+    "sgtk_karma_assemble_tiles",
+    hou.lopNodeTypeCategory().nodeType("sgtk_karma"),
+    "AssembleTilesModule",
+)
+get_tile_path = assemble_tiles.get_tile_path
+get_tile_window = assemble_tiles.get_tile_window
+get_fixup_path = toolutils.createModuleFromSection(
+    "sgtk_karma_composite_fixup",
+    hou.lopNodeTypeCategory().nodeType("sgtk_karma"),
+    "CompositeFixupModule",
+).get_fixup_path
 
 
 class ValidationError(Exception):
@@ -29,6 +86,46 @@ def render_locally(karma_node: hou.Node) -> None:
     app.render_locally(karma_node)
 
 
+def estimate_render_cost(karma_node: hou.Node) -> None:
+    """This function runs the render cost estimate function from our ShotGrid app.py"""
+    import sgtk
+
+    eng = sgtk.platform.current_engine()
+    app = eng.apps["tk-houdini-karma"]
+
+    app.estimate_render_cost(karma_node)
+
+
+def compare_lod_cost(karma_node: hou.Node) -> None:
+    """This function runs the LOD cost comparison from our ShotGrid app.py"""
+    import sgtk
+
+    eng = sgtk.platform.current_engine()
+    app = eng.apps["tk-houdini-karma"]
+
+    app.compare_lod_cost(karma_node)
+
+
+def solve_noise_target(karma_node: hou.Node) -> None:
+    """This function runs the noise target function from our ShotGrid app.py"""
+    import sgtk
+
+    eng = sgtk.platform.current_engine()
+    app = eng.apps["tk-houdini-karma"]
+
+    app.solve_noise_target(karma_node)
+
+
+def composite_fixup(karma_node: hou.Node) -> None:
+    """This function runs the composite fix-up function from our ShotGrid app.py"""
+    import sgtk
+
+    eng = sgtk.platform.current_engine()
+    app = eng.apps["tk-houdini-karma"]
+
+    app.composite_fixup(karma_node)
+
+
 def open_folder(karma_node: hou.Node) -> None:
     """This function runs the open folder function from our ShotGrid app.py"""
     import sgtk
@@ -39,29 +136,115 @@ def open_folder(karma_node: hou.Node) -> None:
     app.open_folder(karma_node)
 
 
+def get_attribute_spec(
+    prim_spec: Sdf.PrimSpec, name: str, value_type, variability=Sdf.VariabilityVarying
+) -> Sdf.AttributeSpec:
+    """Returns the attribute spec with this name, creating it if it doesn't exist yet.
+    The Python Script LOPs inside our node use this to write their attributes.
+
+    Args:
+        prim_spec: Prim spec to get the attribute from
+        name: Attribute name
+        value_type: USD value type used when creating the attribute
+        variability: USD variability used when creating the attribute
+    """
+    if name in prim_spec.attributes:
+        return prim_spec.attributes[name]
+
+    return Sdf.AttributeSpec(prim_spec, name, value_type, variability)
+
+
+def get_frame_samples(karma_node: hou.Node) -> list[float]:
+    """Returns the frame we cook, with the shutter around it when motion blur is on.
+    The Python Script LOPs inside our node use this to test prims on every frame
+    they show up in.
+
+    Args:
+        karma_node: SGTK Karma node
+    """
+    frame = hou.frame()
+    frame_samples = [frame]
+    if karma_node.evalParm("enablemblur"):
+        frame_samples += [frame - 0.5, frame + 0.5]
+
+    return frame_samples
+
+
+def get_prototype_paths(stage) -> set:
+    """Returns the prototypes of all point instancers. Prototypes are often invisible
+    or sit outside the camera, while their instances still need them.
+
+    Args:
+        stage: Stage we're working in
+    """
+    prototype_paths = set()
+    for prim in stage.Traverse():
+        if prim.IsA(UsdGeom.PointInstancer):
+            prototypes_relationship = UsdGeom.PointInstancer(prim).GetPrototypesRel()
+            prototype_paths.update(prototypes_relationship.GetForwardedTargets())
+
+    return prototype_paths
+
+
 def update_resolution(karma_node: hou.Node) -> None:
     """This function updates the resolution on the karmarendersettings node inside
     the subnet. I could not get this to work with simple referencing expressions."""
     karma_render_settings = karma_node.node("karmarendersettings")
-    karma_render_settings.parm("res_mode").set("Manual")
-    karma_render_settings.parm("res_mode").pressButton()
-    karma_render_settings.parm("resolutionx").set(karma_node.parm("resolutionx").eval())
-    karma_render_settings.parm("resolutiony").set(karma_node.parm("resolutiony").eval())
+    if set_parm_value(karma_render_settings.parm("res_mode"), "Manual"):
+        karma_render_settings.parm("res_mode").pressButton()
+    set_parm_value(
+        karma_render_settings.parm("resolutionx"), karma_node.parm("resolutionx").eval()
+    )
+    set_parm_value(
+        karma_render_settings.parm("resolutiony"), karma_node.parm("resolutiony").eval()
+    )
+
+
+@lru_cache(maxsize=None)
+def get_light_node_types() -> tuple[hou.NodeType]:
+    """Returns all versions of the LOP node types that create lights."""
+    return tuple(
+        node_type
+        for node_type in hou.lopNodeTypeCategory().nodeTypes().values()
+        if node_type.nameComponents()[2] in LIGHT_NODE_TYPE_NAMES
+    )
+
+
+def get_light_nodes(network: hou.Node) -> list[hou.Node]:
+    """Returns all light LOPs inside a network. Houdini keeps the instances of every
+    node type up to date when nodes get created or deleted, so we use those as our
+    light index instead of going over every node in the network.
+
+    Args:
+        network: LOP network to find the lights in
+
+    Returns:
+        light_nodes: All light nodes inside the network, including subnets
+    """
+    network_path = f"{network.path()}/"
 
+    light_nodes = []
+    for node_type in get_light_node_types():
+        for node in node_type.instances():
+            if node.path().startswith(network_path):
+                light_nodes.append(node)
 
-def clear_all_automated_lightgroup_lpe_tags(all_nodes: list[hou.Node]) -> None:
-    """Deletes all LPE tags that starts with LG_ from all lights in scene.
+    return light_nodes
+
+
+def clear_all_automated_lightgroup_lpe_tags(light_nodes: list[hou.Node]) -> None:
+    """Deletes all LPE tags that starts with LG_ from the given lights.
 
     Args:
-        all_nodes: List of all the nodes in the scene.
+        light_nodes: List of the light nodes in the scene.
     """
-    for node in all_nodes:
-        if node.type().name().startswith("light"):
-            lpe_param = node.parm("xn__inputskarmalightlpetag_wcbff")
-            if lpe_param:
-                for expression in lpe_param.eval().split():
-                    if expression.startswith("LG_"):
-                        lpe_param.set("")
+    for node in light_nodes:
+        lpe_param = node.parm("xn__inputskarmalightlpetag_wcbff")
+        if not lpe_param:
+            continue
+
+        if any(tag.startswith("LG_") for tag in lpe_param.eval().split()):
+            lpe_param.set("")
 
 
 def get_lightgroup_user_settings(karma_node: hou.Node) -> dict:
@@ -72,111 +255,239 @@ def get_lightgroup_user_settings(karma_node: hou.Node) -> dict:
         karma_node: SGTK Karma node
 
     Returns:
-        light_groups_info: Dict with info about all our custom light groups
+        light_groups_info: Dict with the selected light nodes and the
+            prim pattern of all our custom light groups
     """
-    light_group_multiparm_count = karma_node.parm("light_groups_select").eval()
     light_groups_info = {}
 
-    for light_group_index in range(1, light_group_multiparm_count + 1):
-        light_group_name_parm = f"light_group_name_{light_group_index}"
-        selected_light_lops_parm = f"select_light_lops_{light_group_index}"
+    for light_group in get_multiparm_values(karma_node, "light_groups_select"):
+        light_group_name = light_group["light_group_name_#"]
+        light_groups_info[light_group_name] = (
+            tuple(light_group["select_light_lops_#"].split()),
+            light_group["light_group_pattern_#"],
+        )
 
-        light_group_name = karma_node.parm(light_group_name_parm).eval()
-        selected_light_lops = karma_node.parm(selected_light_lops_parm).eval()
+    return light_groups_info
 
-        light_groups_info[light_group_name] = selected_light_lops.split()
 
-    return light_groups_info
+def get_light_prims_from_nodes(
+    karma_node: hou.Node, stage, light_nodes: tuple
+) -> list[str]:
+    """Returns the light prims that the given light nodes have authored.
+    Nodes like references or SOP imports can bring in several lights
+    below the prims they modify, so we look at those as well.
+
+    Args:
+        karma_node: SGTK Karma node, used for resolving relative node paths
+        stage: Stage to find the lights in
+        light_nodes: Paths to the selected light nodes
+    """
+    light_prims = []
+    for light in light_nodes:
+        light_node = karma_node.node(light)
+        if light_node is None:
+            continue
+
+        for prim_path in light_node.lastModifiedPrims():
+            root_prim = stage.GetPrimAtPath(prim_path)
+            if not root_prim:
+                continue
+
+            for prim in Usd.PrimRange(root_prim):
+                if prim.HasAPI(UsdLux.LightAPI):
+                    light_prims.append(str(prim.GetPath()))
+
+    return light_prims
+
+
+def get_light_prims_from_pattern(
+    input_node: hou.LopNode, stage, pattern: str
+) -> list[str]:
+    """Expands a prim pattern or collection to all light prims it matches.
+
+    Args:
+        input_node: LOP node whose stage the pattern gets expanded on
+        stage: Stage of that node
+        pattern: Prim pattern, can contain collections
+    """
+    selection_rule = hou.LopSelectionRule()
+    selection_rule.setPathPattern(pattern)
+
+    light_prims = []
+    for prim_path in selection_rule.expandedPaths(lopnode=input_node):
+        prim = stage.GetPrimAtPath(prim_path)
+        if prim and prim.HasAPI(UsdLux.LightAPI):
+            light_prims.append(str(prim_path))
+
+    return light_prims
 
 
-def set_lightgroups_lpe_tags(light_groups_info: dict) -> None:
-    """Validates the light groups, then goes over all lights in
-    the dict and adds the correct LPE tags.
+def get_light_group_membership(karma_node: hou.Node) -> dict[str, tuple[str]]:
+    """Resolves which light prims belong to each light group. Expanding patterns
+    on big stages is slow, so the result is cached on the node until the stage
+    coming into the SGTK Karma node or the light group settings change.
 
     Args:
-        light_groups_info: Dict with all light groups
+        karma_node: SGTK Karma node
+
+    Returns:
+        light_group_membership: Dict of light group names and their light prims
+    """
+    input_node = karma_node.node("input")
+    light_groups_info = get_lightgroup_user_settings(karma_node)
+
+    # The input node cooks every time the incoming stage changes, so its cook count
+    # works as a revision number for that stage. Getting the stage cooks it first,
+    # otherwise we would compare against the count of an outdated cook.
+    stage = input_node.stage()
+    cache_key = (input_node.cookCount(), tuple(light_groups_info.items()))
+    cache = karma_node.cachedUserData("light_group_membership")
+    if cache and cache[0] == cache_key:
+        return cache[1]
+
+    light_group_membership = {}
+    for light_group_name, (light_nodes, pattern) in light_groups_info.items():
+        light_prims = get_light_prims_from_nodes(karma_node, stage, light_nodes)
+        if pattern:
+            light_prims += get_light_prims_from_pattern(input_node, stage, pattern)
+
+        light_group_membership[light_group_name] = tuple(dict.fromkeys(light_prims))
+
+    karma_node.setCachedUserData(
+        "light_group_membership", (cache_key, light_group_membership)
+    )
+    return light_group_membership
+
+
+def validate_light_groups(karma_node: hou.Node) -> None:
+    """Validates the light groups. The LPE tags themselves get written
+    on the stage by the lightgroup_caller node inside the SGTK Karma node.
+
+    Args:
+        karma_node: SGTK Karma node
 
     Raises:
         ValidationError: Error when validation fails
     """
-    lights_list = []
-    for light_group in light_groups_info:
+    for light_group, (light_nodes, _pattern) in get_lightgroup_user_settings(
+        karma_node
+    ).items():
         if not re.match(r"^[A-Za-z0-9_]+$", light_group):
             error_message = f"Error: Invalid light group name: '{light_group}'. You can only use letters, numbers and underscores."
             raise ValidationError(error_message)
 
-        for light in light_groups_info[light_group]:
-            try:
-                if light not in lights_list:
-                    lights_list.append(light)
-                    light_node = hou.node(light)
-
-                    lpe_control_parm = light_node.parm(
-                        "xn__inputskarmalightlpetag_control_xpbff"
-                    )
-                    lpe_control_parm.set("set")
-                    lpe_control_parm.pressButton()
-
-                    lpe_param = light_node.parm("xn__inputskarmalightlpetag_wcbff")
-                    lpe_param.set(f"LG_{light_group}")
-                    lpe_param.pressButton()
-
-                else:
-                    error_message = f"Error: Node {light} is in several light groups. A light can only be in one group."
-                    raise ValidationError(error_message)
-
-            except AttributeError:
+        for light in light_nodes:
+            if karma_node.node(light) is None:
                 error_message = f"Error: Can't set LPE tags for node {light} in light group list {light_group}."
                 raise ValidationError(error_message)
 
+    light_owners = {}
+    for light_group, light_prims in get_light_group_membership(karma_node).items():
+        for light_prim in light_prims:
+            owner = light_owners.setdefault(light_prim, light_group)
+            if owner != light_group:
+                error_message = f"Error: Light {light_prim} is in light groups {owner} and {light_group}. A light can only be in one group."
+                raise ValidationError(error_message)
+
 
-def remove_all_automated_render_vars(karma_node: hou.Node, prefix: str) -> None:
-    """Removes all lightgroups from our render vars that start with the given prefix.
-    It starts removing in reversed order so we keep the correct indexes.
+def get_render_var_prefix(render_variable: dict) -> str:
+    """Returns the automated prefix of a render var, or an empty string for user render vars.
 
     Args:
-        karma_node: SGTK Karma node
-        prefix: Renders vars with this prefix will be removed
+        render_variable: Render var values, keyed by template name
     """
-    karma_render_settings = karma_node.node("karmarendersettings")
-    extra_render_variables = karma_render_settings.parm("extrarendervars")
-
-    lightgroups_to_remove = []
-    for i in range(1, extra_render_variables.eval() + 1):
-        if karma_render_settings.parm(f"name{i}") and karma_render_settings.parm(
-            f"name{i}"
-        ).eval().startswith(prefix):
-            lightgroups_to_remove.append(i)
+    for prefix in AUTOMATED_RENDER_VAR_PREFIXES:
+        if render_variable.get("name#", "").startswith(prefix):
+            return prefix
 
-    for i in reversed(lightgroups_to_remove):
-        # Instance indices are 1-based, but removal is 0-based
-        karma_render_settings.parm("extrarendervars").removeMultiParmInstance(i - 1)
+    return ""
 
 
-def add_all_automated_lightgroups_to_render_vars(
-    light_groups_info: dict, karma_node: hou.Node
+def reconcile_automated_render_vars(
+    karma_node: hou.Node, prefix: str, render_variables: list[dict]
 ) -> None:
-    """Adds all our lightgroups to the karma render settings additional
-    render variables.
+    """Makes the automated render vars with the given prefix match the render variables
+    we want. Only our own render vars get touched: the ones we still want get updated
+    in place, the others get removed and new ones get added at the end. User render vars
+    keep their position, expressions and values, as we never write them.
 
     Args:
-        light_groups_info: Dict of lightgroups and their information
-        karma_node: SGTK Karma render node
+        karma_node: SGTK Karma node
+        prefix: Prefix of the automated render vars to update, like 'LG_'
+        render_variables: Render vars we want for this prefix
     """
     karma_render_settings = karma_node.node("karmarendersettings")
-    extra_render_variables = karma_render_settings.parm("extrarendervars")
-
-    for light_group in light_groups_info:
-        render_variable_index = extra_render_variables.eval() + 1
-        extra_render_variables.set(render_variable_index)
-        karma_render_settings.parm(f"name{render_variable_index}").set(
-            f"LG_{light_group}"
-        )
-        karma_render_settings.parm(f"format{render_variable_index}").set("color3f")
-        karma_render_settings.parm(f"sourceName{render_variable_index}").set(
-            f"C.*<L.'LG_{light_group}'>"
+    multiparm = karma_render_settings.parm("extrarendervars")
+    current_names = [
+        render_variable.get("name#", "")
+        for render_variable in get_multiparm_values(
+            karma_render_settings, "extrarendervars"
         )
-        karma_render_settings.parm(f"sourceType{render_variable_index}").set("lpe")
+    ]
+    wanted_render_variables = {
+        render_variable["name#"]: render_variable
+        for render_variable in render_variables
+    }
+
+    # Render vars of this prefix we don't want anymore, and duplicates of the ones we do
+    removed_indices = []
+    kept_indices = {}
+    for index, name in enumerate(current_names):
+        if get_render_var_prefix({"name#": name}) != prefix:
+            continue
+        if name in wanted_render_variables and name not in kept_indices:
+            kept_indices[name] = index
+        else:
+            removed_indices.append(index)
+
+    new_render_variables = [
+        render_variable
+        for name, render_variable in wanted_render_variables.items()
+        if name not in kept_indices
+    ]
+
+    # Unchanged values don't get written, so this doesn't dirty anything when we match
+    with bulk_parm_edit(f"Update {prefix} render vars"):
+        # Removing from the back keeps the indices in front of it the same
+        for index in reversed(removed_indices):
+            multiparm.removeMultiParmInstance(index)
+
+        for name, index in kept_indices.items():
+            instance_index = index + 1 - sum(
+                1 for removed_index in removed_indices if removed_index < index
+            )
+            for template_name, value in wanted_render_variables[name].items():
+                set_parm_value(
+                    karma_render_settings.parm(
+                        template_name.replace("#", str(instance_index))
+                    ),
+                    value,
+                )
+
+        if new_render_variables:
+            set_multiparm_values(
+                karma_render_settings,
+                "extrarendervars",
+                new_render_variables,
+                start_index=len(current_names) - len(removed_indices) + 1,
+            )
+
+
+def get_lightgroup_render_vars(light_groups_info: dict) -> list[dict]:
+    """Returns the render vars for all our lightgroups.
+
+    Args:
+        light_groups_info: Dict of lightgroups and their information
+    """
+    return [
+        {
+            "name#": f"LG_{light_group}",
+            "format#": "color3f",
+            "sourceName#": f"C.*<L.'LG_{light_group}'>",
+            "sourceType#": "lpe",
+        }
+        for light_group in light_groups_info
+    ]
 
 
 def setup_light_groups(karma_node: hou.Node) -> None:
@@ -188,12 +499,14 @@ def setup_light_groups(karma_node: hou.Node) -> None:
 
     stage = karma_node.parent()
 
-    clear_all_automated_lightgroup_lpe_tags(stage.allSubChildren())
+    # Light groups used to be set on the light nodes themselves,
+    # so we still clean up the tags that older versions left behind.
+    clear_all_automated_lightgroup_lpe_tags(get_light_nodes(stage))
 
     light_groups_info = get_lightgroup_user_settings(karma_node)
 
     try:
-        set_lightgroups_lpe_tags(light_groups_info)
+        validate_light_groups(karma_node)
 
     except ValidationError as error_message:
         hou.ui.displayMessage(
@@ -202,68 +515,125 @@ def setup_light_groups(karma_node: hou.Node) -> None:
         )
         return
 
-    remove_all_automated_render_vars(karma_node, "LG_")
+    reconcile_automated_render_vars(
+        karma_node, "LG_", get_lightgroup_render_vars(light_groups_info)
+    )
 
-    add_all_automated_lightgroups_to_render_vars(light_groups_info, karma_node)
 
+def get_light_editor_node(prim) -> hou.LopNode:
+    """Returns the light node that last edited a light prim. Houdini stores the
+    nodes that edited a prim in its custom data, so we don't have to check every node.
 
-def add_all_lights_to_lightgroups(karma_node: hou.Node) -> None:
-    """adds all the lights that are found in stage.
-    
     Args:
-        karma_node: SGTK Karma node
+        prim: Light prim
+
+    Returns:
+        Light node, or None if the light wasn't made by a light node in this scene
     """
-    stage = karma_node.parent()
-    stage_nodes = stage.children()
-    light_types = [
-        "<hou.OpNodeType for Lop light::2.0>",
-        "<hou.OpNodeType for Lop domelight::3.0>",
-        "<hou.OpNodeType for Lop distantlight::2.0>",
-        "<hou.OpNodeType for Lop karmaphysicalsky>",
-        "<hou.OpNodeType for Lop karmaskydomelight>"
-    ]
+    light_node_types = get_light_node_types()
+    editor_node_ids = prim.GetCustomDataByKey("HoudiniPrimEditorNodes") or []
 
-    lightgroup_names = []
-    lightgroup_paths = []
+    for node_id in reversed(list(editor_node_ids)):
+        node = hou.nodeBySessionId(node_id)
+        if node is not None and node.type() in light_node_types:
+            return node
 
-    for node in stage_nodes:
-        if str(node.type()) in light_types:
-            relative_path = node.path()
-            lightgroup_paths.append(relative_path)
-            lightgroup_names.append(node.name())
+    return None
 
-    karma_node.parm("light_groups_select").set(str(len(lightgroup_names)))
 
-    light_group_multiparm_count = karma_node.parm("light_groups_select").eval()
+def get_stage_lights(karma_node: hou.Node) -> tuple[tuple]:
+    """Finds all lights on the stage coming into the SGTK Karma node in a single traversal.
+    This also finds lights inside subnets and references, and lights made by node types
+    we don't know about. The result is cached until the incoming stage changes.
 
-    for light_group_index in range(1, light_group_multiparm_count + 1):
-        light_group_name_parm = f"light_group_name_{light_group_index}"
-        selected_light_lops_parm = f"select_light_lops_{light_group_index}"
+    Args:
+        karma_node: SGTK Karma node
 
-        karma_node.parm(light_group_name_parm).set(lightgroup_names[light_group_index - 1])
-        karma_node.parm(selected_light_lops_parm).set(lightgroup_paths[light_group_index - 1])
+    Returns:
+        stage_lights: Tuple of light prim paths and the light node that made them, if any
+    """
+    input_node = karma_node.node("input")
+
+    # Getting the stage cooks the input first, so its cook count is up to date
+    stage = input_node.stage()
+    cache_key = input_node.cookCount()
+    cache = karma_node.cachedUserData("stage_lights")
+    if cache and cache[0] == cache_key:
+        return cache[1]
+
+    stage_lights = tuple(
+        (str(prim.GetPath()), get_light_editor_node(prim))
+        for prim in stage.Traverse(Usd.PrimDefaultPredicate)
+        if prim.HasAPI(UsdLux.LightAPI)
+    )
 
-def add_all_automated_prefs_to_render_vars(karma_node: hou.Node) -> None:
-    """Adds all our prefs to the karma render settings additional
-    render variables.
+    karma_node.setCachedUserData("stage_lights", (cache_key, stage_lights))
+    return stage_lights
+
+
+def add_all_lights_to_lightgroups(karma_node: hou.Node) -> None:
+    """Adds all the lights that are found in stage, each in its own light group.
+    Lights get selected by their light node when that node only makes this one light,
+    otherwise they get selected by their prim path.
 
     Args:
         karma_node: SGTK Karma node
     """
-    karma_render_settings = karma_node.node("karmarendersettings")
-    extra_render_variables = karma_render_settings.parm("extrarendervars")
+    stage_lights = get_stage_lights(karma_node)
+
+    lights_per_node = {}
+    for _prim_path, light_node in stage_lights:
+        lights_per_node[light_node] = lights_per_node.get(light_node, 0) + 1
+
+    light_groups = []
+    light_group_names = set()
+    for prim_path, light_node in stage_lights:
+        if light_node is not None and lights_per_node[light_node] == 1:
+            light_group_name = light_node.name()
+            light_group = {
+                "select_light_lops_#": light_node.path(),
+                "light_group_pattern_#": "",
+            }
+        else:
+            light_group_name = prim_path.rsplit("/", 1)[-1]
+            light_group = {
+                "select_light_lops_#": "",
+                "light_group_pattern_#": prim_path,
+            }
+
+        # Light group names have to be unique
+        unique_light_group_name = light_group_name
+        suffix = 2
+        while unique_light_group_name in light_group_names:
+            unique_light_group_name = f"{light_group_name}_{suffix}"
+            suffix += 1
+        light_group_names.add(unique_light_group_name)
+
+        light_group["light_group_name_#"] = unique_light_group_name
+        light_groups.append(light_group)
+
+    set_multiparm_values(karma_node, "light_groups_select", light_groups)
+
+
+def get_pref_render_vars(karma_node: hou.Node) -> list[dict]:
+    """Returns the render vars for all our prefs.
 
-    pref_count = karma_node.parm("pref_select").eval()
-    for pref_index in range(1, pref_count + 1):
-        pref_name_parm = f"pref_name_{pref_index}"
-        pref_name = f"pRef_{karma_node.parm(pref_name_parm).eval()}"
+    Args:
+        karma_node: SGTK Karma node
+    """
+    render_variables = []
+    for pref in get_multiparm_values(karma_node, "pref_select"):
+        pref_name = f"pRef_{pref['pref_name_#']}"
+        render_variables.append(
+            {
+                "name#": pref_name,
+                "format#": "color3f",
+                "sourceName#": pref_name,
+                "sourceType#": "primvar",
+            }
+        )
 
-        render_variable_index = extra_render_variables.eval() + 1
-        extra_render_variables.set(render_variable_index)
-        karma_render_settings.parm(f"name{render_variable_index}").set(pref_name)
-        karma_render_settings.parm(f"format{render_variable_index}").set("color3f")
-        karma_render_settings.parm(f"sourceName{render_variable_index}").set(pref_name)
-        karma_render_settings.parm(f"sourceType{render_variable_index}").set("primvar")
+    return render_variables
 
 
 def validate_prefs(karma_node: hou.Node) -> None:
@@ -275,11 +645,10 @@ def validate_prefs(karma_node: hou.Node) -> None:
     Raises:
         ValidationError: Error when validation fails
     """
-    pref_count = karma_node.parm("pref_select").eval()
+    prefs = get_multiparm_values(karma_node, "pref_select")
 
-    for pref_index in range(1, pref_count + 1):
-        pref_name_parm = f"pref_name_{pref_index}"
-        pref_name = f"{karma_node.parm(pref_name_parm).eval()}"
+    for pref_index, pref in enumerate(prefs, 1):
+        pref_name = f"{pref['pref_name_#']}"
 
         if pref_name == "":
             error_message = f"Error: Invalid pref name: '{pref_name}'. You can only use letters, numbers and underscores."
@@ -289,15 +658,16 @@ def validate_prefs(karma_node: hou.Node) -> None:
             error_message = f"Error: Invalid pref name: '{pref_name}'. You can only use letters, numbers and underscores."
             raise ValidationError(error_message)
 
-        pref_path_parm = f"select_pref_{pref_index}"
-        pref_path = karma_node.parm(pref_path_parm).eval()
+        pref_path = pref["select_pref_#"]
 
         if pref_path == "":
             error_message = f"Error: Invalid pref path for pref {pref_name}: '{pref_path}'. You can only use letters, numbers and underscores."
             raise ValidationError(error_message)
 
         if pref_path.startswith("/stage"):
-            karma_node.parm(pref_path_parm).set(pref_path.replace("/stage", ""))
+            karma_node.parm(f"select_pref_{pref_index}").set(
+                pref_path.replace("/stage", "")
+            )
 
 
 def setup_prefs(karma_node: hou.Node) -> None:
@@ -315,8 +685,14 @@ def setup_prefs(karma_node: hou.Node) -> None:
         )
         return
 
-    remove_all_automated_render_vars(karma_node, "pRef_")
-    add_all_automated_prefs_to_render_vars(karma_node)
+    # Make sure the pRefs get computed from scratch again
+    pref_node = karma_node.node("pRef_caller")
+    pref_node.destroyCachedUserData("pref_cache", must_exist=False)
+    pref_node.destroyCachedUserData("pref_layer", must_exist=False)
+
+    reconcile_automated_render_vars(
+        karma_node, "pRef_", get_pref_render_vars(karma_node)
+    )
 
 
 def setup_deep_settings(karma_node: hou.Node) -> None:
@@ -337,3 +713,382 @@ def setup_deep_settings(karma_node: hou.Node) -> None:
     if karma_node.parm("deep_target").eval() == 1:
         karma_render_settings.parm("dcmvars").set("/Render/Products/Vars/Beauty")
         karma_render_settings.parm("dcmofsize").set(3)
+
+
+def show_stage_optimizer_report(karma_node: hou.Node) -> None:
+    """Shows what the stage optimizer stripped from the stage, which LODs
+    got selected on their last cook and how motion blur gets sampled.
+
+    Args:
+        karma_node: SGTK Karma node
+    """
+    # Make sure our nodes cooked for the current frame
+    karma_node.node("usdrender_rop").inputs()[0].stage()
+
+    messages = []
+
+    report = karma_node.node("stage_optimizer").cachedUserData("optimizer_report")
+    if karma_node.evalParm("enable_stage_optimizer") and report:
+        messages.append(
+            f"Stage optimizer report for frame {report['frame']:g}\n\n"
+            f"Deactivated proxy and guide prims: {report['inactive_purpose']}\n"
+            f"Deactivated invisible prims: {report['inactive_invisible']}\n"
+            f"Instanced references: {report['instanceable']}\n"
+            f"Estimated geometry memory saved: {report['saved_memory'] / 1024 ** 2:.1f} MB"
+        )
+
+    lod_report = karma_node.node("lod_selection").cachedUserData("lod_report")
+    if karma_node.evalParm("enable_lod_selection") and lod_report:
+        messages.append(
+            "Selected LODs:\n"
+            + "\n".join(
+                f"{variant_name}: {count}"
+                for variant_name, count in sorted(lod_report.items())
+            )
+        )
+
+    if karma_node.evalParm("enablemblur") and karma_node.evalParm("mblur_auto"):
+        if get_animated_prims(karma_node)[1]:
+            messages.append(
+                "A time dependent node changes the whole stage, "
+                "so the motion blur LOP samples all prims."
+            )
+        else:
+            before, after = measure_motion_blur_cost(karma_node)
+            motion_blur_analysis = karma_node.node("velocity_blur").cachedUserData(
+                "motion_blur_analysis"
+            )
+            messages.append(
+                f"Prims with velocity blur: {len(motion_blur_analysis['velocity'])}\n"
+                f"Prims with deformation samples: {len(motion_blur_analysis['deformation'])}\n"
+                f"Motion blur cook time: {before[0]:.3f}s without velocity blur, "
+                f"{after[0]:.3f}s with it\n"
+                f"Point sample memory: {before[1] / 1024 ** 2:.1f} MB without velocity blur, "
+                f"{after[1] / 1024 ** 2:.1f} MB with it"
+            )
+
+    if not messages:
+        hou.ui.displayMessage("The stage optimizations haven't cooked yet.")
+        return
+
+    hou.ui.displayMessage("\n\n".join(messages))
+
+
+def update_optimizations(karma_node: hou.Node) -> None:
+    """Clears the cached frustum culling and LOD selection, so they get computed again
+    for the current stage. These are only cached per camera and frame range,
+    so this is needed after changing the scene.
+
+    Args:
+        karma_node: SGTK Karma node
+    """
+    culling_node = karma_node.node("frustum_culling")
+    culling_node.destroyCachedUserData("culled_prims", must_exist=False)
+
+    lod_node = karma_node.node("lod_selection")
+    lod_node.destroyCachedUserData("lod_selections", must_exist=False)
+
+    karma_node.node("karmarendersettings").cook(force=True)
+
+
+def get_upstream_lop_nodes(karma_node: hou.Node) -> list[hou.LopNode]:
+    """Returns all LOP nodes that build the stage coming into the SGTK Karma node.
+
+    Args:
+        karma_node: SGTK Karma node
+    """
+    input_node = karma_node.input(0)
+    if input_node is None:
+        return []
+
+    return [
+        node
+        for node in (input_node,) + input_node.inputAncestors()
+        if isinstance(node, hou.LopNode)
+    ]
+
+
+def time_stage_cook(node: hou.LopNode, frames: list[int]) -> float:
+    """Measures how long a node takes to cook its stage per frame.
+
+    Args:
+        node: Node to cook
+        frames: Frames to cook the node on
+
+    Returns:
+        cook_time: Average cook time per frame in seconds
+    """
+    start_time = time.perf_counter()
+    for frame in frames:
+        node.cook(frame_range=(frame, frame))
+
+    return (time.perf_counter() - start_time) / len(frames)
+
+
+def analyze_upstream_stage(karma_node: hou.Node) -> None:
+    """Finds the time dependent nodes upstream of the SGTK Karma node and measures
+    how long the input stage takes to cook per frame without the cache, while filling
+    the cache and from the filled cache. The cache only helps frames that cook more than
+    once in this session, so we offer it when filling it and reading it back is faster
+    than cooking a frame twice. Farm renders cook every frame once and skip the cache.
+
+    Args:
+        karma_node: SGTK Karma node
+    """
+    upstream_nodes = get_upstream_lop_nodes(karma_node)
+    if not upstream_nodes:
+        hou.ui.displayMessage("Nothing is connected to the first input.")
+        return
+
+    time_dependent_nodes = [node for node in upstream_nodes if node.isTimeDependent()]
+
+    start_frame = int(hou.frame())
+    if karma_node.evalParm("trange") > 0:
+        start_frame = int(karma_node.evalParm("f1"))
+    frames = list(range(start_frame, start_frame + STAGE_COOK_SAMPLE_FRAMES))
+
+    input_node = karma_node.node("input")
+    upstream_cache = karma_node.node("upstream_cache")
+
+    with hou.InterruptableOperation(
+        "Analyzing input stage", open_interrupt_dialog=True
+    ):
+        # Cook away from the sampled frames first, so the first timed frame isn't
+        # already cooked and every timed cook really goes over the upstream network
+        time_stage_cook(input_node, [frames[0] - 1])
+        uncached_cook_time = time_stage_cook(input_node, frames)
+
+        # Start from an empty cache, so the first pass really fills it
+        upstream_cache.parm("clearcache").pressButton()
+        filling_cook_time = time_stage_cook(upstream_cache, frames)
+        cached_cook_time = time_stage_cook(upstream_cache, frames)
+
+    message = (
+        f"{len(time_dependent_nodes)} of {len(upstream_nodes)} upstream nodes are time dependent.\n\n"
+        f"Cook time per frame without cache: {uncached_cook_time:.3f}s\n"
+        f"First cook per frame, filling the cache: {filling_cook_time:.3f}s\n"
+        f"Later cooks per frame, from the cache: {cached_cook_time:.3f}s\n\n"
+        "Farm renders cook every frame once, so they don't use the cache."
+    )
+    if time_dependent_nodes:
+        message += "\n\nTime dependent nodes:\n" + "\n".join(
+            node.path() for node in time_dependent_nodes
+        )
+
+    if (
+        not time_dependent_nodes
+        or filling_cook_time + cached_cook_time >= 2 * uncached_cook_time
+    ):
+        hou.ui.displayMessage(message + "\n\nCaching the input stage won't help here.")
+        return
+
+    choice = hou.ui.displayMessage(
+        message,
+        buttons=("Cache in memory", "Cancel"),
+        default_choice=0,
+        close_choice=1,
+    )
+    if choice == 0:
+        set_parm_value(karma_node.parm("upstream_cache_mode"), "memory")
+
+
+def get_topology_signature(prim, frame: float) -> tuple:
+    """Returns the point count and a hash of the topology of a prim at a frame.
+
+    Args:
+        prim: Point based prim
+        frame: Frame to read the geometry at
+    """
+    points = UsdGeom.PointBased(prim).GetPointsAttr().Get(frame)
+
+    topology_hash = 0
+    if prim.IsA(UsdGeom.Mesh):
+        topology = UsdGeom.Mesh(prim).GetFaceVertexIndicesAttr().Get(frame)
+    elif prim.IsA(UsdGeom.Curves):
+        topology = UsdGeom.Curves(prim).GetCurveVertexCountsAttr().Get(frame)
+    else:
+        topology = None
+    if topology is not None:
+        topology_hash = zlib.crc32(memoryview(topology))
+
+    return len(points or ()), topology_hash
+
+
+def get_animated_paths(karma_node: hou.Node) -> tuple:
+    """Returns the prims that time dependent nodes above the SGTK Karma node modify.
+    A live LOP network only holds the current frame, so for these prims the stage
+    can't tell us whether they move.
+
+    Args:
+        karma_node: SGTK Karma node
+    """
+    animated_paths = []
+    for node in get_upstream_lop_nodes(karma_node):
+        if node.isTimeDependent():
+            animated_paths += node.lastModifiedPrims()
+
+    return tuple(animated_paths)
+
+
+def is_maybe_animated(prim, animated_paths: tuple) -> bool:
+    """Checks if we can't prove a prim is static. It either has time samples,
+    or a time dependent node modified it or one of its parents.
+
+    Args:
+        prim: Prim to check
+        animated_paths: Prims that time dependent nodes modify
+    """
+    prim_path = prim.GetPath()
+    if any(prim_path.HasPrefix(animated_path) for animated_path in animated_paths):
+        return True
+
+    if UsdGeom.Xformable(prim).TransformMightBeTimeVarying():
+        return True
+
+    return prim.IsA(UsdGeom.PointBased) and (
+        UsdGeom.PointBased(prim).GetPointsAttr().ValueMightBeTimeVarying()
+    )
+
+
+def get_animated_prims(karma_node: hou.Node) -> tuple[tuple, bool]:
+    """Returns the prims we can't prove static, which the motion blur LOP samples in auto mode.
+    A live LOP network only holds the current frame, so we can't compare shutter open and
+    close here. The velocity_blur node does that on the samples of the motion blur LOP.
+    The result is cached until the incoming stage or the frame changes.
+
+    Args:
+        karma_node: SGTK Karma node
+
+    Returns:
+        animated_prims: Paths of the prims that might move
+        fallback: True when a time dependent node changes the whole stage
+    """
+    stage_node = karma_node.node("crypto_switch")
+
+    # Getting the stage cooks the node first, so its cook count is up to date
+    stage = stage_node.stage()
+    cache_key = (stage_node.cookCount(), hou.frame())
+    cache = karma_node.cachedUserData("animated_prims")
+    if cache and cache[0] == cache_key:
+        return cache[1]
+
+    animated_paths = get_animated_paths(karma_node)
+    animated_prims = tuple(
+        str(prim.GetPath())
+        for prim in stage.Traverse(Usd.PrimDefaultPredicate)
+        if prim.IsA(UsdGeom.Xformable) and is_maybe_animated(prim, animated_paths)
+    )
+
+    result = (animated_prims, Sdf.Path.absoluteRootPath in animated_paths)
+    karma_node.setCachedUserData("animated_prims", (cache_key, result))
+    return result
+
+
+def get_motion_blur_analysis(stage, frame: float) -> dict:
+    """Finds out which sampled prims need deformation blur and which ones can use velocity blur.
+    This runs on the output of the motion blur LOP, so we compare the actual samples from
+    shutter open to close. Prims with constant topology and velocities only need a single
+    geometry sample. Prims with a transform of their own keep their samples for transform blur.
+
+    Args:
+        stage: Stage with the samples of the motion blur LOP
+        frame: Frame we're rendering
+
+    Returns:
+        motion_blur_analysis: Dict with the 'velocity' and 'deformation' prim paths
+    """
+    velocity_prims = []
+    deformation_prims = []
+    for prim in stage.Traverse(Usd.PrimDefaultPredicate):
+        if not prim.IsA(UsdGeom.PointBased):
+            continue
+
+        sample_times = UsdGeom.PointBased(prim).GetPointsAttr().GetTimeSamples()
+        if len(sample_times) < 2:
+            continue
+
+        if UsdGeom.Xformable(prim).GetOrderedXformOps():
+            deformation_prims.append(str(prim.GetPath()))
+            continue
+
+        signatures = {get_topology_signature(prim, sample) for sample in sample_times}
+        velocities = UsdGeom.PointBased(prim).GetVelocitiesAttr().Get(frame)
+        point_count = next(iter(signatures))[0]
+
+        if len(signatures) == 1 and velocities and len(velocities) == point_count:
+            velocity_prims.append(str(prim.GetPath()))
+        else:
+            deformation_prims.append(str(prim.GetPath()))
+
+    return {
+        "velocity": tuple(velocity_prims),
+        "deformation": tuple(deformation_prims),
+    }
+
+
+def get_point_samples_memory(stage, frame: float) -> int:
+    """Estimates the memory of all point samples on a stage.
+
+    Args:
+        stage: Stage to check
+        frame: Frame to read the point counts at
+    """
+    memory = 0
+    for prim in stage.Traverse(Usd.PrimDefaultPredicate):
+        if prim.IsA(UsdGeom.PointBased):
+            points_attribute = UsdGeom.PointBased(prim).GetPointsAttr()
+            sample_count = max(points_attribute.GetNumTimeSamples(), 1)
+            points = points_attribute.Get(frame)
+            memory += len(points or ()) * sample_count * BYTES_PER_POINT_SAMPLE
+
+    return memory
+
+
+def measure_motion_blur_cost(karma_node: hou.Node) -> tuple[tuple, tuple]:
+    """Cooks the motion blur nodes with and without velocity blur and measures the cook
+    time and the memory of the point samples. Auto mode is on again afterwards.
+
+    Args:
+        karma_node: SGTK Karma node
+
+    Returns:
+        before: Cook time in seconds and point sample memory in bytes, without velocity blur
+        after: The same with velocity blur
+    """
+    frame = hou.frame()
+    motion_blur_nodes = (karma_node.node("motionblur"), karma_node.node("velocity_blur"))
+
+    results = []
+    with hou.undos.disabler():
+        for mblur_auto in (0, 1):
+            set_parm_value(karma_node.parm("mblur_auto"), mblur_auto)
+
+            start_time = time.perf_counter()
+            for node in motion_blur_nodes:
+                node.cook(force=True)
+            cook_time = time.perf_counter() - start_time
+
+            memory = get_point_samples_memory(motion_blur_nodes[-1].stage(), frame)
+            results.append((cook_time, memory))
+
+    return tuple(results)
+
+
+def get_motion_blur_pattern(karma_node: hou.Node, default_pattern: str) -> str:
+    """Returns the prim pattern for the motion blur LOP. In auto mode that's only the prims
+    that might move, the velocity_blur node then drops the samples velocity blur doesn't need.
+    When a time dependent node changes the whole stage we can't tell which prims move,
+    so we use the default pattern.
+
+    Args:
+        karma_node: SGTK Karma node
+        default_pattern: Pattern the motion blur LOP uses when auto mode is off
+    """
+    if not karma_node.evalParm("mblur_auto"):
+        return default_pattern
+
+    animated_prims, fallback = get_animated_prims(karma_node)
+    if fallback:
+        return default_pattern
+
+    return " ".join(animated_prims)
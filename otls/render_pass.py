@@ -0,0 +1,191 @@
+"""This python file gets inserted into the render_pass node in the OTL.
+When the farm renders a render pass, every pass job tells us its pass through the
+SGTK_KARMA_PASS environment variable. We only keep the prims of that pass, turn the
+matte prims into holdouts and render every product to the output of the pass.
+Without the environment variable this node does nothing."""
+
+import json
+
+import hou
+
+from pxr import Sdf, Usd, UsdGeom, UsdLux, UsdRender
+
+PASS_ENVIRONMENT_VARIABLE = "SGTK_KARMA_PASS"
+
+# Karma geometry property, this works the same as the Render Geometry Settings LOP
+HOLDOUT_MODE_ATTRIBUTE = "primvars:karma:object:holdoutmode"
+
+
+def get_render_pass(karma_node: hou.Node, pass_name: str) -> dict:
+    """Returns the prim patterns of a render pass on the node.
+
+    Args:
+        karma_node: SGTK Karma node
+        pass_name: Name of the render pass
+    """
+    for pass_index in range(1, karma_node.parm("render_passes").eval() + 1):
+        if karma_node.parm(f"render_pass_name_{pass_index}").eval() == pass_name:
+            return {
+                "prims": karma_node.parm(f"render_pass_prims_{pass_index}").eval(),
+                "matte": karma_node.parm(f"render_pass_matte_{pass_index}").eval(),
+            }
+
+    return None
+
+
+def get_pattern_paths(render_pass_node: hou.Node, pattern: str) -> list:
+    """Expands a prim pattern of a render pass.
+
+    Args:
+        render_pass_node: The render_pass node, whose stage the pattern gets expanded on
+        pattern: Prim pattern, can contain collections
+    """
+    if not pattern:
+        return []
+
+    selection_rule = hou.LopSelectionRule()
+    selection_rule.setPathPattern(pattern)
+
+    return [
+        Sdf.Path(str(prim_path))
+        for prim_path in selection_rule.expandedPaths(
+            lopnode=render_pass_node.input(0)
+        )
+    ]
+
+
+def has_protected_children(prim) -> bool:
+    """Checks if a prim holds cameras or lights, which every pass needs.
+
+    Args:
+        prim: Prim we want to remove from the pass
+    """
+    for child_prim in Usd.PrimRange(prim):
+        if child_prim.IsA(UsdGeom.Camera) or child_prim.HasAPI(UsdLux.LightAPI):
+            return True
+
+    return False
+
+
+def get_removed_prims(prim, kept_paths: set, parent_paths: set) -> list:
+    """Finds the prims under a prim that aren't part of the render pass. We only remove
+    geometry, point instancers and transforms, so render settings, materials and other
+    scopes stay. Parents of kept prims stay, and so does everything under a kept prim.
+    Cameras and lights are in every pass.
+
+    Args:
+        prim: Prim to look under, the pseudo root for the whole stage
+        kept_paths: Paths of the pass prims and the prototypes they might instance
+        parent_paths: Paths of all parents of the kept prims
+
+    Returns:
+        removed_prims: List of prim paths to deactivate
+    """
+    removed_prims = []
+    for child_prim in prim.GetFilteredChildren(Usd.PrimDefaultPredicate):
+        child_path = child_prim.GetPath()
+        if (
+            child_path in kept_paths
+            or child_prim.IsA(UsdGeom.Camera)
+            or child_prim.HasAPI(UsdLux.LightAPI)
+        ):
+            continue
+
+        # Look at the children one by one, so the kept prims and lights in here stay
+        if (
+            child_path in parent_paths
+            or not child_prim.IsA(UsdGeom.Xformable)
+            or has_protected_children(child_prim)
+        ):
+            removed_prims += get_removed_prims(child_prim, kept_paths, parent_paths)
+        else:
+            removed_prims.append(child_path)
+
+    return removed_prims
+
+
+def get_product_aov(karma_node: hou.Node, product_name: str) -> str:
+    """Returns which of our outputs a render product writes, like main or deep.
+
+    Args:
+        karma_node: SGTK Karma node
+        product_name: Product name of the render product at this frame
+    """
+    karma_render_settings = karma_node.node("karmarendersettings")
+    product_aovs = {
+        karma_render_settings.evalParm("picture"): "main",
+        karma_render_settings.evalParm("dcmfilename"): "deep",
+        karma_node.node("karmacryptomatte").evalParm("cryptopicture"): "crypto",
+    }
+
+    return product_aovs.get(product_name)
+
+
+def set_render_pass(karma_node: hou.Node, render_pass_node: hou.Node, stage) -> None:
+    """Reduces the stage to the prims of the render pass of this farm job and renders
+    every product to the output of the pass. The outputs of every pass get set on the
+    node by the app, so the AOV names stay the same as in the full render.
+
+    Args:
+        karma_node: SGTK Karma node
+        render_pass_node: The render_pass node
+        stage: Stage we're working in
+    """
+    pass_name = hou.getenv(PASS_ENVIRONMENT_VARIABLE)
+    if not pass_name:
+        return
+
+    render_pass = get_render_pass(karma_node, pass_name)
+    if render_pass is None:
+        raise hou.NodeError(f"Render pass {pass_name} doesn't exist on the node.")
+
+    prim_paths = get_pattern_paths(render_pass_node, render_pass["prims"])
+    matte_paths = get_pattern_paths(render_pass_node, render_pass["matte"])
+    hm = karma_node.hm()
+    # Instancers of the pass need their prototypes, even when these aren't part of it
+    kept_paths = set(prim_paths + matte_paths) | hm.get_prototype_paths(stage)
+    parent_paths = set()
+    for kept_path in kept_paths:
+        parent_paths.update(kept_path.GetAncestorsRange())
+
+    removed_prims = get_removed_prims(stage.GetPseudoRoot(), kept_paths, parent_paths)
+
+    layer = stage.GetEditTarget().GetLayer()
+    get_attribute_spec = hm.get_attribute_spec
+
+    with Sdf.ChangeBlock():
+        for prim_path in removed_prims:
+            Sdf.CreatePrimInLayer(layer, prim_path).active = False
+
+        # Matte prims still block what's behind them, but render as a holdout
+        for prim_path in matte_paths:
+            prim_spec = Sdf.CreatePrimInLayer(layer, prim_path)
+            get_attribute_spec(
+                prim_spec, HOLDOUT_MODE_ATTRIBUTE, Sdf.ValueTypeNames.String
+            ).default = "matte"
+
+    pass_outputs = json.loads(karma_node.userData("render_pass_outputs") or "{}")
+    pass_output = pass_outputs.get(pass_name, {})
+
+    settings_path = karma_node.node("karmarendersettings").evalParm("primpath")
+    render_settings = UsdRender.Settings.Get(stage, settings_path)
+    if not render_settings:
+        return
+
+    for product_path in render_settings.GetProductsRel().GetForwardedTargets():
+        render_product = UsdRender.Product.Get(stage, product_path)
+        product_name_attribute = render_product.GetProductNameAttr()
+
+        aov = get_product_aov(karma_node, product_name_attribute.Get(hou.frame()))
+        if aov not in pass_output:
+            raise hou.NodeError(
+                f"Render pass {pass_name} has no output for {product_path}, "
+                "set up the render paths again."
+            )
+
+        product_name_attribute.Set(
+            hou.text.expandStringAtFrame(pass_output[aov], hou.frame()), hou.frame()
+        )
+
+
+set_render_pass(hou.pwd().parent(), hou.pwd(), hou.pwd().editableStage())
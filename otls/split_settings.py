@@ -0,0 +1,80 @@
+"""This python file gets inserted into the split_beauty and split_outputs nodes in the OTL.
+Deep and cryptomatte outputs can render as their own farm job, so the beauty doesn't have
+to carry their memory and render time. The split_beauty node removes those outputs from
+the main render, and the split_outputs node keeps only those outputs for the split ROP.
+Both ROPs cook the stage on their own, so the split job doesn't save on stage cooking.
+Both nodes do nothing when no outputs are split off."""
+
+import hou
+
+from pxr import UsdRender
+
+def get_split_product_names(karma_node: hou.Node) -> list[str]:
+    """Returns the product names of the outputs that render in their own job.
+
+    Args:
+        karma_node: SGTK Karma node
+    """
+    split_product_names = []
+    if karma_node.evalParm("split_deep") and karma_node.evalParm("dcm"):
+        split_product_names.append(
+            karma_node.node("karmarendersettings").evalParm("dcmfilename")
+        )
+
+    if karma_node.evalParm("split_crypto") and (
+        karma_node.evalParm("doprimcrypto") or karma_node.evalParm("domtlcrypto")
+    ):
+        split_product_names.append(
+            karma_node.node("karmacryptomatte").evalParm("cryptopicture")
+        )
+
+    return split_product_names
+
+
+def set_split_settings(karma_node: hou.Node, stage, split_outputs: bool) -> None:
+    """Splits the render products between the beauty and the split ROP. The split ROP
+    renders at its own sample level, as deep and cryptomatte outputs don't need the
+    samples the beauty needs to get rid of noise.
+
+    Args:
+        karma_node: SGTK Karma node
+        stage: Stage we're working in
+        split_outputs: Whether we keep the split outputs, or everything else
+    """
+    split_product_names = get_split_product_names(karma_node)
+    if not split_product_names:
+        return
+
+    settings_path = karma_node.node("karmarendersettings").evalParm("primpath")
+    render_settings = UsdRender.Settings.Get(stage, settings_path)
+    if not render_settings:
+        return
+
+    products_relationship = render_settings.GetProductsRel()
+    product_paths = []
+    for product_path in products_relationship.GetForwardedTargets():
+        render_product = UsdRender.Product.Get(stage, product_path)
+        product_name = render_product.GetProductNameAttr().Get(hou.frame())
+        if (product_name in split_product_names) == split_outputs:
+            product_paths.append(product_path)
+    products_relationship.SetTargets(product_paths)
+
+    if not split_outputs:
+        return
+
+    samples_attribute = render_settings.GetPrim().GetAttribute(
+        karma_node.hm().get_pixel_samples_attribute(karma_node)
+    )
+    pixel_samples = samples_attribute.Get() if samples_attribute else None
+    if pixel_samples:
+        sample_scale = karma_node.evalParm("split_sample_scale")
+        samples_attribute.Set(max(int(pixel_samples * sample_scale), 1))
+
+
+# The same script runs in the beauty chain and in the branch of the split ROP
+split_node = hou.pwd()
+set_split_settings(
+    split_node.parent(),
+    split_node.editableStage(),
+    split_node.name() == "split_outputs",
+)
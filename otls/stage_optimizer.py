@@ -0,0 +1,227 @@
+"""This python file gets inserted into the stage_optimizer node in the OTL.
+It removes everything from the stage that Karma doesn't need for the final image,
+so the renderer spends less memory and time building the scene."""
+
+import hou
+
+from pxr import Sdf, Usd, UsdGeom, UsdRender
+
+# Purposes Karma never renders in the final image
+NON_RENDER_PURPOSES = (UsdGeom.Tokens.proxy, UsdGeom.Tokens.guide)
+
+# Rough sizes used to estimate how much geometry memory we save
+BYTES_PER_POINT = 12
+BYTES_PER_INDEX = 4
+
+
+def estimate_geometry_memory(prim, frame: float) -> int:
+    """Estimates the memory of the points and face vertex indices in a prim and all its children.
+
+    Args:
+        prim: Prim to estimate
+        frame: Frame to read the geometry at
+    """
+    memory = 0
+    for child_prim in Usd.PrimRange(prim):
+        if child_prim.IsA(UsdGeom.PointBased):
+            points = UsdGeom.PointBased(child_prim).GetPointsAttr().Get(frame)
+            memory += len(points or ()) * BYTES_PER_POINT
+
+        if child_prim.IsA(UsdGeom.Mesh):
+            indices = UsdGeom.Mesh(child_prim).GetFaceVertexIndicesAttr().Get(frame)
+            memory += len(indices or ()) * BYTES_PER_INDEX
+
+    return memory
+
+
+def has_renderable_children(prim) -> bool:
+    """Checks if any child of a proxy or guide prim has its own render or default purpose,
+    in which case it still shows up in the render.
+
+    Args:
+        prim: Prim with a non render purpose
+    """
+    for child_prim in Usd.PrimRange(prim):
+        if child_prim == prim:
+            continue
+
+        purpose_attribute = UsdGeom.Imageable(child_prim).GetPurposeAttr()
+        if purpose_attribute and purpose_attribute.HasAuthoredValue():
+            if purpose_attribute.Get() not in NON_RENDER_PURPOSES:
+                return True
+
+    return False
+
+
+def get_protected_paths(karma_node: hou.Node, stage) -> set:
+    """Returns the render camera and point instancer prototypes, with all their parents.
+    These are often invisible, but the render still needs them.
+
+    Args:
+        karma_node: SGTK Karma node
+        stage: Stage we're working in
+    """
+    target_paths = karma_node.hm().get_prototype_paths(stage)
+
+    settings_path = karma_node.node("karmarendersettings").evalParm("primpath")
+    render_settings = UsdRender.Settings.Get(stage, settings_path)
+    if render_settings:
+        target_paths.update(render_settings.GetCameraRel().GetForwardedTargets())
+
+    protected_paths = set()
+    for target_path in target_paths:
+        protected_paths.update(target_path.GetAncestorsRange())
+
+    return protected_paths
+
+
+def get_reference_key(prim) -> tuple:
+    """Returns the layers and prim paths a prim references, so we can find prims
+    that reference the exact same thing.
+
+    Args:
+        prim: Prim with references
+    """
+    query = Usd.PrimCompositionQuery.GetDirectReferences(prim)
+
+    reference_key = []
+    for arc in query.GetCompositionArcs():
+        target_layer = arc.GetTargetLayer()
+        reference_key.append(
+            (
+                target_layer.identifier if target_layer else "",
+                str(arc.GetTargetPrimPath()),
+            )
+        )
+
+    return tuple(reference_key)
+
+
+def has_local_overrides(prim, root_layers: set) -> bool:
+    """Checks if any child of a referenced prim has opinions from our own layers. Those get
+    ignored once the prim is instanced, think of pRefs or light group tags, so we can't
+    instance these prims.
+
+    Args:
+        prim: Referenced prim
+        root_layers: Layers of the root layer stack of our stage
+    """
+    for child_prim in Usd.PrimRange(prim):
+        if child_prim == prim:
+            continue
+
+        for prim_spec in child_prim.GetPrimStack():
+            if prim_spec.layer in root_layers:
+                return True
+
+    return False
+
+
+def get_stage_optimizations(
+    karma_node: hou.Node, stage, frame: float
+) -> tuple[list, list, int]:
+    """Finds everything we can strip from the stage in a single traversal.
+
+    Args:
+        karma_node: SGTK Karma node
+        stage: Stage we're working in
+        frame: Frame we're cooking
+
+    Returns:
+        inactive_prims: List of prim paths to deactivate and the reason why
+        instanceable_prims: List of prim paths to make instanceable
+        saved_memory: Estimated geometry memory we save in bytes
+    """
+    inactive_prims = []
+    referenced_prims = {}
+    saved_memory = 0
+
+    protected_paths = get_protected_paths(karma_node, stage)
+
+    prim_range = iter(Usd.PrimRange(stage.GetPseudoRoot(), Usd.PrimDefaultPredicate))
+    for prim in prim_range:
+        if prim.IsPseudoRoot():
+            continue
+
+        imageable = UsdGeom.Imageable(prim)
+        if imageable and prim.GetPath() not in protected_paths:
+            purpose = imageable.GetPurposeAttr().Get()
+            if purpose in NON_RENDER_PURPOSES and not has_renderable_children(prim):
+                inactive_prims.append((prim.GetPath(), "purpose"))
+                saved_memory += estimate_geometry_memory(prim, frame)
+                prim_range.PruneChildren()
+                continue
+
+            # Animated visibility can change within the shutter, so we leave that alone
+            visibility_attribute = imageable.GetVisibilityAttr()
+            if (
+                not visibility_attribute.ValueMightBeTimeVarying()
+                and visibility_attribute.Get(frame) == UsdGeom.Tokens.invisible
+            ):
+                inactive_prims.append((prim.GetPath(), "invisible"))
+                saved_memory += estimate_geometry_memory(prim, frame)
+                prim_range.PruneChildren()
+                continue
+
+        if prim.IsInstance():
+            prim_range.PruneChildren()
+            continue
+
+        if prim.HasAuthoredReferences():
+            reference_key = get_reference_key(prim)
+            if reference_key:
+                referenced_prims.setdefault(reference_key, []).append(prim)
+
+    root_layers = set(stage.GetLayerStack())
+
+    instanceable_prims = []
+    for prims in referenced_prims.values():
+        prims = [prim for prim in prims if not has_local_overrides(prim, root_layers)]
+        if len(prims) < 2:
+            continue
+
+        instanceable_prims += [prim.GetPath() for prim in prims]
+        saved_memory += (len(prims) - 1) * estimate_geometry_memory(prims[0], frame)
+
+    return inactive_prims, instanceable_prims, saved_memory
+
+
+def optimize_stage(karma_node: hou.Node, optimizer_node: hou.Node, stage) -> None:
+    """Deactivates prims that never show up in the render and instances repeated references.
+    What we did gets stored on the node, so the HDA can report it.
+
+    Args:
+        karma_node: SGTK Karma node
+        optimizer_node: The stage_optimizer node
+        stage: Stage we're working in
+    """
+    inactive_prims, instanceable_prims, saved_memory = get_stage_optimizations(
+        karma_node, stage, hou.frame()
+    )
+
+    layer = stage.GetEditTarget().GetLayer()
+
+    with Sdf.ChangeBlock():
+        for prim_path, _reason in inactive_prims:
+            Sdf.CreatePrimInLayer(layer, prim_path).active = False
+
+        for prim_path in instanceable_prims:
+            Sdf.CreatePrimInLayer(layer, prim_path).instanceable = True
+
+    optimizer_node.setCachedUserData(
+        "optimizer_report",
+        {
+            "frame": hou.frame(),
+            "inactive_purpose": sum(
+                1 for _prim_path, reason in inactive_prims if reason == "purpose"
+            ),
+            "inactive_invisible": sum(
+                1 for _prim_path, reason in inactive_prims if reason == "invisible"
+            ),
+            "instanceable": len(instanceable_prims),
+            "saved_memory": saved_memory,
+        },
+    )
+
+
+optimize_stage(hou.pwd().parent(), hou.pwd(), hou.pwd().editableStage())
@@ -0,0 +1,54 @@
+"""This python file gets inserted into the tile_settings node in the OTL.
+When the farm renders a frame in tiles, every tile job tells us its tile through the
+SGTK_KARMA_TILE environment variable. We crop the render to that tile and write it next
+to the final image, so the assembly job can stitch the tiles together again.
+Without the environment variable this node does nothing."""
+
+import hou
+
+from pxr import Gf, UsdRender
+
+TILE_ENVIRONMENT_VARIABLE = "SGTK_KARMA_TILE"
+
+
+def set_tile_settings(karma_node: hou.Node, stage) -> None:
+    """Crops the render to the tile of this farm job and renders every product
+    to its tile path.
+
+    Args:
+        karma_node: SGTK Karma node
+        stage: Stage we're working in
+    """
+    tile = hou.getenv(TILE_ENVIRONMENT_VARIABLE)
+    if not tile:
+        return
+
+    tile_index = int(tile)
+    tiles_x = karma_node.evalParm("tiles_x")
+    tiles_y = karma_node.evalParm("tiles_y")
+
+    settings_path = karma_node.node("karmarendersettings").evalParm("primpath")
+    render_settings = UsdRender.Settings.Get(stage, settings_path)
+    if not render_settings:
+        return
+
+    hm = karma_node.hm()
+    tile_window = Gf.Vec4f(
+        *hm.get_tile_window(
+            tile_index, tiles_x, tiles_y, render_settings.GetResolutionAttr().Get()
+        )
+    )
+    render_settings.GetDataWindowNDCAttr().Set(tile_window)
+
+    for product_path in render_settings.GetProductsRel().GetForwardedTargets():
+        render_product = UsdRender.Product.Get(stage, product_path)
+        render_product.GetDataWindowNDCAttr().Set(tile_window)
+
+        product_name_attribute = render_product.GetProductNameAttr()
+        product_name = product_name_attribute.Get(hou.frame())
+        product_name_attribute.Set(
+            hm.get_tile_path(product_name, tile_index), hou.frame()
+        )
+
+
+set_tile_settings(hou.pwd().parent(), hou.pwd().editableStage())
@@ -0,0 +1,63 @@
+"""This python file gets inserted into the velocity_blur node in the OTL.
+In the automatic motion blur mode it switches the prims that don't need
+deformation samples to velocity blur with a single geometry sample."""
+
+import hou
+
+from pxr import Sdf, UsdGeom
+
+# Karma geometry properties, these work the same as the Render Geometry Settings LOP
+VELOCITY_BLUR_ATTRIBUTE = "primvars:karma:object:vblur"
+GEOMETRY_SAMPLES_ATTRIBUTE = "primvars:karma:object:geosamples"
+
+
+def set_velocity_blur(karma_node: hou.Node, velocity_blur_node: hou.Node, stage) -> None:
+    """Sets velocity blur with a single geometry sample on all prims that keep the same
+    topology and have velocities from shutter open to close. The motion blur LOP above us
+    sampled these prims, so we replace their point samples with the current frame.
+
+    Args:
+        karma_node: SGTK Karma node
+        velocity_blur_node: This node, which keeps the analysis for the report
+        stage: Stage we're working in
+    """
+    if not karma_node.evalParm("mblur_auto"):
+        return
+
+    hm = karma_node.hm()
+    frame = hou.frame()
+    motion_blur_analysis = hm.get_motion_blur_analysis(stage, frame)
+    velocity_blur_node.setCachedUserData("motion_blur_analysis", motion_blur_analysis)
+
+    # Read the points before we start changing the layer
+    velocity_points = [
+        (
+            prim_path,
+            UsdGeom.PointBased(stage.GetPrimAtPath(prim_path)).GetPointsAttr().Get(frame),
+        )
+        for prim_path in motion_blur_analysis["velocity"]
+    ]
+    layer = stage.GetEditTarget().GetLayer()
+
+    with Sdf.ChangeBlock():
+        for prim_path, points in velocity_points:
+            prim_spec = Sdf.CreatePrimInLayer(layer, prim_path)
+
+            hm.get_attribute_spec(
+                prim_spec, VELOCITY_BLUR_ATTRIBUTE, Sdf.ValueTypeNames.String
+            ).default = "on"
+            hm.get_attribute_spec(
+                prim_spec, GEOMETRY_SAMPLES_ATTRIBUTE, Sdf.ValueTypeNames.Int
+            ).default = 1
+
+            # Velocity blur only reads the current frame. The samples are either in this
+            # layer and get removed, or in a weaker layer and our default overrides them.
+            points_spec = hm.get_attribute_spec(
+                prim_spec, UsdGeom.Tokens.points, Sdf.ValueTypeNames.Point3fArray
+            )
+            for sample_time in layer.ListTimeSamplesForPath(points_spec.path):
+                layer.EraseTimeSample(points_spec.path, sample_time)
+            points_spec.default = points
+
+
+set_velocity_blur(hou.pwd().parent(), hou.pwd(), hou.pwd().editableStage())
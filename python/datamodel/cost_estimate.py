@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class CostEstimate:
+    __slots__ = (
+        "probe_frames",
+        "probe_frame_time",
+        "frame_time",
+        "total_time",
+        "peak_memory",
+        "frames_per_task",
+        "mode",
+    )
+
+    probe_frames: tuple
+    probe_frame_time: float
+    frame_time: float
+    total_time: float
+    peak_memory: int
+    frames_per_task: int
+    mode: int
@@ -1,8 +1,11 @@
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(frozen=True)
 class MetaData:
+    __slots__ = ("key", "type", "value", "is_expression")
+
     key: str
     type: str
     value: any
+    is_expression: bool
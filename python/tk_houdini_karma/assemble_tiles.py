@@ -0,0 +1,141 @@
+"""This script runs as the assembly job of a tiled render on Deadline. It stitches
+the tiles of every frame back into the final EXRs, keeping the metadata and
+cryptomatte manifests of the render. Tiles are written by the tile_settings node
+of our OTL, next to the final image in a tiles folder."""
+
+import argparse
+import json
+import os
+
+
+def get_tile_path(path: str, tile_index: int) -> str:
+    """Returns the path a tile of an image gets rendered to. The tile_settings node
+    in our OTL renders the tiles here, through a copy of this module in the HDA.
+
+    Args:
+        path (str): Path of the final image
+        tile_index (int): Index of the tile
+    """
+    return os.path.join(
+        os.path.dirname(path), "tiles", f"tile{tile_index:02d}", os.path.basename(path)
+    ).replace(os.sep, "/")
+
+
+def get_tile_window(
+    tile_index: int, tiles_x: int, tiles_y: int, resolution: tuple
+) -> tuple[float, float, float, float]:
+    """Returns the NDC window of a tile, with a pixel of overlap on every inner edge so
+    rounding never leaves a gap between tiles. Tiles are numbered from the top left.
+    The tile_settings node in our OTL crops the render to this window.
+
+    Args:
+        tile_index (int): Index of the tile
+        tiles_x (int): Amount of tiles horizontally
+        tiles_y (int): Amount of tiles vertically
+        resolution (tuple): Resolution of the render in pixels
+
+    Returns:
+        tuple[float, float, float, float]: Minimum x and y, maximum x and y of the window
+    """
+    column = tile_index % tiles_x
+    row = tile_index // tiles_x
+    padding_x = 1 / resolution[0]
+    padding_y = 1 / resolution[1]
+
+    # NDC starts at the bottom of the image, tiles start at the top
+    return (
+        max(column / tiles_x - padding_x, 0),
+        max(1 - (row + 1) / tiles_y - padding_y, 0),
+        min((column + 1) / tiles_x + padding_x, 1),
+        min(1 - row / tiles_y + padding_y, 1),
+    )
+
+
+def merge_cryptomatte_manifests(output_spec, tile_specs: list) -> None:
+    """Merges the cryptomatte manifests of all tiles into the output. Every tile only
+    lists the names it rendered, so the manifest of a single tile misses everything
+    outside of it.
+
+    Args:
+        output_spec (OpenImageIO.ImageSpec): Spec of the final image
+        tile_specs (list[OpenImageIO.ImageSpec]): Specs of the tiles
+    """
+    manifests = {}
+    for tile_spec in tile_specs:
+        for attribute in tile_spec.extra_attribs:
+            if attribute.name.startswith("cryptomatte/") and attribute.name.endswith(
+                "/manifest"
+            ):
+                manifests.setdefault(attribute.name, {}).update(
+                    json.loads(attribute.value)
+                )
+
+    for attribute_name, manifest in manifests.items():
+        output_spec.attribute(attribute_name, json.dumps(manifest))
+
+
+def assemble_tiles(output_path: str, tile_paths: list[str]) -> None:
+    """Pastes all tiles into an image of the full resolution. Every tile only holds
+    its own data window, so we copy each to its own position. Tiles overlap by a
+    pixel, the overlapping pixels are the same in both tiles.
+
+    Args:
+        output_path (str): Final image to write
+        tile_paths (list[str]): Tiles of the image
+    """
+    # Only the farm needs OpenImageIO, the farm dialog just uses our tile paths
+    import OpenImageIO
+
+    tiles = []
+    for tile_path in tile_paths:
+        tile = OpenImageIO.ImageBuf(tile_path)
+        if tile.has_error:
+            raise RuntimeError(f"Couldn't read tile {tile_path}: {tile.geterror()}")
+        tiles.append(tile)
+
+    # Copying the spec of a tile keeps the channels and metadata
+    tile_spec = tiles[0].spec()
+    output_spec = OpenImageIO.ImageSpec(tile_spec)
+    output_spec.x = tile_spec.full_x
+    output_spec.y = tile_spec.full_y
+    output_spec.width = tile_spec.full_width
+    output_spec.height = tile_spec.full_height
+    merge_cryptomatte_manifests(output_spec, [tile.spec() for tile in tiles])
+
+    # We copy every tile into its own data window, paste offsets by that window again
+    output = OpenImageIO.ImageBuf(output_spec)
+    for tile in tiles:
+        if not output.set_pixels(tile.roi, tile.get_pixels(output_spec.format)):
+            raise RuntimeError(f"Couldn't paste a tile: {output.geterror()}")
+
+    if tile_spec.channelformats:
+        output.set_write_format(tile_spec.channelformats)
+
+    if not output.write(output_path):
+        raise RuntimeError(f"Couldn't write {output_path}: {output.geterror()}")
+
+
+def main() -> None:
+    """Assembles the tiles of all images for a range of frames."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tiles", type=int, required=True)
+    parser.add_argument("--start-frame", type=int, required=True)
+    parser.add_argument("--end-frame", type=int, required=True)
+    parser.add_argument(
+        "paths", nargs="+", help="Final images, with %%04d for the frame number"
+    )
+    arguments = parser.parse_args()
+
+    for frame in range(arguments.start_frame, arguments.end_frame + 1):
+        for path in arguments.paths:
+            output_path = path % frame
+            tile_paths = [
+                get_tile_path(output_path, tile_index)
+                for tile_index in range(arguments.tiles)
+            ]
+            assemble_tiles(output_path, tile_paths)
+            print(f"Assembled {output_path} from {arguments.tiles} tiles")
+
+
+if __name__ == "__main__":
+    main()
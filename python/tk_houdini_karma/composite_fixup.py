@@ -0,0 +1,118 @@
+"""Composites fix-up renders back into existing frames. A fix-up render only holds the
+region of the frame that needed fixing, written to a fixup folder next to the final
+images by the fixup_settings node of our OTL. Composited fix-ups get moved to a
+composited folder, so compositing again never pastes an old region back in.
+This runs locally from the node, or as the composite job of a fix-up render on Deadline."""
+
+import argparse
+import os
+
+
+def get_fixup_path(path: str) -> str:
+    """Returns the path the fix-up region of an image gets rendered to. The fixup_settings
+    node in our OTL renders the fix-ups here, through a copy of this module in the HDA.
+
+    Args:
+        path (str): Path of the final image
+    """
+    return os.path.join(
+        os.path.dirname(path), "fixup", os.path.basename(path)
+    ).replace(os.sep, "/")
+
+
+def get_composited_fixup_path(fixup_path: str) -> str:
+    """Returns the path a fix-up render gets moved to once it's composited.
+
+    Args:
+        fixup_path (str): Path of the fix-up render
+    """
+    return os.path.join(
+        os.path.dirname(fixup_path), "composited", os.path.basename(fixup_path)
+    ).replace(os.sep, "/")
+
+
+def composite_fixup(output_path: str, fixup_path: str) -> None:
+    """Pastes a fix-up region into an existing image. The existing image keeps its
+    own metadata and channel formats, only the pixels of the region change.
+
+    Args:
+        output_path (str): Existing image to fix
+        fixup_path (str): Fix-up render of a region of that image
+    """
+    # Only compositing needs OpenImageIO, the farm dialog just uses our fix-up paths
+    import OpenImageIO
+
+    # We overwrite the original, so it needs to be fully in memory first
+    images = []
+    for path in (output_path, fixup_path):
+        image = OpenImageIO.ImageBuf(path)
+        if image.has_error or not image.read(force=True):
+            raise RuntimeError(f"Couldn't read {path}: {image.geterror()}")
+        images.append(image)
+
+    output, fixup = images
+
+    # We copy the region into its own data window, paste offsets by that window again
+    pixels = fixup.get_pixels(output.spec().format)
+    if not output.set_pixels(fixup.roi, pixels):
+        raise RuntimeError(f"Couldn't paste {fixup_path}: {output.geterror()}")
+
+    channel_formats = output.spec().channelformats
+    if channel_formats:
+        output.set_write_format(channel_formats)
+
+    temporary_path = output_path + ".fixup.exr"
+    if not output.write(temporary_path):
+        raise RuntimeError(f"Couldn't write {output_path}: {output.geterror()}")
+    os.replace(temporary_path, output_path)
+
+
+def composite_fixup_frames(paths: list[str], frames: range) -> int:
+    """Composites the fix-up renders of all images for a range of frames and moves every
+    fix-up out of the way once it's in. Images without a fix-up render get skipped,
+    like the denoised image that only exists after compositing.
+
+    Args:
+        paths (list[str]): Final images, with %04d for the frame number
+        frames (range): Frames to composite
+
+    Returns:
+        int: Amount of images we composited
+    """
+    composited_count = 0
+    for frame in frames:
+        for path in paths:
+            output_path = path % frame
+            fixup_path = get_fixup_path(output_path)
+            if not os.path.isfile(fixup_path):
+                continue
+
+            composite_fixup(output_path, fixup_path)
+
+            composited_fixup_path = get_composited_fixup_path(fixup_path)
+            os.makedirs(os.path.dirname(composited_fixup_path), exist_ok=True)
+            os.replace(fixup_path, composited_fixup_path)
+
+            composited_count += 1
+            print(f"Composited fix-up into {output_path}")
+
+    return composited_count
+
+
+def main() -> None:
+    """Composites the fix-up renders for a range of frames."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--start-frame", type=int, required=True)
+    parser.add_argument("--end-frame", type=int, required=True)
+    parser.add_argument(
+        "paths", nargs="+", help="Final images, with %%04d for the frame number"
+    )
+    arguments = parser.parse_args()
+
+    composite_fixup_frames(
+        arguments.paths, range(arguments.start_frame, arguments.end_frame + 1)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""Estimates what a render costs on the farm, by rendering a few probe frames at a
+reduced resolution and sample count and scaling the measurements up to the full settings.
+We do this before submitting, so we don't find out about 4 hour frames once the farm is full."""
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict
+
+import hou
+
+from pxr import Sdf, Usd, UsdRender
+
+from .get_smart_frame_list import get_smart_frame_list
+from .parameters import set_parm_value
+from .pixel_samples import get_pixel_samples_attribute
+from ..datamodel.cost_estimate import CostEstimate
+
+PROBE_FRAME_COUNT = 3
+PROBE_RESOLUTION_SCALE = 0.25
+PROBE_SAMPLE_SCALE = 0.25
+
+# Seconds between checks on a probe render, for its memory and for interrupts
+PROBE_POLL_INTERVAL = 0.25
+
+# We try to keep tasks at least this long, so loading the scene doesn't dominate the task
+TARGET_TASK_TIME = 30 * 60
+MAX_FRAMES_PER_TASK = 10
+
+# Peak memory from which we recommend the Medium and Heavy farm modes, in bytes
+MEDIUM_MODE_MEMORY = 8 * 1024**3
+HEAVY_MODE_MEMORY = 16 * 1024**3
+
+USER_DATA_KEY = "render_cost_estimate"
+
+MODE_NAMES = ("Light", "Medium", "Heavy")
+
+
+def get_process_memory(process_id: int) -> int:
+    """Returns the memory a process uses in bytes, or 0 when we can't measure it.
+    psutil comes with most Houdini installs, but we don't depend on it.
+
+    Args:
+        process_id (int): ID of the process
+    """
+    try:
+        import psutil
+    except ImportError:
+        return 0
+
+    try:
+        return psutil.Process(process_id).memory_info().rss
+    except psutil.Error:
+        return 0
+
+
+def run_probe_render(
+    husk_command: list[str], operation: hou.InterruptableOperation
+) -> tuple[float, int]:
+    """Runs husk and measures how long it takes and how much memory it uses.
+    We poll husk instead of waiting on it, so Houdini stays responsive and
+    interrupting the operation stops the render.
+
+    Args:
+        husk_command (list[str]): Husk command to run
+        operation (hou.InterruptableOperation): Operation the render runs in
+
+    Returns:
+        tuple[float, int]: Render time in seconds and peak memory in bytes
+    """
+    start_time = time.perf_counter()
+    process = subprocess.Popen(
+        husk_command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    peak_memory = 0
+    return_code = None
+    try:
+        while return_code is None:
+            peak_memory = max(peak_memory, get_process_memory(process.pid))
+            operation.updateProgress()
+            try:
+                return_code = process.wait(timeout=PROBE_POLL_INTERVAL)
+            except subprocess.TimeoutExpired:
+                pass
+    finally:
+        if return_code is None:
+            process.terminate()
+            process.wait()
+
+    if return_code != 0:
+        raise RuntimeError(f"Probe render failed with exit code {return_code}.")
+
+    return time.perf_counter() - start_time, peak_memory
+
+
+def export_probe_stage(
+    node: hou.Node,
+    frame: int,
+    sample_scale: float,
+    probe_file: str,
+    output_directory: str,
+    attribute_overrides: dict = None,
+) -> str:
+    """Exports the stage we render at a frame, with a reduced resolution and sample count.
+    The render products get redirected to a temporary folder, so probes never overwrite renders.
+
+    Args:
+        node (hou.Node): SGTK Karma node
+        frame (int): Frame to export
+        sample_scale (float): Fraction of the pixel samples to render with
+        probe_file (str): USD file to export to
+        output_directory (str): Folder the probe images get rendered to
+        attribute_overrides (dict): Extra integer attributes to set on the render settings,
+            they get created when the render settings don't have them yet
+
+    Returns:
+        str: Probe image of the first render product, which is our beauty
+    """
+    current_frame = hou.frame()
+    hou.setFrame(frame)
+    try:
+        stage = node.node("usdrender_rop").input(0).stage()
+        probe_stage = Usd.Stage.Open(stage.Flatten())
+    finally:
+        hou.setFrame(current_frame)
+
+    pixel_samples_attribute_name = get_pixel_samples_attribute(node)
+
+    probe_images = {}
+    for prim in probe_stage.Traverse():
+        if prim.IsA(UsdRender.Settings):
+            for attribute_name, value in (attribute_overrides or {}).items():
+                attribute = prim.GetAttribute(attribute_name)
+                if not attribute:
+                    attribute = prim.CreateAttribute(
+                        attribute_name, Sdf.ValueTypeNames.Int
+                    )
+                attribute.Set(value)
+
+        if prim.IsA(UsdRender.SettingsBase):
+            resolution_attribute = UsdRender.SettingsBase(prim).GetResolutionAttr()
+            resolution = resolution_attribute.Get()
+            if resolution:
+                probe_resolution = (
+                    max(int(size * PROBE_RESOLUTION_SCALE), 1) for size in resolution
+                )
+                resolution_attribute.Set(type(resolution)(*probe_resolution))
+
+        pixel_samples_attribute = prim.GetAttribute(pixel_samples_attribute_name)
+        if pixel_samples_attribute and pixel_samples_attribute.Get():
+            pixel_samples_attribute.Set(
+                max(int(pixel_samples_attribute.Get() * sample_scale), 1)
+            )
+
+        if prim.IsA(UsdRender.Product):
+            probe_image = os.path.join(output_directory, f"{prim.GetName()}.exr")
+            probe_image = probe_image.replace(os.sep, "/")
+            probe_images[prim.GetPath()] = probe_image
+            UsdRender.Product(prim).GetProductNameAttr().Set(probe_image)
+
+    probe_stage.GetRootLayer().Export(probe_file)
+
+    settings_path = node.node("karmarendersettings").evalParm("primpath")
+    render_settings = UsdRender.Settings.Get(probe_stage, settings_path)
+    product_paths = render_settings.GetProductsRel().GetForwardedTargets()
+    if not product_paths:
+        return None
+
+    return probe_images.get(product_paths[0])
+
+
+def get_recommended_settings(frame_time: float, peak_memory: int) -> tuple[int, int]:
+    """Recommends the frames per task and farm mode for the estimated frame cost.
+
+    Args:
+        frame_time (float): Estimated render time per frame in seconds
+        peak_memory (int): Estimated peak memory in bytes
+
+    Returns:
+        tuple[int, int]: Frames per task and farm mode index
+    """
+    frames_per_task = int(TARGET_TASK_TIME // max(frame_time, 1))
+    frames_per_task = min(max(frames_per_task, 1), MAX_FRAMES_PER_TASK)
+
+    if peak_memory >= HEAVY_MODE_MEMORY:
+        mode = 2
+    elif peak_memory >= MEDIUM_MODE_MEMORY:
+        mode = 1
+    else:
+        mode = 0
+
+    return frames_per_task, mode
+
+
+def render_probe_frame(
+    node: hou.Node,
+    frame: int,
+    sample_scale: float,
+    temporary_directory: str,
+    operation: hou.InterruptableOperation,
+) -> tuple[float, int]:
+    """Renders a single probe frame with husk.
+
+    Args:
+        node (hou.Node): SGTK Karma node
+        frame (int): Frame to render
+        sample_scale (float): Fraction of the pixel samples to render with
+        temporary_directory (str): Folder for the probe stage and images
+        operation (hou.InterruptableOperation): Operation the render runs in
+
+    Returns:
+        tuple[float, int]: Render time in seconds and peak memory in bytes
+    """
+    probe_file = os.path.join(temporary_directory, f"probe_{frame}.usd")
+    export_probe_stage(node, frame, sample_scale, probe_file, temporary_directory)
+
+    husk = hou.text.expandString("$HFS/bin/husk")
+    renderer = node.node("usdrender_rop").evalParm("renderer")
+    return run_probe_render(
+        [husk, "--renderer", renderer, "--frame", str(frame), probe_file], operation
+    )
+
+
+def estimate_render_cost(node: hou.Node, framerange: list[int]) -> CostEstimate:
+    """Renders a few smart ordered probe frames locally at a reduced resolution and sample
+    count, and extrapolates the measured time to the full settings and frame range.
+
+    Loading the scene takes the same time no matter the settings, so the first probe frame
+    also gets rendered with double the samples. The difference between those two tells us
+    how much of the time is actual rendering, which is the part that scales with the
+    amount of pixels and samples. Memory doesn't scale like that, so the probe memory
+    is a lower bound.
+
+    Args:
+        node (hou.Node): SGTK Karma node
+        framerange (list[int]): First and last frame of the render
+
+    Returns:
+        CostEstimate: Estimated render cost and recommended farm settings
+    """
+    frame_list = get_smart_frame_list(f"{framerange[0]}-{framerange[1]}", 1)
+    probe_frames = tuple(
+        int(frame) for frame in frame_list.split(",")[:PROBE_FRAME_COUNT]
+    )
+
+    temporary_directory = tempfile.mkdtemp()
+
+    probe_times = []
+    peak_memory = 0
+    try:
+        with hou.InterruptableOperation(
+            "Rendering probe frames",
+            long_operation_name="Estimating render cost",
+            open_interrupt_dialog=True,
+        ) as operation:
+            for probe_index, frame in enumerate(probe_frames):
+                operation.updateLongProgress(
+                    probe_index / (len(probe_frames) + 1), f"Probe frame {frame}"
+                )
+                probe_time, probe_memory = render_probe_frame(
+                    node, frame, PROBE_SAMPLE_SCALE, temporary_directory, operation
+                )
+                probe_times.append(probe_time)
+                peak_memory = max(peak_memory, probe_memory)
+
+            operation.updateLongProgress(
+                len(probe_frames) / (len(probe_frames) + 1), "Measuring sample cost"
+            )
+            double_sample_time, _probe_memory = render_probe_frame(
+                node,
+                probe_frames[0],
+                PROBE_SAMPLE_SCALE * 2,
+                temporary_directory,
+                operation,
+            )
+    finally:
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+
+    # Rendering time of the probe settings, without loading the scene
+    render_time = min(max(double_sample_time - probe_times[0], 0), probe_times[0])
+    load_time = probe_times[0] - render_time
+
+    probe_frame_time = sum(probe_times) / len(probe_times)
+    render_time *= probe_frame_time / probe_times[0]
+    frame_time = load_time + render_time / (
+        PROBE_RESOLUTION_SCALE**2 * PROBE_SAMPLE_SCALE
+    )
+    frame_count = framerange[1] - framerange[0] + 1
+    frames_per_task, mode = get_recommended_settings(frame_time, peak_memory)
+
+    return CostEstimate(
+        probe_frames=probe_frames,
+        probe_frame_time=probe_frame_time,
+        frame_time=frame_time,
+        total_time=frame_time * frame_count,
+        peak_memory=peak_memory,
+        frames_per_task=frames_per_task,
+        mode=mode,
+    )
+
+
+def compare_lod_cost(node: hou.Node, frame: int) -> dict:
+    """Renders a probe of a frame without and with LOD selection, so we can see what
+    the LOD selection saves. Both probes use the same reduced resolution and samples.
+
+    Args:
+        node (hou.Node): SGTK Karma node
+        frame (int): Frame to render
+
+    Returns:
+        dict: Render time in seconds and peak memory in bytes, without and with LOD selection
+    """
+    lod_parm = node.parm("enable_lod_selection")
+    lod_enabled = lod_parm.eval()
+    temporary_directory = tempfile.mkdtemp()
+
+    lod_cost = {}
+    try:
+        with hou.InterruptableOperation(
+            "Rendering LOD probes", open_interrupt_dialog=True
+        ) as operation:
+            for lod_state in ("without", "with"):
+                set_parm_value(lod_parm, lod_state == "with")
+                lod_cost[lod_state] = render_probe_frame(
+                    node, frame, PROBE_SAMPLE_SCALE, temporary_directory, operation
+                )
+    finally:
+        set_parm_value(lod_parm, lod_enabled)
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+
+    return lod_cost
+
+
+def store_cost_estimate(
+    node: hou.Node, cost_estimate: CostEstimate, framerange: list[int]
+) -> None:
+    """Stores the estimate on the node, so the farm dialog can show it.
+
+    Args:
+        node (hou.Node): SGTK Karma node
+        cost_estimate (CostEstimate): Estimate to store
+        framerange (list[int]): Frame range the estimate is for
+    """
+    node.setUserData(
+        USER_DATA_KEY,
+        json.dumps({"framerange": framerange, "estimate": asdict(cost_estimate)}),
+    )
+
+
+def get_cost_estimate(node: hou.Node, framerange: list[int]) -> CostEstimate:
+    """Returns the stored estimate for this frame range, or None if there isn't one.
+
+    Args:
+        node (hou.Node): SGTK Karma node
+        framerange (list[int]): Frame range we want an estimate for
+    """
+    stored_estimate = node.userData(USER_DATA_KEY)
+    if not stored_estimate:
+        return None
+
+    stored_estimate = json.loads(stored_estimate)
+    if stored_estimate["framerange"] != list(framerange):
+        return None
+
+    estimate = stored_estimate["estimate"]
+    estimate["probe_frames"] = tuple(estimate["probe_frames"])
+    return CostEstimate(**estimate)
+
+
+def format_duration(seconds: float) -> str:
+    """Formats a duration like 1h 05m.
+
+    Args:
+        seconds (float): Duration in seconds
+    """
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes}m {int(seconds % 60):02d}s"
+
+    return f"{minutes // 60}h {minutes % 60:02d}m"
+
+
+def format_cost_estimate(cost_estimate: CostEstimate) -> str:
+    """Formats an estimate for showing it to the user.
+
+    Args:
+        cost_estimate (CostEstimate): Estimate to format
+    """
+    lines = [
+        f"Estimated time per frame: {format_duration(cost_estimate.frame_time)}",
+        f"Estimated total farm time: {format_duration(cost_estimate.total_time)}",
+    ]
+    if cost_estimate.peak_memory:
+        lines.append(
+            f"Probe peak memory: {cost_estimate.peak_memory / 1024**3:.1f} GB"
+        )
+    lines.append(
+        f"Recommended: {cost_estimate.frames_per_task} frames per task, "
+        f"{MODE_NAMES[cost_estimate.mode]} mode"
+    )
+
+    return "\n".join(lines)
+
+
+def format_lod_cost(lod_cost: dict, frame: int) -> str:
+    """Formats the probe renders without and with LOD selection for showing it to the user.
+
+    Args:
+        lod_cost (dict): Render time and peak memory without and with LOD selection
+        frame (int): Frame the probes rendered
+    """
+    lines = [f"LOD selection on frame {frame}, measured on probe renders:"]
+    for lod_state, (render_time, peak_memory) in lod_cost.items():
+        line = f"{lod_state.capitalize()} LOD selection: {render_time:.1f}s"
+        if peak_memory:
+            line += f", {peak_memory / 1024**3:.2f} GB peak memory"
+        lines.append(line)
+
+    return "\n".join(lines)
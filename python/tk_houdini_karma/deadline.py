@@ -0,0 +1,60 @@
+"""Helpers for submitting jobs to the Deadline render farm. Jobs are submitted by writing
+a job info and a plugin info file and handing those to deadlinecommand."""
+
+import os
+import shutil
+import tempfile
+from subprocess import check_output
+
+
+def write_info_file(filepath: str, info: list[str]) -> None:
+    """Writes a Deadline info file with one key value pair per line.
+
+    Args:
+        filepath (str): File to write
+        info (list[str]): Key value pairs like 'Priority=50'
+    """
+    with open(filepath, "w") as info_file:
+        for item in info:
+            info_file.write(item + "\n")
+
+
+def submit_job(job_info: list[str], plugin_info: list[str]) -> str:
+    """Submits a single job to Deadline.
+
+    Args:
+        job_info (list[str]): Job info key value pairs
+        plugin_info (list[str]): Plugin info key value pairs
+
+    Returns:
+        str: ID of the submitted job, so other jobs can depend on it
+    """
+    deadline_path = os.getenv("DEADLINE_PATH")
+    temporary_directory = tempfile.mkdtemp()
+
+    try:
+        job_info_filepath = os.path.join(temporary_directory, "job_info.txt").replace(
+            os.sep, "/"
+        )
+        write_info_file(job_info_filepath, job_info)
+
+        plugin_info_filepath = os.path.join(
+            temporary_directory, "plugin_info.txt"
+        ).replace(os.sep, "/")
+        write_info_file(plugin_info_filepath, plugin_info)
+
+        deadline_command = [
+            os.path.join(deadline_path, "deadlinecommand"),
+            job_info_filepath,
+            plugin_info_filepath,
+        ]
+        submission_output = check_output(deadline_command).decode(errors="replace")
+
+    finally:
+        shutil.rmtree(temporary_directory)
+
+    for line in submission_output.splitlines():
+        if line.startswith("JobID="):
+            return line.split("=", 1)[1].strip()
+
+    raise RuntimeError(f"Deadline didn't return a job ID: {submission_output}")
@@ -1,12 +1,14 @@
 import os
-import shutil
-import tempfile
-from subprocess import check_output
 
 import hou
 from PySide2 import QtWidgets
 
+from .cost_estimate import format_cost_estimate
+from .assemble_tiles import get_tile_path
+from .composite_fixup import get_fixup_path
+from .deadline import submit_job
 from .get_smart_frame_list import get_smart_frame_list
+from .parameters import bulk_parm_edit, set_parm_value
 
 
 class farm_submission_window(QtWidgets.QWidget):
@@ -22,6 +24,7 @@ class farm_submission_window(QtWidgets.QWidget):
         framerange,
         render_paths,
         render_aovs,
+        cost_estimate=None,
         parent=None,
     ) -> None:
         """This function creates all our UI and connects the UI
@@ -95,6 +98,144 @@ class farm_submission_window(QtWidgets.QWidget):
         layout.addWidget(self.mode)
         layout.addSpacing(16)
 
+        # Show the estimate from the probe render and use its recommendations
+        if cost_estimate:
+            self.estimate_label = QtWidgets.QLabel("Estimate")
+            self.estimate = QtWidgets.QLabel(format_cost_estimate(cost_estimate))
+            layout.addWidget(self.estimate_label)
+            layout.addWidget(self.estimate)
+            layout.addSpacing(16)
+
+            self.frames_per_task_line.setValue(cost_estimate.frames_per_task)
+            self.mode.setCurrentIndex(cost_estimate.mode)
+
+        # Preview job, a cheap render of all frames that runs before the full job
+        self.preview_job = QtWidgets.QCheckBox("Submit Preview Job First", self)
+        layout.addWidget(self.preview_job)
+
+        self.preview_settings = QtWidgets.QWidget()
+        preview_settings_layout = QtWidgets.QHBoxLayout()
+        preview_settings_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.preview_resolution_label = QtWidgets.QLabel("Resolution")
+        self.preview_resolution = QtWidgets.QDoubleSpinBox()
+        self.preview_resolution.setRange(0.05, 1)
+        self.preview_resolution.setSingleStep(0.05)
+        self.preview_resolution.setValue(node.evalParm("preview_resolution_scale"))
+        preview_settings_layout.addWidget(self.preview_resolution_label)
+        preview_settings_layout.addWidget(self.preview_resolution)
+
+        self.preview_samples_label = QtWidgets.QLabel("Samples")
+        self.preview_samples = QtWidgets.QDoubleSpinBox()
+        self.preview_samples.setRange(0.05, 1)
+        self.preview_samples.setSingleStep(0.05)
+        self.preview_samples.setValue(node.evalParm("preview_sample_scale"))
+        preview_settings_layout.addWidget(self.preview_samples_label)
+        preview_settings_layout.addWidget(self.preview_samples)
+
+        self.preview_settings.setLayout(preview_settings_layout)
+        layout.addWidget(self.preview_settings)
+
+        self.hold_for_approval = QtWidgets.QCheckBox(
+            "Hold Full Job Until Preview Is Approved", self
+        )
+        layout.addWidget(self.hold_for_approval)
+        layout.addSpacing(16)
+
+        self.preview_settings.setEnabled(False)
+        self.hold_for_approval.setEnabled(False)
+        self.preview_job.toggled.connect(self.preview_settings.setEnabled)
+        self.preview_job.toggled.connect(self.hold_for_approval.setEnabled)
+
+        # Tiled rendering, for huge frames that would sit on a single worker for hours
+        self.tiled_render = QtWidgets.QCheckBox("Render Frames In Tiles", self)
+        layout.addWidget(self.tiled_render)
+
+        self.tile_settings = QtWidgets.QWidget()
+        tile_settings_layout = QtWidgets.QHBoxLayout()
+        tile_settings_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.tiles_x_label = QtWidgets.QLabel("Tiles X")
+        self.tiles_x = QtWidgets.QSpinBox()
+        self.tiles_x.setRange(1, 16)
+        self.tiles_x.setValue(node.evalParm("tiles_x"))
+        tile_settings_layout.addWidget(self.tiles_x_label)
+        tile_settings_layout.addWidget(self.tiles_x)
+
+        self.tiles_y_label = QtWidgets.QLabel("Tiles Y")
+        self.tiles_y = QtWidgets.QSpinBox()
+        self.tiles_y.setRange(1, 16)
+        self.tiles_y.setValue(node.evalParm("tiles_y"))
+        tile_settings_layout.addWidget(self.tiles_y_label)
+        tile_settings_layout.addWidget(self.tiles_y)
+
+        self.tile_settings.setLayout(tile_settings_layout)
+        layout.addWidget(self.tile_settings)
+        layout.addSpacing(16)
+
+        self.tile_settings.setEnabled(False)
+        self.tiled_render.toggled.connect(self.tile_settings.setEnabled)
+
+        # Fix-up render, only renders the fix-up region and composites it into the frames
+        self.fixup_render = QtWidgets.QCheckBox(
+            "Fix-Up Render Into Existing Frames", self
+        )
+        self.fixup_render.setChecked(node.evalParm("fixup_enable"))
+        layout.addWidget(self.fixup_render)
+        layout.addSpacing(16)
+
+        # Split job, renders deep and cryptomatte after the beauty of every frame
+        self.split_deep = QtWidgets.QCheckBox("Render Deep In Separate Job", self)
+        self.split_deep.setChecked(node.evalParm("split_deep"))
+        self.split_deep.setEnabled(node.evalParm("dcm"))
+        layout.addWidget(self.split_deep)
+
+        self.split_crypto = QtWidgets.QCheckBox(
+            "Render Cryptomatte In Separate Job", self
+        )
+        self.split_crypto.setChecked(node.evalParm("split_crypto"))
+        self.split_crypto.setEnabled(
+            node.evalParm("doprimcrypto") or node.evalParm("domtlcrypto")
+        )
+        layout.addWidget(self.split_crypto)
+
+        self.split_settings = QtWidgets.QWidget()
+        split_settings_layout = QtWidgets.QHBoxLayout()
+        split_settings_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.split_samples_label = QtWidgets.QLabel("Samples")
+        self.split_samples = QtWidgets.QDoubleSpinBox()
+        self.split_samples.setRange(0.05, 1)
+        self.split_samples.setSingleStep(0.05)
+        self.split_samples.setValue(node.evalParm("split_sample_scale"))
+        split_settings_layout.addWidget(self.split_samples_label)
+        split_settings_layout.addWidget(self.split_samples)
+
+        self.split_mode_label = QtWidgets.QLabel("Mode")
+        self.split_mode = QtWidgets.QComboBox()
+        self.split_mode.addItems(modes)
+        self.split_mode.setCurrentIndex(2)
+        split_settings_layout.addWidget(self.split_mode_label)
+        split_settings_layout.addWidget(self.split_mode)
+
+        self.split_settings.setLayout(split_settings_layout)
+        layout.addWidget(self.split_settings)
+        layout.addSpacing(16)
+
+        self.__update_split_settings()
+        self.split_deep.toggled.connect(self.__update_split_settings)
+        self.split_crypto.toggled.connect(self.__update_split_settings)
+
+        # Render passes, every pass renders its part of the stage in its own job
+        self.render_pass_list = app.get_render_passes(node)
+        self.render_passes = QtWidgets.QCheckBox(
+            "Render Passes As Parallel Jobs", self
+        )
+        self.render_passes.setEnabled(bool(self.render_pass_list))
+        self.render_passes.setChecked(bool(self.render_pass_list))
+        layout.addWidget(self.render_passes)
+        layout.addSpacing(16)
+
         buttons_layout = QtWidgets.QHBoxLayout()
         self.ok_button = QtWidgets.QPushButton("Submit")
         self.cancel_button = QtWidgets.QPushButton("Cancel")
@@ -125,111 +266,451 @@ class farm_submission_window(QtWidgets.QWidget):
         if self.smartframes.isChecked():
             framerange = get_smart_frame_list(framerange, frames_per_task)
 
-        mode = self.mode.currentIndex()
-        if mode == 0:
-            concurrent_tasks = "3"
-        elif mode == 1:
-            concurrent_tasks = "2"
-        else:
-            concurrent_tasks = "1"
+        concurrent_tasks = self.__get_concurrent_tasks(self.mode.currentIndex())
+        split_render_paths = self.__get_split_render_paths()
 
-        houdini_file = hou.hipFile.name()
-        houdini_version = hou.applicationVersion()
-        houdini_version = str(houdini_version[0]) + "." + str(houdini_version[1])
+        if self.tiled_render.isChecked() and self.node.evalParm("dcm"):
+            hou.ui.displayMessage(
+                "Submission canceled because deep camera maps can't be rendered in tiles.",
+                severity=hou.severityType.ImportantMessage,
+            )
+            return
 
-        render_rop_node = os.path.join(
-            self.node.path(),
-            "usdrender_rop",
+        if self.fixup_render.isChecked() and self.tiled_render.isChecked():
+            hou.ui.displayMessage(
+                "Submission canceled because fix-up renders can't be rendered in tiles.",
+                severity=hou.severityType.ImportantMessage,
+            )
+            return
+
+        if self.fixup_render.isChecked() and self.node.evalParm("dcm"):
+            hou.ui.displayMessage(
+                "Submission canceled because deep camera maps can't be fixed up.",
+                severity=hou.severityType.ImportantMessage,
+            )
+            return
+
+        if split_render_paths and (
+            self.tiled_render.isChecked() or self.fixup_render.isChecked()
+        ):
+            hou.ui.displayMessage(
+                "Submission canceled because separate deep and cryptomatte jobs "
+                "can't be combined with tiled or fix-up renders.",
+                severity=hou.severityType.ImportantMessage,
+            )
+            return
+
+        if self.render_passes.isChecked() and (
+            split_render_paths
+            or self.tiled_render.isChecked()
+            or self.fixup_render.isChecked()
+        ):
+            hou.ui.displayMessage(
+                "Submission canceled because render passes can't be combined with "
+                "separate deep and cryptomatte jobs, tiled or fix-up renders.",
+                severity=hou.severityType.ImportantMessage,
+            )
+            return
+
+        # The preview ROP reads its settings from the node, so these need to be saved too
+        if self.preview_job.isChecked():
+            with bulk_parm_edit("Update preview settings"):
+                set_parm_value(
+                    self.node.parm("preview_resolution_scale"),
+                    self.preview_resolution.value(),
+                )
+                set_parm_value(
+                    self.node.parm("preview_sample_scale"), self.preview_samples.value()
+                )
+
+        if self.tiled_render.isChecked():
+            with bulk_parm_edit("Update tile settings"):
+                set_parm_value(self.node.parm("tiles_x"), self.tiles_x.value())
+                set_parm_value(self.node.parm("tiles_y"), self.tiles_y.value())
+
+        # The render ROP only renders the fix-up region when fix-up rendering is on
+        set_parm_value(self.node.parm("fixup_enable"), self.fixup_render.isChecked())
+
+        # The beauty ROP leaves out whatever the split ROP renders
+        with bulk_parm_edit("Update split settings"):
+            set_parm_value(self.node.parm("split_deep"), self.split_deep.isChecked())
+            set_parm_value(
+                self.node.parm("split_crypto"), self.split_crypto.isChecked()
+            )
+            set_parm_value(
+                self.node.parm("split_sample_scale"), self.split_samples.value()
+            )
+
+        # Save the file before submitting
+        if hou.hipFile.hasUnsavedChanges():
+            save_message = hou.ui.displayConfirmation(
+                "Current file has unsaved changes, would you like to save?"
+            )
+            if save_message:
+                hou.hipFile.save()
+            else:
+                hou.ui.displayMessage(
+                    "Submission canceled because file is not saved.",
+                    severity=hou.severityType.ImportantMessage,
+                )
+                return
+
+        try:
+            # The full jobs only start once the preview job finished
+            dependencies = []
+            if self.preview_job.isChecked():
+                dependencies.append(
+                    submit_job(
+                        self.__get_preview_job_info(
+                            submission_name, framerange, priority, frames_per_task
+                        ),
+                        self.__get_plugin_info("usdrender_rop_preview"),
+                    )
+                )
+
+            # Passes don't depend on each other, so they all render at the same time
+            if self.render_passes.isChecked():
+                for render_pass in self.render_pass_list:
+                    job_info = self.__get_job_info(
+                        f"{submission_name} ({render_pass['name']})",
+                        framerange,
+                        priority,
+                        self.__get_concurrent_tasks(render_pass["mode"]),
+                        frames_per_task,
+                        self.app.get_output_paths(self.node, render_pass["name"]),
+                    )
+                    job_info.append(
+                        f"EnvironmentKeyValue1=SGTK_KARMA_PASS={render_pass['name']}"
+                    )
+                    self.__add_denoise_post_task(job_info)
+                    self.__add_preview_dependencies(job_info, dependencies)
+                    submit_job(job_info, self.__get_plugin_info("usdrender_rop"))
+
+            elif self.tiled_render.isChecked():
+                tile_count = self.tiles_x.value() * self.tiles_y.value()
+                tile_job_ids = []
+                for tile_index in range(tile_count):
+                    job_info = self.__get_job_info(
+                        f"{submission_name} (tile {tile_index + 1}/{tile_count})",
+                        framerange,
+                        priority,
+                        concurrent_tasks,
+                        frames_per_task,
+                        [
+                            get_tile_path(path, tile_index)
+                            for path in self.__get_rendered_paths()
+                        ],
+                    )
+                    job_info.append(f"EnvironmentKeyValue1=SGTK_KARMA_TILE={tile_index}")
+                    self.__add_preview_dependencies(job_info, dependencies)
+                    tile_job_ids.append(
+                        submit_job(job_info, self.__get_plugin_info("usdrender_rop"))
+                    )
+
+                submit_job(
+                    *self.__get_assembly_job(
+                        submission_name,
+                        framerange,
+                        priority,
+                        frames_per_task,
+                        tile_count,
+                        tile_job_ids,
+                    )
+                )
+
+            elif self.fixup_render.isChecked():
+                job_info = self.__get_job_info(
+                    submission_name + " (fix-up)",
+                    framerange,
+                    priority,
+                    concurrent_tasks,
+                    frames_per_task,
+                    [get_fixup_path(path) for path in self.__get_rendered_paths()],
+                )
+                self.__add_preview_dependencies(job_info, dependencies)
+                fixup_job_id = submit_job(
+                    job_info, self.__get_plugin_info("usdrender_rop")
+                )
+
+                submit_job(
+                    *self.__get_composite_job(
+                        submission_name,
+                        framerange,
+                        priority,
+                        frames_per_task,
+                        fixup_job_id,
+                    )
+                )
+
+            else:
+                job_info = self.__get_job_info(
+                    submission_name,
+                    framerange,
+                    priority,
+                    concurrent_tasks,
+                    frames_per_task,
+                    [
+                        path
+                        for path in self.render_paths
+                        if path not in split_render_paths
+                    ],
+                )
+                self.__add_denoise_post_task(job_info)
+                self.__add_preview_dependencies(job_info, dependencies)
+                job_id = submit_job(job_info, self.__get_plugin_info("usdrender_rop"))
+
+                # Every frame of the split job starts once its beauty frame is done.
+                # Both jobs open the scene and cook the stage themselves, there is
+                # no stage export they share.
+                if split_render_paths:
+                    split_job_info = self.__get_job_info(
+                        submission_name + " (deep/crypto)",
+                        framerange,
+                        priority,
+                        self.__get_concurrent_tasks(self.split_mode.currentIndex()),
+                        frames_per_task,
+                        split_render_paths,
+                    )
+                    split_job_info.append("JobDependencies=" + job_id)
+                    split_job_info.append("IsFrameDependent=true")
+                    submit_job(
+                        split_job_info, self.__get_plugin_info("usdrender_rop_split")
+                    )
+
+            hou.ui.displayMessage("Job successfully submitted to Deadline")
+
+        except Exception as e:
+            self.app.logger.debug(
+                "An error occured while submitting to farm. %s" % str(e)
+            )
+
+    def __update_split_settings(self) -> None:
+        """Only enables the split job settings when something renders in the split job."""
+        self.split_settings.setEnabled(
+            self.split_deep.isChecked() or self.split_crypto.isChecked()
         )
-        render_rop_node = render_rop_node.replace(os.sep, "/")
 
-        deadline_path = os.getenv("DEADLINE_PATH")
+    def __get_split_render_paths(self) -> list[str]:
+        """Returns the render paths of the outputs that render in the split job."""
+        split_render_paths = []
+        if self.split_deep.isEnabled() and self.split_deep.isChecked():
+            split_render_paths.append(self.app.get_output_path(self.node, "deep"))
 
-        post_task_script = self.app.get_setting("post_task_script")
+        if self.split_crypto.isEnabled() and self.split_crypto.isChecked():
+            split_render_paths.append(self.app.get_output_path(self.node, "crypto"))
 
-        # Building job info properties
+        return split_render_paths
+
+    @staticmethod
+    def __get_concurrent_tasks(mode: int) -> str:
+        """Returns the concurrent tasks of a farm mode, heavier modes run fewer tasks."""
+        if mode == 0:
+            return "3"
+        elif mode == 1:
+            return "2"
+        else:
+            return "1"
+
+    @staticmethod
+    def __get_job_info(
+        name: str,
+        framerange: str,
+        priority: str,
+        concurrent_tasks: str,
+        frames_per_task: int,
+        render_paths: list[str],
+    ) -> list[str]:
+        """Builds the job info properties shared by all our jobs."""
         job_info = [
             "Plugin=Houdini",
             "Frames=" + framerange,
             "Priority=" + priority,
             "ConcurrentTasks=" + concurrent_tasks,
             "ChunkSize=" + str(frames_per_task),
-            "Name=" + submission_name,
+            "Name=" + name,
             "Department=3D",
             "EnvironmentKeyValue0 = RENDER_ENGINE = Karma",
         ]
 
+        for i, path in enumerate(render_paths):
+            output_directory = os.path.dirname(path)
+            job_info.append("OutputDirectory{}={}".format(i, output_directory))
+            output_filename = os.path.basename(path).replace("$F4", "%04d")
+            job_info.append("OutputFilename{}={}".format(i, output_filename))
+
+        return job_info
+
+    def __add_denoise_post_task(self, job_info: list[str]) -> None:
+        """Adds the post-task script that denoises our frames to a job."""
+        post_task_script = self.app.get_setting("post_task_script")
+
         # Only do post-task script if we use denoise
         if post_task_script and self.node.evalParm("denoise"):
             job_info.append("PostTaskScript=" + post_task_script)
             job_info.append(f"ExtraInfoKeyValue0=RenderAOVs={self.render_aovs}")
 
+    def __add_preview_dependencies(
+        self, job_info: list[str], dependencies: list[str]
+    ) -> None:
+        """Makes a job wait for the preview job, and hold it for approval if requested."""
+        if not dependencies:
+            return
+
+        job_info.append("JobDependencies=" + ",".join(dependencies))
+        if self.hold_for_approval.isChecked():
+            job_info.append("InitialStatus=Suspended")
+
+    def __get_assembly_job(
+        self,
+        name: str,
+        framerange: str,
+        priority: str,
+        frames_per_task: int,
+        tile_count: int,
+        tile_job_ids: list[str],
+    ) -> tuple[list[str], list[str]]:
+        """Builds the job and plugin info for the job that stitches the tiles together.
+        Every frame gets assembled as soon as all tiles of that frame are done."""
+        job_info = [
+            "Plugin=CommandLine",
+            "Frames=" + framerange,
+            "Priority=" + priority,
+            "ChunkSize=" + str(frames_per_task),
+            "Name=" + name + " (assembly)",
+            "Department=3D",
+            "JobDependencies=" + ",".join(tile_job_ids),
+            "IsFrameDependent=true",
+        ]
+
         for i, path in enumerate(self.render_paths):
             output_directory = os.path.dirname(path)
             job_info.append("OutputDirectory{}={}".format(i, output_directory))
             output_filename = os.path.basename(path).replace("$F4", "%04d")
             job_info.append("OutputFilename{}={}".format(i, output_filename))
 
-        # Building plugin info properties
-        plugin_info = [
-            "OutputDriver=" + render_rop_node,
-            "Version=" + houdini_version,
-            "SceneFile=" + houdini_file,
+        # Denoising happens on the assembled frames
+        self.__add_denoise_post_task(job_info)
+
+        plugin_info = self.__get_hython_plugin_info(
+            "assemble_tiles.py", f"--tiles {tile_count}"
+        )
+
+        return job_info, plugin_info
+
+    def __get_composite_job(
+        self,
+        name: str,
+        framerange: str,
+        priority: str,
+        frames_per_task: int,
+        fixup_job_id: str,
+    ) -> tuple[list[str], list[str]]:
+        """Builds the job and plugin info for the job that composites the fix-up renders
+        into the existing frames. Every frame gets composited as soon as its fix-up is done."""
+        job_info = [
+            "Plugin=CommandLine",
+            "Frames=" + framerange,
+            "Priority=" + priority,
+            "ChunkSize=" + str(frames_per_task),
+            "Name=" + name + " (fix-up composite)",
+            "Department=3D",
+            "JobDependencies=" + fixup_job_id,
+            "IsFrameDependent=true",
         ]
-        # Save the file before submitting
-        if hou.hipFile.hasUnsavedChanges():
-            save_message = hou.ui.displayConfirmation(
-                "Current file has unsaved changes, would you like to save?"
-            )
-            if save_message:
-                hou.hipFile.save()
-            else:
-                hou.ui.displayMessage(
-                    "Submission canceled because file is not saved.",
-                    severity=hou.severityType.ImportantMessage,
-                )
-                return
 
-        temporary_directory = tempfile.mkdtemp()
-        self.app.logger.debug("Created temporary directory")
+        for i, path in enumerate(self.render_paths):
+            output_directory = os.path.dirname(path)
+            job_info.append("OutputDirectory{}={}".format(i, output_directory))
+            output_filename = os.path.basename(path).replace("$F4", "%04d")
+            job_info.append("OutputFilename{}={}".format(i, output_filename))
 
-        try:
-            # Writing job_info.txt
-            job_info_filepath = os.path.join(
-                temporary_directory, "job_info.txt"
-            ).replace(os.sep, "/")
-            job_info_textfile = open(job_info_filepath, "w")
-            for item in job_info:
-                job_info_textfile.write(item + "\n")
-            job_info_textfile.close()
-
-            # Writing plugin_info.txt
-            plugin_info_filepath = os.path.join(
-                temporary_directory, "plugin_info.txt"
-            ).replace(os.sep, "/")
-            plugin_info_textfile = open(plugin_info_filepath, "w")
-            for item in plugin_info:
-                plugin_info_textfile.write(item + "\n")
-            plugin_info_textfile.close()
-
-            deadline_command = [
-                os.path.join(deadline_path, "deadlinecommand"),
-                job_info_filepath,
-                plugin_info_filepath,
-            ]
-
-            # Why?
-            execute_submission = check_output(deadline_command)
-            hou.ui.displayMessage("Job successfully submitted to Deadline")
+        # Denoising happens again on the composited frames
+        self.__add_denoise_post_task(job_info)
 
-        except Exception as e:
-            self.app.logger.debug(
-                "An error occured while submitting to farm. %s" % str(e)
-            )
+        plugin_info = self.__get_hython_plugin_info("composite_fixup.py")
 
-        finally:
-            shutil.rmtree(temporary_directory)
-            self.app.logger.debug("Removed temporary directory")
+        return job_info, plugin_info
+
+    def __get_rendered_paths(self) -> list[str]:
+        """Returns the render paths that Karma renders itself. The denoised image only
+        exists once the post-task script ran, so tiles and fix-ups never have one."""
+        if not self.node.evalParm("denoise"):
+            return self.render_paths
+
+        denoise_path = self.app.get_output_path(self.node, "denoise")
+        return [path for path in self.render_paths if path != denoise_path]
+
+    def __get_hython_plugin_info(
+        self, script_name: str, arguments: str = ""
+    ) -> list[str]:
+        """Builds the plugin info that runs one of our image scripts with hython on the
+        farm. The scripts need OpenImageIO, which the Python that Deadline ships with
+        doesn't have, so we use the Python that comes with Houdini.
+
+        Args:
+            script_name: File name of the script in this package
+            arguments: Arguments for the script, besides the frame range and the paths
+        """
+        hython_path = self.app.get_setting("hython_path") or hou.text.expandString(
+            "$HFS/bin/hython"
+        )
+        script_path = os.path.join(
+            self.app.disk_location, "python", "tk_houdini_karma", script_name
+        ).replace(os.sep, "/")
+        output_paths = " ".join(
+            '"{}"'.format(path.replace("$F4", "%04d"))
+            for path in self.__get_rendered_paths()
+        )
+
+        script_arguments = [f'"{script_path}"']
+        if arguments:
+            script_arguments.append(arguments)
+        script_arguments.append("--start-frame <STARTFRAME> --end-frame <ENDFRAME>")
+        script_arguments.append(output_paths)
+
+        return [
+            "Executable=" + hython_path,
+            "Arguments=" + " ".join(script_arguments),
+        ]
+
+    def __get_preview_job_info(
+        self, name: str, framerange: str, priority: str, frames_per_task: int
+    ) -> list[str]:
+        """Builds the job info for the preview job. Previews are cheap,
+        so they render as many tasks at once as possible on the preview pool."""
+        preview_path = self.app.get_output_path(self.node, "preview")
+        job_info = self.__get_job_info(
+            name + " (preview)",
+            framerange,
+            priority,
+            "3",
+            frames_per_task,
+            [preview_path],
+        )
+
+        preview_pool = self.app.get_setting("preview_pool")
+        if preview_pool:
+            job_info.append("Pool=" + preview_pool)
+
+        return job_info
+
+    def __get_plugin_info(self, render_rop_name: str) -> list[str]:
+        """Builds the plugin info properties for rendering one of our ROPs."""
+        houdini_file = hou.hipFile.name()
+        houdini_version = hou.applicationVersion()
+        houdini_version = str(houdini_version[0]) + "." + str(houdini_version[1])
+
+        render_rop_node = os.path.join(
+            self.node.path(),
+            render_rop_name,
+        )
+        render_rop_node = render_rop_node.replace(os.sep, "/")
+
+        return [
+            "OutputDriver=" + render_rop_node,
+            "Version=" + houdini_version,
+            "SceneFile=" + houdini_file,
+        ]
 
     def __close_window(self):
         self.app.logger.debug("Canceled submission")
@@ -8,7 +8,24 @@ import re
 import hou
 import sgtk
 
+from .cost_estimate import (
+    compare_lod_cost,
+    estimate_render_cost,
+    format_cost_estimate,
+    format_lod_cost,
+    get_cost_estimate,
+    store_cost_estimate,
+)
+from .composite_fixup import composite_fixup_frames
 from .farm_dialog import farm_submission_window
+from .noise_target import solve_noise_target
+from .parameters import (
+    bulk_parm_edit,
+    get_multiparm_values,
+    set_multiparm_values,
+    set_parm_expression,
+    set_parm_value,
+)
 from ..datamodel.metadata import MetaData
 
 
@@ -16,6 +33,9 @@ class karma_node_handler(object):
     def __init__(self, app) -> None:
         self.app = app
         self.sg = self.app.shotgun
+        self.metadata_items = self.compile_metadata_config(
+            self.app.get_setting("render_metadata")
+        )
 
     def submit_to_farm(self, node: hou.Node) -> None:
         """This function opens the dialogue box for submitting
@@ -39,23 +59,165 @@ class karma_node_handler(object):
         for path in render_paths:
             self.__create_directory(path)
 
+        for render_pass in self.get_render_passes(node):
+            for path in self.get_output_paths(node, render_pass["name"]):
+                self.__create_directory(path)
+
         # Determine basic variables for submission
         file_name = hou.hipFile.name()
         file_name = os.path.basename(file_name).split(".")[0] + " (%s)" % render_name
 
         # Determine framerange
-        framerange = self.get_output_range(node)
-        framerange = f"{framerange[0]}-{framerange[1]}"
+        output_range = self.get_output_range(node)
+        framerange = f"{output_range[0]}-{output_range[1]}"
 
         # Start submission panel
         render_aovs = self.get_render_aovs(node)
+        cost_estimate = get_cost_estimate(node, output_range)
 
         global farm_submission
         farm_submission = farm_submission_window(
-            self.app, node, file_name, 50, framerange, render_paths, render_aovs
+            self.app,
+            node,
+            file_name,
+            50,
+            framerange,
+            render_paths,
+            render_aovs,
+            cost_estimate,
         )
         farm_submission.show()
 
+    def estimate_render_cost(self, node: hou.Node) -> None:
+        """Renders a few probe frames to estimate what the render will cost on the farm.
+        The estimate gets stored on the node, so the farm dialog can show it.
+
+        Args:
+            node (hou.Node): SGTK Karma node
+        """
+        if not self.validate_node(node):
+            return
+
+        framerange = self.get_output_range(node)
+
+        try:
+            cost_estimate = estimate_render_cost(node, framerange)
+        except (RuntimeError, OSError, hou.OperationInterrupted) as error:
+            hou.ui.displayMessage(
+                f"Couldn't estimate the render cost: {error}",
+                severity=hou.severityType.Error,
+            )
+            return
+
+        store_cost_estimate(node, cost_estimate, framerange)
+        hou.ui.displayMessage(format_cost_estimate(cost_estimate))
+
+    def compare_lod_cost(self, node: hou.Node) -> None:
+        """Renders a probe of the current frame without and with LOD selection,
+        and shows the render time and memory of both.
+
+        Args:
+            node (hou.Node): SGTK Karma node
+        """
+        if not self.validate_node(node):
+            return
+
+        frame = int(hou.frame())
+
+        try:
+            lod_cost = compare_lod_cost(node, frame)
+        except (RuntimeError, OSError, hou.OperationInterrupted) as error:
+            hou.ui.displayMessage(
+                f"Couldn't compare the LOD cost: {error}",
+                severity=hou.severityType.Error,
+            )
+            return
+
+        hou.ui.displayMessage(format_lod_cost(lod_cost, frame))
+
+    def solve_noise_target(self, node: hou.Node) -> None:
+        """Renders a noise probe and sets the pixel samples that reach the noise target.
+
+        Args:
+            node (hou.Node): SGTK Karma node
+        """
+        if not self.validate_node(node):
+            return
+
+        try:
+            noise_target_result = solve_noise_target(node)
+        except ImportError:
+            hou.ui.displayMessage(
+                "Couldn't measure the noise, OpenImageIO is not available in this Houdini.",
+                severity=hou.severityType.Error,
+            )
+            return
+        except (RuntimeError, OSError, hou.OperationInterrupted) as error:
+            hou.ui.displayMessage(
+                f"Couldn't measure the noise: {error}",
+                severity=hou.severityType.Error,
+            )
+            return
+
+        hou.ui.displayMessage(
+            f"Pixel samples set to {noise_target_result['pixel_samples']} "
+            f"(was {noise_target_result['previous_pixel_samples']}).\n"
+            f"Predicted speed up: {noise_target_result['speed_up']:.2f}x\n\n"
+            "Only the pixel samples were solved, the secondary samples and light "
+            "quality stay as they are."
+        )
+
+    def composite_fixup(self, node: hou.Node) -> None:
+        """Composites the fix-up renders of the frame range back into the existing frames.
+
+        Args:
+            node (hou.Node): SGTK Karma node
+        """
+        if node.evalParm("dcm"):
+            hou.ui.displayMessage(
+                "Deep camera maps can't be fixed up, turn off DCM to composite the fix-up.",
+                severity=hou.severityType.Error,
+            )
+            return
+
+        render_paths = [
+            path.replace("$F4", "%04d") for path in self.get_output_paths(node)
+        ]
+        output_range = self.get_output_range(node)
+
+        try:
+            with hou.InterruptableOperation(
+                "Compositing fix-up", open_interrupt_dialog=True
+            ):
+                composited_count = composite_fixup_frames(
+                    render_paths, range(output_range[0], output_range[1] + 1)
+                )
+        except ImportError:
+            hou.ui.displayMessage(
+                "Couldn't composite the fix-up, OpenImageIO is not available in this Houdini.",
+                severity=hou.severityType.Error,
+            )
+            return
+        except (RuntimeError, OSError, hou.OperationInterrupted) as error:
+            hou.ui.displayMessage(
+                f"Couldn't composite the fix-up: {error}",
+                severity=hou.severityType.Error,
+            )
+            return
+
+        message = f"Composited the fix-up into {composited_count} images."
+
+        # Only the farm denoises, locally the denoised images keep the old region
+        if composited_count and node.evalParm("denoise"):
+            hou.ui.displayMessage(
+                message + "\n\nThe denoised images weren't updated, composite the "
+                "fix-up on the farm to denoise them again.",
+                severity=hou.severityType.Warning,
+            )
+            return
+
+        hou.ui.displayMessage(message)
+
     def render_locally(self, node: hou.Node) -> None:
         """Start local render
 
@@ -78,6 +240,14 @@ class karma_node_handler(object):
 
         node.node("usdrender_rop").parm("execute").pressButton()
 
+        # Split off deep and cryptomatte outputs are left out of the beauty render
+        split_deep = node.evalParm("split_deep") and node.evalParm("dcm")
+        split_crypto = node.evalParm("split_crypto") and (
+            node.evalParm("doprimcrypto") or node.evalParm("domtlcrypto")
+        )
+        if split_deep or split_crypto:
+            node.node("usdrender_rop_split").parm("execute").pressButton()
+
         hou.ui.displayMessage(
             "Local render started! Check your Render -> Scheduler to see the progress.",
             severity=hou.severityType.Message,
@@ -102,8 +272,7 @@ class karma_node_handler(object):
 
         os.startfile(os.path.abspath(render_parent_path))
 
-    @staticmethod
-    def validate_node(node: hou.Node) -> bool:
+    def validate_node(self, node: hou.Node) -> bool:
         """This function will make sure all the parameters
         are filled in and setup correctly.
 
@@ -137,47 +306,35 @@ class karma_node_handler(object):
             )
             return False
 
+        # Render pass names end up in the output name, so they follow the same rules
+        pass_names = [render_pass["name"] for render_pass in self.get_render_passes(node)]
+        for pass_name in pass_names:
+            if not pass_name.isalnum():
+                hou.ui.displayMessage(
+                    f"Render pass name '{pass_name}' is not alphanumeric, please only use "
+                    "alphabet letters (a-z) and numbers (0-9).",
+                    severity=hou.severityType.Error,
+                )
+                return False
+
+        if len(set(pass_names)) != len(pass_names):
+            hou.ui.displayMessage(
+                "Render pass names are not unique, please give every render pass its own name.",
+                severity=hou.severityType.Error,
+            )
+            return False
+
         return True
 
     def setup_metadata(self, node: hou.Node) -> bool:
         """Sets ShotGrid metadata and validates user-set metadata. 'Borrowed' from tk-houdini-renderman."""
         node.allowEditingOfContents()
 
-        md_config = self.app.get_setting("render_metadata")
-
-        md_items = [
-            MetaData("colorspace", "string", "ACES - ACEScg"),
-        ]
-        md_config_groups = {}
-
-        for md in md_config:
-            key = f'rmd_{md.get("key")}'
-            md_items.append(
-                MetaData(
-                    key,
-                    md.get("type"),
-                    (
-                        f'`{md.get("expression")}`'
-                        if md.get("expression")
-                        else md.get("value")
-                    ),
-                )
-            )
-            group = md.get("group")
-            # TODO should use prefixed version in group mapping?
-            if md_config_groups.get(group):
-                md_config_groups.get(group).append(key)
-            else:
-                md_config_groups[group] = [key]
-        md_items.append(
-            MetaData("rmd_PostRenderGroups", "string", json.dumps(md_config_groups))
-        )
-
         md_artist = str(self.app.context.user["id"])
 
         # Check if custom metadata has valid keys
-        for j in range(1, node.evalParm("metadata_entries") + 1):
-            md_key = node.parm(f"metadata_{j}_key").eval()
+        for user_md in get_multiparm_values(node, "metadata_entries"):
+            md_key = user_md["metadata_#_key"]
             if not re.match(r"^[A-Za-z0-9_]+$", md_key):
                 hou.ui.displayMessage(
                     f'The metadata key "{md_key}" is invalid. You can only use letters, numbers, and '
@@ -188,25 +345,65 @@ class karma_node_handler(object):
 
         node_md = node.node("sg_metadata")
 
-        node_md.parm("artist").set(md_artist)
+        md_entries = []
+        for item in self.metadata_items:
+            item: MetaData
 
-        node_md.parm("metadata_entries").set(0)
-        node_md.parm("metadata_entries").set(len(md_items))
+            md_entry = {"metadata_#_key": item.key, "metadata_#_type": item.type}
+            if not item.is_expression:
+                md_entry[f"metadata_#_{item.type}"] = item.value
+            md_entries.append(md_entry)
 
-        for i, item in enumerate(md_items):
-            item: MetaData
+        with bulk_parm_edit("Update ShotGrid metadata"):
+            set_parm_value(node_md.parm("artist"), md_artist)
+            set_multiparm_values(node_md, "metadata_entries", md_entries)
 
-            node_md.parm(f"metadata_{i + 1}_key").set(item.key)
-            node_md.parm(f"metadata_{i + 1}_type").set(item.type)
-            if "`" in item.value:
-                expression = item.value[1:-1]
+            for i, item in enumerate(self.metadata_items):
+                if item.is_expression:
+                    set_parm_expression(
+                        node_md.parm(f"metadata_{i + 1}_{item.type}"), item.value
+                    )
+
+        return True
+
+    @staticmethod
+    def compile_metadata_config(md_config: list[dict]) -> tuple[MetaData]:
+        """Converts the render_metadata setting into the metadata items we set on
+        the sg_metadata node. Expressions get rewritten to point at the SGTK Karma
+        node and the group mapping gets serialized here, so we only do this once.
+
+        Args:
+            md_config (list[dict]): Value of the render_metadata setting
+        """
+        md_items = [
+            MetaData("colorspace", "string", "ACES - ACEScg", False),
+        ]
+        md_config_groups = {}
+
+        for md in md_config or []:
+            key = f'rmd_{md.get("key")}'
+            expression = md.get("expression")
+            if expression:
+                # The sg_metadata node lives inside our SGTK Karma node,
+                # so channel references need to go up one level.
                 expression = re.sub(r"(ch[a-z]*)(\()([\"'])", r"\1(\3../", expression)
+                md_items.append(MetaData(key, md.get("type"), expression, True))
+            else:
+                md_items.append(MetaData(key, md.get("type"), md.get("value"), False))
 
-                node_md.parm(f"metadata_{i + 1}_{item.type}").setExpression(expression)
+            group = md.get("group")
+            # TODO should use prefixed version in group mapping?
+            if md_config_groups.get(group):
+                md_config_groups.get(group).append(key)
             else:
-                node_md.parm(f"metadata_{i + 1}_{item.type}").set(item.value)
+                md_config_groups[group] = [key]
+        md_items.append(
+            MetaData(
+                "rmd_PostRenderGroups", "string", json.dumps(md_config_groups), False
+            )
+        )
 
-        return True
+        return tuple(md_items)
 
     def setup_output_paths(self, node: hou.Node) -> bool:
         """This function sets the proper ShotGrid output paths for our node."""
@@ -218,26 +415,49 @@ class karma_node_handler(object):
         if not self.validate_node(node):
             return False
 
-        karma_renderingsettings_node.parm("picture").set(
-            self.get_output_path(node, "main")
+        set_parm_value(
+            karma_renderingsettings_node.parm("picture"),
+            self.get_output_path(node, "main"),
         )
 
-        karma_renderingsettings_node.parm("dcmfilename").set(
-            self.get_output_path(node, "deep")
+        set_parm_value(
+            karma_renderingsettings_node.parm("dcmfilename"),
+            self.get_output_path(node, "deep"),
         )
 
-        karma_crypto_node.parm("cryptopicture").set(
-            self.get_output_path(node, "crypto")
+        set_parm_value(
+            karma_crypto_node.parm("cryptopicture"),
+            self.get_output_path(node, "crypto"),
         )
 
+        # Nodes from an OTL before version 1.0.5 don't have a preview output
+        if node.parm("preview_picture") is not None:
+            set_parm_value(
+                node.parm("preview_picture"),
+                self.get_output_path(node, "preview"),
+            )
+
+        # Every render pass renders our outputs to its own output,
+        # the render_pass node picks these up on the farm
+        render_pass_outputs = {}
+        for render_pass in self.get_render_passes(node):
+            render_pass_outputs[render_pass["name"]] = {
+                aov_name: self.get_output_path(node, aov_name, render_pass["name"])
+                for aov_name in ("main", "crypto", "deep")
+            }
+        node.setUserData("render_pass_outputs", json.dumps(render_pass_outputs))
+
         return True
 
-    def get_output_path(self, node: hou.Node, aov_name: str) -> str:
+    def get_output_path(
+        self, node: hou.Node, aov_name: str, render_pass: str = ""
+    ) -> str:
         """Calculate render path for an aov
 
         Args:
             node (hou.Node): Karma node
             aov_name (str): AOV name
+            render_pass (str): Render pass, which gets added to the output name
         """
         aov_name = aov_name[0].lower() + aov_name[1:]
 
@@ -248,31 +468,49 @@ class karma_node_handler(object):
 
         # Set fields
         fields = work_template.get_fields(current_filepath)
-        fields["output"] = node.parm("name").eval()
+        # Render passes render to their own output, named like mainEnvironment
+        fields["output"] = (
+            node.parm("name").eval() + render_pass[:1].upper() + render_pass[1:]
+        )
         fields["SEQ"] = "FORMAT: $F"
         fields["aov_name"] = aov_name
         fields["width"] = node.parm("resolutionx").eval()
         fields["height"] = node.parm("resolutiony").eval()
         return render_template.apply_fields(fields).replace(os.sep, "/")
 
-    def get_output_paths(self, node: hou.Node) -> list[str]:
+    def get_output_paths(self, node: hou.Node, render_pass: str = "") -> list[str]:
         """This function returns all output paths for the Deadline job."""
         paths = []
 
-        paths.append(self.get_output_path(node, "main"))
+        paths.append(self.get_output_path(node, "main", render_pass))
 
         # Crypto needs seperate file because of a Nuke bug
         if node.evalParm("doprimcrypto") or node.evalParm("domtlcrypto"):
-            paths.append(self.get_output_path(node, "crypto"))
+            paths.append(self.get_output_path(node, "crypto", render_pass))
 
         if node.evalParm("denoise"):
-            paths.append(self.get_output_path(node, "denoise"))
+            paths.append(self.get_output_path(node, "denoise", render_pass))
 
         if node.evalParm("dcm"):
-            paths.append(self.get_output_path(node, "deep"))
+            paths.append(self.get_output_path(node, "deep", render_pass))
 
         return paths
 
+    @staticmethod
+    def get_render_passes(node: hou.Node) -> list[dict]:
+        """This function returns the render passes on the node, with their farm mode."""
+        # Nodes from an OTL before version 1.0.5 don't have render passes
+        if node.parm("render_passes") is None:
+            return []
+
+        return [
+            {
+                "name": render_pass["render_pass_name_#"],
+                "mode": render_pass["render_pass_mode_#"],
+            }
+            for render_pass in get_multiparm_values(node, "render_passes")
+        ]
+
     def get_output_range(self, node: hou.Node) -> list[int]:
         """This function returns our frame range or a single frame."""
         framerange_type = node.parm("trange").eval()
@@ -0,0 +1,164 @@
+"""Picks the pixel samples for a noise target, instead of guessing them by hand.
+We render the same low sample probe twice with a different random seed. The difference
+between those two renders is pure noise, which tells us how noisy the probe is.
+Noise goes down with the square root of the samples, so from there we solve for the
+samples we need to reach the target. We only solve the pixel samples. The secondary
+samples and light quality stay as they are set on the node, both in the probes and in
+the render, so noise that comes from them is part of what the pixel samples have to
+clean up."""
+
+import json
+import math
+import os
+import shutil
+import tempfile
+
+import hou
+import numpy
+
+from .cost_estimate import export_probe_stage, run_probe_render
+from .parameters import set_parm_value
+from .pixel_samples import get_pixel_samples_parm
+
+NOISE_PROBE_SAMPLES = 16
+RANDOM_SEED_ATTRIBUTE = "karma:global:randomseed"
+
+# We look at the noisiest pixels instead of the average, so a few bad areas still count
+NOISE_PERCENTILE = 95
+
+# Noise is measured relative to the brightness of a pixel, this keeps black pixels from
+# making the noise infinitely large
+NOISE_BRIGHTNESS_OFFSET = 0.05
+
+# The denoiser cleans up a fair amount of noise, so we allow this much more of it
+DENOISE_NOISE_SCALE = 2.0
+
+USER_DATA_KEY = "noise_target"
+
+
+def read_luminance(image_path: str) -> numpy.ndarray:
+    """Reads the luminance of an image.
+
+    Args:
+        image_path (str): Image to read
+    """
+    import OpenImageIO
+
+    image_input = OpenImageIO.ImageInput.open(image_path)
+    if image_input is None:
+        raise RuntimeError(f"Couldn't read probe image {image_path}.")
+
+    try:
+        pixels = image_input.read_image(format="float")
+    finally:
+        image_input.close()
+
+    return pixels[..., :3] @ numpy.array([0.2126, 0.7152, 0.0722])
+
+
+def measure_noise(image_path: str, second_image_path: str) -> float:
+    """Measures the relative noise of a render, from two renders with a different seed.
+
+    Args:
+        image_path (str): First render
+        second_image_path (str): Second render, with a different seed
+
+    Returns:
+        float: Relative noise of the noisiest pixels
+    """
+    luminance = read_luminance(image_path)
+    second_luminance = read_luminance(second_image_path)
+
+    # The difference of two independent renders has twice the variance of one render
+    noise = numpy.abs(luminance - second_luminance) / math.sqrt(2)
+    brightness = (luminance + second_luminance) / 2 + NOISE_BRIGHTNESS_OFFSET
+
+    return float(numpy.percentile(noise / brightness, NOISE_PERCENTILE))
+
+
+def solve_pixel_samples(probe_samples: int, probe_noise: float, target_noise: float) -> int:
+    """Solves for the samples we need to reach the noise target.
+
+    Args:
+        probe_samples (int): Samples the probe rendered with
+        probe_noise (float): Noise we measured in the probe
+        target_noise (float): Noise we want
+    """
+    return max(math.ceil(probe_samples * (probe_noise / target_noise) ** 2), 1)
+
+
+def solve_noise_target(node: hou.Node) -> dict:
+    """Renders the noise probes, solves for the pixel samples that reach the noise
+    target on the node and sets them. Secondary samples and light quality are left
+    alone. The chosen settings are stored on the node.
+
+    Args:
+        node (hou.Node): SGTK Karma node
+
+    Returns:
+        dict: Chosen pixel samples, measured and target noise and the predicted speed up
+    """
+    frame = int(hou.frame())
+    target_noise = node.evalParm("noise_target")
+    if node.evalParm("denoise"):
+        target_noise *= DENOISE_NOISE_SCALE
+
+    pixel_samples_parm = get_pixel_samples_parm(node)
+    current_samples = pixel_samples_parm.eval()
+    sample_scale = NOISE_PROBE_SAMPLES / max(current_samples, 1)
+    probe_samples = max(int(current_samples * sample_scale), 1)
+
+    husk = hou.text.expandString("$HFS/bin/husk")
+    renderer = node.node("usdrender_rop").evalParm("renderer")
+    temporary_directory = tempfile.mkdtemp()
+
+    probe_images = []
+    try:
+        with hou.InterruptableOperation(
+            "Rendering noise probes", open_interrupt_dialog=True
+        ) as operation:
+            for seed in (1, 2):
+                output_directory = os.path.join(temporary_directory, f"seed_{seed}")
+                os.makedirs(output_directory)
+                probe_file = os.path.join(output_directory, "probe.usd")
+
+                probe_image = export_probe_stage(
+                    node,
+                    frame,
+                    sample_scale,
+                    probe_file,
+                    output_directory,
+                    {RANDOM_SEED_ATTRIBUTE: seed},
+                )
+                if probe_image is None:
+                    raise RuntimeError("Couldn't find the beauty render product.")
+
+                run_probe_render(
+                    [husk, "--renderer", renderer, "--frame", str(frame), probe_file],
+                    operation,
+                )
+                probe_images.append(probe_image)
+
+        probe_noise = measure_noise(*probe_images)
+    finally:
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+
+    # Identical probes mean the seed didn't change the render, so we can't measure noise
+    if probe_noise <= 0:
+        raise RuntimeError(
+            "Both noise probes rendered the same image, so the noise can't be measured."
+        )
+
+    pixel_samples = solve_pixel_samples(probe_samples, probe_noise, target_noise)
+    set_parm_value(pixel_samples_parm, pixel_samples)
+
+    noise_target_result = {
+        "pixel_samples": pixel_samples,
+        "previous_pixel_samples": current_samples,
+        "probe_noise": probe_noise,
+        "target_noise": target_noise,
+        "speed_up": current_samples / pixel_samples,
+    }
+    node.setUserData(USER_DATA_KEY, json.dumps(noise_target_result))
+
+    return noise_target_result
@@ -0,0 +1,181 @@
+"""Helpers for writing parameters on our nodes. Every time we set a parameter
+on a LOP node Houdini dirties the node, even if the value didn't actually change.
+That invalidates the cooked stage, so these functions only set values that are different
+and write whole multiparm blocks at once."""
+
+from contextlib import contextmanager
+
+import hou
+
+
+def set_parm_value(parm: hou.Parm, value) -> bool:
+    """Sets a parameter value, but only if it differs from the current value.
+    Keyframes and expressions on the parameter get removed, like a fresh set would.
+
+    Args:
+        parm (hou.Parm): Parameter to set
+        value: Value to set, strings are compared unexpanded
+
+    Returns:
+        bool: True if the parameter was changed
+    """
+    if is_parm_value(parm, value):
+        return False
+
+    if parm.keyframes():
+        parm.deleteAllKeyframes()
+    parm.set(value)
+    return True
+
+
+def set_parm_expression(parm: hou.Parm, expression: str) -> bool:
+    """Sets a parameter expression, but only if it differs from the current expression.
+
+    Args:
+        parm (hou.Parm): Parameter to set
+        expression (str): Expression to set
+
+    Returns:
+        bool: True if the parameter was changed
+    """
+    try:
+        if parm.expression() == expression:
+            return False
+    except hou.OperationFailed:
+        # Parameter has no expression yet
+        pass
+
+    parm.setExpression(expression)
+    return True
+
+
+def is_parm_value(parm: hou.Parm, value) -> bool:
+    """Checks if a parameter already has the given value. String parameters are
+    compared unexpanded, so something like $F4 in a path doesn't get evaluated
+    to the current frame.
+
+    Args:
+        parm (hou.Parm): Parameter to check
+        value: Value we want to compare with
+    """
+    if parm.keyframes():
+        return False
+
+    if not isinstance(value, str):
+        return parm.eval() == value
+
+    if parm.parmTemplate().type() == hou.parmTemplateType.String:
+        return parm.unexpandedString() == value
+
+    # Menus and such can be set by their token
+    return parm.evalAsString() == value
+
+
+def is_parm_tuple_value(parm_tuple: hou.ParmTuple, value) -> bool:
+    """Checks if a parameter tuple already has the given value. Single component
+    tuples get compared with a single value, the others component by component.
+
+    Args:
+        parm_tuple (hou.ParmTuple): Parameter tuple to check
+        value: Value we want to compare with
+    """
+    if len(parm_tuple) == 1:
+        return is_parm_value(parm_tuple[0], value)
+
+    return len(value) == len(parm_tuple) and all(
+        is_parm_value(parm, component) for parm, component in zip(parm_tuple, value)
+    )
+
+
+@contextmanager
+def bulk_parm_edit(label: str):
+    """Groups a lot of parameter changes into a single undo and pauses
+    updates while we make them, so Houdini doesn't cook in between.
+
+    Args:
+        label (str): Label of the undo group
+    """
+    update_mode = None
+    if hou.isUIAvailable():
+        update_mode = hou.ui.updateMode()
+        hou.ui.setUpdateMode(hou.updateMode.Manual)
+
+    try:
+        with hou.undos.group(label):
+            yield
+    finally:
+        if update_mode is not None:
+            hou.ui.setUpdateMode(update_mode)
+
+
+def get_multiparm_values(node: hou.Node, multiparm_name: str) -> list[dict]:
+    """Evaluates all instances of a multiparm block in one go.
+
+    Args:
+        node (hou.Node): Node with the multiparm
+        multiparm_name (str): Name of the multiparm folder parameter
+
+    Returns:
+        list[dict]: One dict per instance, keyed by the template name like 'metadata_#_key'.
+            Parameters with more than one component give a tuple.
+    """
+    multiparm = node.parm(multiparm_name)
+    instance_values = {}
+    for parm in multiparm.multiParmInstances():
+        parm_tuple = parm.tuple()
+        if parm_tuple.name() not in instance_values:
+            instance_values[parm_tuple.name()] = (
+                parm_tuple.eval() if len(parm_tuple) > 1 else parm.eval()
+            )
+    template_names = [
+        template.name() for template in multiparm.parmTemplate().parmTemplates()
+    ]
+
+    entries = []
+    for index in range(1, multiparm.evalAsInt() + 1):
+        entry = {}
+        for template_name in template_names:
+            instance_name = template_name.replace("#", str(index))
+            if instance_name in instance_values:
+                entry[template_name] = instance_values[instance_name]
+        entries.append(entry)
+
+    return entries
+
+
+def set_multiparm_values(
+    node: hou.Node, multiparm_name: str, entries: list[dict], start_index: int = 1
+) -> None:
+    """Sets the instance count of a multiparm block and writes all values at once.
+    Only values that differ from the current value are written.
+
+    Args:
+        node (hou.Node): Node with the multiparm
+        multiparm_name (str): Name of the multiparm folder parameter
+        entries (list[dict]): One dict per instance, keyed by the template name like 'metadata_#_key'
+        start_index (int): Instance index to write the first entry to, earlier
+            instances are kept as they are
+    """
+    multiparm = node.parm(multiparm_name)
+
+    with bulk_parm_edit(f"Update {multiparm_name}"):
+        set_parm_value(multiparm, start_index - 1 + len(entries))
+
+        instance_parm_tuples = {
+            parm.tuple().name(): parm.tuple() for parm in multiparm.multiParmInstances()
+        }
+        changed_values = {}
+        for index, entry in enumerate(entries, start_index):
+            for template_name, value in entry.items():
+                instance_name = template_name.replace("#", str(index))
+                parm_tuple = instance_parm_tuples.get(instance_name)
+                if parm_tuple is not None:
+                    if is_parm_tuple_value(parm_tuple, value):
+                        continue
+                    for parm in parm_tuple:
+                        if parm.keyframes():
+                            parm.deleteAllKeyframes()
+                changed_values[instance_name] = value
+
+        if changed_values:
+            node.setParms(changed_values)
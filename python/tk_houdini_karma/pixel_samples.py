@@ -0,0 +1,34 @@
+"""Where our nodes keep the pixel samples of the engine they render with. Karma CPU and XPU
+each have their own samples, so everything that reads or scales the samples goes through
+here. The OTL stores this module in a section of the HDA, so the Python Script LOPs
+inside our node use the same definitions."""
+
+import hou
+
+# Karma CPU renders with the pixel samples, XPU with the path traced samples
+CPU_PIXEL_SAMPLES_ATTRIBUTE = "karma:global:samplesperpixel"
+XPU_PIXEL_SAMPLES_ATTRIBUTE = "karma:global:pathtracedsamples"
+
+
+def get_pixel_samples_attribute(node: hou.Node) -> str:
+    """Returns the render settings attribute with the pixel samples of our engine.
+
+    Args:
+        node (hou.Node): SGTK Karma node
+    """
+    if node.evalParm("engine") == "cpu":
+        return CPU_PIXEL_SAMPLES_ATTRIBUTE
+
+    return XPU_PIXEL_SAMPLES_ATTRIBUTE
+
+
+def get_pixel_samples_parm(node: hou.Node) -> hou.Parm:
+    """Returns the pixel samples parameter of the engine we render with.
+
+    Args:
+        node (hou.Node): SGTK Karma node
+    """
+    if node.evalParm("engine") == "cpu":
+        return node.parm("samplesperpixel")
+
+    return node.parm("pathtracedsamples")
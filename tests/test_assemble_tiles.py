@@ -0,0 +1,136 @@
+"""Checks that assembling the tiles of an image gives back exactly the image we tiled,
+and that the tile windows cover the whole image. The assembly only needs OpenImageIO,
+so this runs without Houdini or Toolkit."""
+
+import importlib.util
+import json
+import os
+
+import pytest
+
+OpenImageIO = pytest.importorskip("OpenImageIO")
+
+# Load the script on its own, the package itself needs Toolkit
+SCRIPT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "python", "tk_houdini_karma", "assemble_tiles.py"
+)
+spec = importlib.util.spec_from_file_location("assemble_tiles", SCRIPT_PATH)
+assemble_tiles = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(assemble_tiles)
+
+WIDTH = 67
+HEIGHT = 41
+TILES_X = 3
+TILES_Y = 2
+
+
+def make_image() -> "OpenImageIO.ImageBuf":
+    """Returns a half float RGBA image with a gradient and some metadata, like a
+    render with a cryptomatte manifest."""
+    spec = OpenImageIO.ImageSpec(WIDTH, HEIGHT, 4, OpenImageIO.HALF)
+    spec.attribute("cryptomatte/abc1234/manifest", '{"/geo/sphere": "3f800000"}')
+    spec.attribute("rmd_artist", "tester")
+    image = OpenImageIO.ImageBuf(spec)
+    OpenImageIO.ImageBufAlgo.fill(
+        image, (0.0, 0.0, 0.0, 1.0), (1.0, 0.0, 0.5, 1.0), (0.0, 1.0, 0.5, 1.0), (1.0, 1.0, 1.0, 0.0)
+    )
+
+    return image
+
+
+def get_tile_windows() -> list[tuple[int, int, int, int]]:
+    """Returns the data windows of the tiles, overlapping by a pixel like Karma tiles."""
+    windows = []
+    for tile_y in range(TILES_Y):
+        for tile_x in range(TILES_X):
+            xbegin = max(tile_x * WIDTH // TILES_X - 1, 0)
+            xend = min((tile_x + 1) * WIDTH // TILES_X + 1, WIDTH)
+            ybegin = max(tile_y * HEIGHT // TILES_Y - 1, 0)
+            yend = min((tile_y + 1) * HEIGHT // TILES_Y + 1, HEIGHT)
+            windows.append((xbegin, xend, ybegin, yend))
+
+    return windows
+
+
+def test_assembled_image_matches_original(tmp_path):
+    image = make_image()
+    output_path = str(tmp_path / "render.0001.exr").replace(os.sep, "/")
+
+    tile_paths = []
+    for tile_index, window in enumerate(get_tile_windows()):
+        tile = OpenImageIO.ImageBufAlgo.crop(image, OpenImageIO.ROI(*window))
+        tile_path = assemble_tiles.get_tile_path(output_path, tile_index)
+        os.makedirs(os.path.dirname(tile_path))
+        assert tile.write(tile_path), tile.geterror()
+        tile_paths.append(tile_path)
+
+    assemble_tiles.assemble_tiles(output_path, tile_paths)
+
+    assembled = OpenImageIO.ImageBuf(output_path)
+    assembled_spec = assembled.spec()
+    assert (assembled_spec.x, assembled_spec.y) == (0, 0)
+    assert (assembled_spec.width, assembled_spec.height) == (WIDTH, HEIGHT)
+    assert assembled_spec.format == OpenImageIO.HALF
+
+    comparison = OpenImageIO.ImageBufAlgo.compare(assembled, image, 0.0, 0.0)
+    assert comparison.nfail == 0
+    assert comparison.maxerror == 0.0
+
+    manifest = assembled_spec.getattribute("cryptomatte/abc1234/manifest")
+    assert manifest == '{"/geo/sphere": "3f800000"}'
+    assert assembled_spec.getattribute("rmd_artist") == "tester"
+
+
+def test_tile_windows_cover_image():
+    for tile_index in range(TILES_X * TILES_Y):
+        window = assemble_tiles.get_tile_window(
+            tile_index, TILES_X, TILES_Y, (WIDTH, HEIGHT)
+        )
+        assert all(0 <= value <= 1 for value in window)
+        assert window[0] < window[2] and window[1] < window[3]
+
+    # Tiles start at the top left, NDC starts at the bottom left
+    assert assemble_tiles.get_tile_window(0, TILES_X, TILES_Y, (WIDTH, HEIGHT))[0] == 0
+    assert assemble_tiles.get_tile_window(0, TILES_X, TILES_Y, (WIDTH, HEIGHT))[3] == 1
+
+    # Every pixel center falls in a tile, so rounding never leaves a gap
+    windows = [
+        assemble_tiles.get_tile_window(tile_index, TILES_X, TILES_Y, (WIDTH, HEIGHT))
+        for tile_index in range(TILES_X * TILES_Y)
+    ]
+    for pixel_y in range(HEIGHT):
+        for pixel_x in range(WIDTH):
+            center_x = (pixel_x + 0.5) / WIDTH
+            center_y = (pixel_y + 0.5) / HEIGHT
+            assert any(
+                xmin < center_x < xmax and ymin < center_y < ymax
+                for xmin, ymin, xmax, ymax in windows
+            )
+
+
+def test_cryptomatte_manifests_get_merged(tmp_path):
+    image = make_image()
+    output_path = str(tmp_path / "render.0001.exr").replace(os.sep, "/")
+
+    # Every tile only lists the objects it rendered
+    tile_paths = []
+    for tile_index, window in enumerate(get_tile_windows()):
+        tile = OpenImageIO.ImageBufAlgo.crop(image, OpenImageIO.ROI(*window))
+        tile.specmod().attribute(
+            "cryptomatte/abc1234/manifest",
+            json.dumps({f"/geo/object{tile_index}": f"{tile_index:08x}"}),
+        )
+        tile_path = assemble_tiles.get_tile_path(output_path, tile_index)
+        os.makedirs(os.path.dirname(tile_path))
+        assert tile.write(tile_path), tile.geterror()
+        tile_paths.append(tile_path)
+
+    assemble_tiles.assemble_tiles(output_path, tile_paths)
+
+    manifest = OpenImageIO.ImageBuf(output_path).spec().getattribute(
+        "cryptomatte/abc1234/manifest"
+    )
+    assert json.loads(manifest) == {
+        f"/geo/object{tile_index}": f"{tile_index:08x}"
+        for tile_index in range(TILES_X * TILES_Y)
+    }
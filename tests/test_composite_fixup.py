@@ -0,0 +1,58 @@
+"""Checks that compositing a fix-up only replaces its region and moves the fix-up
+out of the way. Compositing only needs OpenImageIO, so this runs without Houdini."""
+
+import importlib.util
+import os
+
+import pytest
+
+OpenImageIO = pytest.importorskip("OpenImageIO")
+
+# Load the script on its own, the package itself needs Toolkit
+SCRIPT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "python", "tk_houdini_karma", "composite_fixup.py"
+)
+spec = importlib.util.spec_from_file_location("composite_fixup", SCRIPT_PATH)
+composite_fixup = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(composite_fixup)
+
+WIDTH = 48
+HEIGHT = 32
+FIXUP_WINDOW = (20, 36, 8, 24)
+
+
+def write_image(path: str, color: tuple, roi=None) -> "OpenImageIO.ImageBuf":
+    """Writes a half float RGBA image of a single color, cropped to the ROI if given."""
+    image = OpenImageIO.ImageBuf(OpenImageIO.ImageSpec(WIDTH, HEIGHT, 4, OpenImageIO.HALF))
+    image.specmod().attribute("rmd_artist", "tester")
+    OpenImageIO.ImageBufAlgo.fill(image, color)
+    if roi is not None:
+        image = OpenImageIO.ImageBufAlgo.crop(image, OpenImageIO.ROI(*roi))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    assert image.write(path), image.geterror()
+    return image
+
+
+def test_fixup_replaces_region_and_gets_moved(tmp_path):
+    path = str(tmp_path / "render.%04d.exr").replace(os.sep, "/")
+    output_path = path % 1
+    fixup_path = composite_fixup.get_fixup_path(output_path)
+    write_image(output_path, (0.25, 0.25, 0.25, 1.0))
+    write_image(fixup_path, (1.0, 0.5, 0.0, 1.0), FIXUP_WINDOW)
+
+    assert composite_fixup.composite_fixup_frames([path], range(1, 3)) == 1
+
+    composited = OpenImageIO.ImageBuf(output_path)
+    xbegin, xend, ybegin, yend = FIXUP_WINDOW
+    for x, y in ((0, 0), (xbegin - 1, ybegin), (xend, yend - 1), (WIDTH - 1, HEIGHT - 1)):
+        assert composited.getpixel(x, y) == (0.25, 0.25, 0.25, 1.0)
+    for x, y in ((xbegin, ybegin), (xend - 1, yend - 1)):
+        assert composited.getpixel(x, y) == (1.0, 0.5, 0.0, 1.0)
+    assert composited.spec().getattribute("rmd_artist") == "tester"
+
+    assert not os.path.exists(fixup_path)
+    assert os.path.isfile(composite_fixup.get_composited_fixup_path(fixup_path))
+
+    # The old region doesn't get pasted in again
+    assert composite_fixup.composite_fixup_frames([path], range(1, 3)) == 0
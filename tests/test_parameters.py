@@ -0,0 +1,393 @@
+"""Checks that our parameter helpers only write values that change. Houdini dirties a
+node on every write, even with the same value, so an unchanged write would recook the
+whole stage. This runs against a fake hou module that counts the cooks a write causes."""
+
+import contextlib
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+PYTHON_FOLDER = os.path.join(os.path.dirname(__file__), "..", "python")
+SCRIPT_PATH = os.path.join(PYTHON_FOLDER, "tk_houdini_karma", "parameters.py")
+
+
+class FakeOperationFailed(Exception):
+    pass
+
+
+class FakeParmTemplate:
+    def __init__(self, name: str, parm_type: str, components: int = 1, children=()):
+        self._name = name
+        self._type = parm_type
+        self.components = components
+        self.children = list(children)
+
+    def name(self) -> str:
+        return self._name
+
+    def type(self) -> str:
+        return self._type
+
+    def parmTemplates(self) -> list:
+        return self.children
+
+
+class FakeParm:
+    def __init__(self, node, name: str, template: FakeParmTemplate, value):
+        self.node = node
+        self._name = name
+        self.template = template
+        self.value = value
+        self.parm_tuple = None
+        self._expression = None
+
+    def name(self) -> str:
+        return self._name
+
+    def tuple(self):
+        return self.parm_tuple
+
+    def parmTemplate(self) -> FakeParmTemplate:
+        return self.template
+
+    def keyframes(self) -> list:
+        return []
+
+    def deleteAllKeyframes(self) -> None:
+        pass
+
+    def eval(self):
+        return self.value
+
+    def evalAsInt(self) -> int:
+        return int(self.value)
+
+    def evalAsString(self) -> str:
+        return str(self.value)
+
+    def unexpandedString(self) -> str:
+        return self.value
+
+    def set(self, value) -> None:
+        self.value = value
+        self.node.dirty()
+
+    def expression(self) -> str:
+        if self._expression is None:
+            raise FakeOperationFailed()
+        return self._expression
+
+    def setExpression(self, expression: str) -> None:
+        self._expression = expression
+        self.node.dirty()
+
+    def multiParmInstances(self) -> list:
+        return [
+            parm
+            for index in range(1, self.value + 1)
+            for template in self.template.children
+            for parm in self.node.parm_tuples[template.name().replace("#", str(index))]
+        ]
+
+
+class FakeParmTuple(list):
+    def __init__(self, name: str, parms: list):
+        super().__init__(parms)
+        self._name = name
+        for parm in parms:
+            parm.parm_tuple = self
+
+    def name(self) -> str:
+        return self._name
+
+    def eval(self) -> tuple:
+        return tuple(parm.eval() for parm in self)
+
+
+class FakeMultiparm(FakeParm):
+    def set(self, value) -> None:
+        for index in range(1, value + 1):
+            for template in self.template.children:
+                name = template.name().replace("#", str(index))
+                if name not in self.node.parm_tuples:
+                    self.node.add_parm(name, template)
+        super().set(value)
+
+
+class FakeNode:
+    """Node that cooks again after any of its parameters, or those of the
+    nodes inside it, got written."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.children = {}
+        self.parm_tuples = {}
+        self.user_data = {}
+        self.is_dirty = True
+        self.cook_count = 0
+
+    def add_parm(self, name: str, template: FakeParmTemplate, parm_class=FakeParm):
+        default = "" if template.type() == "String" else 0
+        if template.components == 1:
+            parms = [parm_class(self, name, template, default)]
+        else:
+            parms = [
+                parm_class(self, f"{name}{component}", template, default)
+                for component in "xyz"[: template.components]
+            ]
+        self.parm_tuples[name] = FakeParmTuple(name, parms)
+        return parms[0]
+
+    def add_node(self, name: str) -> "FakeNode":
+        self.children[name] = FakeNode(self)
+        return self.children[name]
+
+    def node(self, name: str) -> "FakeNode":
+        return self.children.get(name)
+
+    def parm(self, name: str) -> FakeParm:
+        parm_tuple = self.parm_tuples.get(name)
+        return parm_tuple[0] if parm_tuple else None
+
+    def inputs(self) -> list:
+        return [object()]
+
+    def allowEditingOfContents(self) -> None:
+        pass
+
+    def setUserData(self, name: str, value: str) -> None:
+        # User data doesn't dirty the node
+        self.user_data[name] = value
+
+    def setParms(self, values: dict) -> None:
+        for name, value in values.items():
+            parm_tuple = self.parm_tuples[name]
+            for parm, component in zip(
+                parm_tuple, value if len(parm_tuple) > 1 else (value,)
+            ):
+                parm.value = component
+        self.dirty()
+
+    def dirty(self) -> None:
+        self.is_dirty = True
+        if self.parent is not None:
+            self.parent.dirty()
+
+    def cook(self) -> None:
+        if self.is_dirty:
+            self.cook_count += 1
+            self.is_dirty = False
+
+
+class FakeTemplate:
+    """Output template that puts the output and AOV name in the path."""
+
+    def get_fields(self, path: str) -> dict:
+        return {}
+
+    def apply_fields(self, fields: dict) -> str:
+        return "/renders/{output}/{aov_name}/{output}_{aov_name}.$F4.exr".format(**fields)
+
+
+@pytest.fixture
+def hou(monkeypatch):
+    """Fake hou module with just enough for our parameter helpers and the handler."""
+    hou = types.ModuleType("hou")
+    hou.Node = FakeNode
+    hou.Parm = FakeParm
+    hou.ParmTuple = FakeParmTuple
+    hou.OperationFailed = FakeOperationFailed
+    hou.InterruptableOperation = contextlib.nullcontext
+    hou.parmTemplateType = types.SimpleNamespace(String="String", Int="Int")
+    hou.isUIAvailable = lambda: False
+    hou.undos = types.SimpleNamespace(group=lambda label: contextlib.nullcontext())
+    hou.hipFile = types.SimpleNamespace(path=lambda: "/work/shot_v001.hip")
+    monkeypatch.setitem(sys.modules, "hou", hou)
+    return hou
+
+
+@pytest.fixture
+def parameters(hou):
+    """Loads our parameters module against a fake hou module."""
+    spec = importlib.util.spec_from_file_location("parameters", SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def handler(hou, monkeypatch):
+    """Loads our app package against fake modules and returns a handler with
+    a ShotGrid metadata expression configured."""
+    monkeypatch.setitem(sys.modules, "sgtk", types.ModuleType("sgtk"))
+    pxr = types.ModuleType("pxr")
+    pxr.Sdf = pxr.Usd = pxr.UsdRender = types.SimpleNamespace()
+    monkeypatch.setitem(sys.modules, "pxr", pxr)
+    pyside = types.ModuleType("PySide2")
+    pyside.QtWidgets = types.SimpleNamespace(QWidget=object)
+    monkeypatch.setitem(sys.modules, "PySide2", pyside)
+
+    spec = importlib.util.spec_from_file_location(
+        "karma_app",
+        os.path.join(PYTHON_FOLDER, "__init__.py"),
+        submodule_search_locations=[PYTHON_FOLDER],
+    )
+    package = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, "karma_app", package)
+    spec.loader.exec_module(package)
+
+    app = types.SimpleNamespace(
+        shotgun=None,
+        context=types.SimpleNamespace(user={"id": 42}),
+        get_template=lambda name: FakeTemplate(),
+        get_setting=lambda name: [
+            {"key": "shot", "type": "string", "expression": 'chs("name")', "group": "info"}
+        ],
+    )
+    yield package.tk_houdini_karma.karma_node_handler(app)
+
+    for module_name in list(sys.modules):
+        if module_name.startswith("karma_app."):
+            del sys.modules[module_name]
+
+
+@pytest.fixture
+def node() -> FakeNode:
+    """Node with a path and a multiparm of metadata entries, cooked once."""
+    node = FakeNode()
+    node.add_parm("picture", FakeParmTemplate("picture", "String"))
+    node.add_parm(
+        "metadata_entries",
+        FakeParmTemplate(
+            "metadata_entries",
+            "Int",
+            children=(
+                FakeParmTemplate("metadata_#_key", "String"),
+                FakeParmTemplate("metadata_#_v3f", "Float", components=3),
+            ),
+        ),
+        FakeMultiparm,
+    )
+    node.cook()
+    return node
+
+
+@pytest.fixture
+def karma_node() -> FakeNode:
+    """SGTK Karma node with the nodes and parameters our preflight writes, cooked once."""
+    karma_node = FakeNode()
+    for name, parm_type, value in (
+        ("name", "String", "beauty"),
+        ("resolutionx", "Int", 1920),
+        ("resolutiony", "Int", 1080),
+        ("preview_picture", "String", ""),
+    ):
+        karma_node.add_parm(name, FakeParmTemplate(name, parm_type)).value = value
+    karma_node.add_parm(
+        "render_passes",
+        FakeParmTemplate(
+            "render_passes",
+            "Int",
+            children=(
+                FakeParmTemplate("render_pass_name_#", "String"),
+                FakeParmTemplate("render_pass_mode_#", "Int"),
+            ),
+        ),
+        FakeMultiparm,
+    ).set(1)
+    karma_node.parm("render_pass_name_1").value = "environment"
+    karma_node.add_parm(
+        "metadata_entries",
+        FakeParmTemplate(
+            "metadata_entries", "Int", children=(FakeParmTemplate("metadata_#_key", "String"),)
+        ),
+        FakeMultiparm,
+    )
+
+    karma_render_settings = karma_node.add_node("karmarendersettings")
+    for name in ("picture", "dcmfilename"):
+        karma_render_settings.add_parm(name, FakeParmTemplate(name, "String"))
+    karma_node.add_node("karmacryptomatte").add_parm(
+        "cryptopicture", FakeParmTemplate("cryptopicture", "String")
+    )
+
+    sg_metadata = karma_node.add_node("sg_metadata")
+    sg_metadata.add_parm("artist", FakeParmTemplate("artist", "String"))
+    sg_metadata.add_parm(
+        "metadata_entries",
+        FakeParmTemplate(
+            "metadata_entries",
+            "Int",
+            children=(
+                FakeParmTemplate("metadata_#_key", "String"),
+                FakeParmTemplate("metadata_#_type", "Menu"),
+                FakeParmTemplate("metadata_#_string", "String"),
+            ),
+        ),
+        FakeMultiparm,
+    )
+    karma_node.cook()
+    return karma_node
+
+
+def test_unchanged_write_does_not_cook(parameters, node):
+    assert parameters.set_parm_value(node.parm("picture"), "$HIP/render.$F4.exr")
+    node.cook()
+    assert node.cook_count == 2
+
+    assert not parameters.set_parm_value(node.parm("picture"), "$HIP/render.$F4.exr")
+    node.cook()
+    assert node.cook_count == 2
+
+
+def test_unchanged_multiparm_write_does_not_cook(parameters, node):
+    entries = [
+        {"metadata_#_key": "shot", "metadata_#_v3f": (1.0, 2.0, 3.0)},
+        {"metadata_#_key": "artist", "metadata_#_v3f": (0.0, 0.0, 0.0)},
+    ]
+    parameters.set_multiparm_values(node, "metadata_entries", entries)
+    node.cook()
+    assert node.cook_count == 2
+
+    parameters.set_multiparm_values(node, "metadata_entries", entries)
+    node.cook()
+    assert node.cook_count == 2
+
+
+def test_multiparm_values_keep_every_component(parameters, node):
+    entries = [{"metadata_#_key": "shot", "metadata_#_v3f": (1.0, 2.0, 3.0)}]
+    parameters.set_multiparm_values(node, "metadata_entries", entries)
+
+    assert parameters.get_multiparm_values(node, "metadata_entries") == entries
+
+
+def test_repeated_preflight_does_not_cook(handler, karma_node):
+    assert handler.setup_output_paths(karma_node)
+    assert handler.setup_metadata(karma_node)
+    karma_node.cook()
+    assert karma_node.cook_count == 2
+    assert karma_node.parm("preview_picture").eval() == (
+        "/renders/beauty/preview/beauty_preview.$F4.exr"
+    )
+    assert karma_node.node("sg_metadata").parm("metadata_2_string").expression() == (
+        'chs("../name")'
+    )
+
+    # Rendering again without changes must not recook the stage
+    assert handler.setup_output_paths(karma_node)
+    assert handler.setup_metadata(karma_node)
+    karma_node.cook()
+    assert karma_node.cook_count == 2
+
+
+def test_preflight_on_older_node(handler, karma_node):
+    # Nodes from an older OTL don't have render passes or a preview output
+    del karma_node.parm_tuples["render_passes"]
+    del karma_node.parm_tuples["preview_picture"]
+
+    assert handler.setup_output_paths(karma_node)
+    assert handler.get_render_passes(karma_node) == []
+    assert karma_node.user_data["render_pass_outputs"] == "{}"